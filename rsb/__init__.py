@@ -45,8 +45,11 @@ import re
 import threading
 import time
 import uuid
+import weakref
 
 import rsb.eventprocessing
+import rsb.metrics
+import rsb.tracing
 from rsb.util import get_logger_by_class
 
 
@@ -82,6 +85,13 @@ def _register_default_transports():
         local.initialize()
         import rsb.transport.socket as socket
         socket.initialize()
+        try:
+            import rsb.transport.shm as shm
+        except ImportError:
+            # The shared-memory transport relies on POSIX file locking.
+            pass
+        else:
+            shm.initialize()
 
 
 class QualityOfServiceSpec:
@@ -354,6 +364,21 @@ class ParticipantConfig:
 
     * Whether introspection should be enabled for the participant
       (enabled by default)
+    * The interval in seconds at which the introspection publishes
+      performance statistics of the participant (option
+      ``introspection.statistics``, default zero for not publishing
+      statistics, see :obj:`rsb.introspection.IntrospectionSender`)
+    * Capacity and overflow policy of the queues in which received events
+      wait for being processed (options ``receiving.queuesize``, default
+      zero for no limit, and ``receiving.overflow``, see
+      :obj:`rsb.util.BoundedQueue`). Listeners apply them to the queues of
+      their receiving strategies, readers pass them to their pull
+      connectors unless the transport configures these options itself.
+    * The maximum number of threads in which local servers execute
+      requests of methods which allow parallel execution (option
+      ``receiving.threads``, default zero for no limit). Requests which
+      arrive while all threads are busy wait in a queue of
+      ``receiving.queuesize`` requests.
 
     .. codeauthor:: jmoringe
     """
@@ -448,7 +473,9 @@ class ParticipantConfig:
                  transports=None,
                  options=None,
                  qos=None,
-                 introspection=False):
+                 introspection=False,
+                 receiving=None,
+                 introspection_statistics=0):
         if transports is None:
             self._transports = {}
         else:
@@ -465,6 +492,12 @@ class ParticipantConfig:
             self._qos = qos
 
         self._introspection = introspection
+        self._introspection_statistics = introspection_statistics
+
+        if receiving is None:
+            self._receiving = {}
+        else:
+            self._receiving = receiving
 
     @property
     def enabled_transports(self):
@@ -493,19 +526,61 @@ class ParticipantConfig:
     def introspection(self, new_value):
         self._introspection = new_value
 
+    @property
+    def introspection_statistics(self):
+        """
+        Return the interval for publishing performance statistics.
+
+        Returns:
+            float:
+                The interval in seconds or zero if no statistics should be
+                published.
+        """
+        return self._introspection_statistics
+
+    @introspection_statistics.setter
+    def introspection_statistics(self, new_value):
+        self._introspection_statistics = new_value
+
+    @property
+    def receiving_options(self):
+        """
+        Return the explicitly configured ``receiving.*`` options.
+
+        Returns:
+            dict of str -> str:
+                The options without the ``receiving.`` prefix.
+        """
+        return self._receiving
+
+    @property
+    def receive_queue_size(self):
+        return int(self._receiving.get('queuesize', '0'))
+
+    @property
+    def receive_overflow(self):
+        return self._receiving.get('overflow', 'drop-oldest')
+
+    @property
+    def receive_threads(self):
+        return int(self._receiving.get('threads', '0'))
+
     def __deepcopy__(self, memo):
         result = copy.copy(self)
         result._transports = copy.deepcopy(self._transports, memo)
         result._options = copy.deepcopy(self._options, memo)
+        result._receiving = copy.deepcopy(self._receiving, memo)
         return result
 
     def __str__(self):
         return 'ParticipantConfig[{transports}, options={options}, ' \
-               'qos={qos}, introspection={introspection}]'.format(
+               'qos={qos}, introspection={introspection}, ' \
+               'receiving={receiving}]'.format(
                    transports=list(self._transports.values()),
                    options=self._options,
                    qos=self._qos,
-                   introspection=self._introspection)
+                   introspection=self._introspection,
+                   receiving=self._receiving)
 
     def __repr__(self):
         return str(self)
@@ -541,6 +616,11 @@ class ParticipantConfig:
         introspection_options = dict(section_options('introspection'))
         result._introspection = _config_value_is_true(
             introspection_options.get('enabled', '1'))
+        result._introspection_statistics = float(
+            introspection_options.get('statistics', '0'))
+
+        # Receive queue options
+        result._receiving = dict(section_options('receiving'))
 
         return result
 
@@ -1259,6 +1339,7 @@ class Event:
             self._causes = copy.copy(causes)
         else:
             self._causes = []
+        self._trace = None
 
     @property
     def sequence_number(self):
@@ -1486,6 +1567,26 @@ class Event:
         """
         self._causes = causes
 
+    @property
+    def trace(self):
+        """
+        Return the timestamps of the pipeline stages this event passed.
+
+        Events only carry traces while tracing is enabled (see
+        :obj:`rsb.tracing`). Traces are local to the process and not
+        transmitted.
+
+        Returns:
+            tuple or None:
+                Pairs of stage names and monotonic timestamps or ``None``
+                if the event is not traced.
+        """
+        return self._trace
+
+    @trace.setter
+    def trace(self, trace):
+        self._trace = trace
+
     def __str__(self):
         print_data = str(self._data)
         if len(print_data) > 100:
@@ -1581,6 +1682,7 @@ class Participant:
         self._id = uuid.uuid4()
         self._scope = Scope.ensure_scope(scope)
         self._config = config
+        self._metrics = []
 
     @property
     def participant_id(self):
@@ -1623,8 +1725,56 @@ class Participant:
         This needs to be called in case you want to ensure that programs can
         terminate correctly.
         """
+        registry = rsb.metrics.get_registry()
+        for name in self._metrics:
+            registry.remove(name, **self._metric_labels())
+        self._metrics = []
         participant_destruction_hook.run(self)
 
+    def _metric_labels(self):
+        return {'participant': str(self._id),
+                'scope': self._scope.to_string()}
+
+    def _add_metric(self, name, description, metric):
+        """
+        Register ``metric`` until this participant is deactivated.
+
+        Args:
+            name (str):
+                The name of the metric family.
+            description (str):
+                A description of the metric family.
+            metric:
+                A :obj:`rsb.metrics.Counter`, :obj:`rsb.metrics.Gauge` or
+                :obj:`rsb.metrics.Histogram`. Metric functions should not
+                reference the participant strongly (see
+                :meth:`_metric_function`).
+
+        Returns:
+            The registered metric.
+        """
+        rsb.metrics.get_registry().add(name, description, metric,
+                                       **self._metric_labels())
+        self._metrics.append(name)
+        return metric
+
+    def _metric_function(self, function):
+        """
+        Return a function which calls ``function`` with this participant.
+
+        The returned function only references the participant weakly so
+        that registered metrics do not keep it alive. It returns zero once
+        the participant has been garbage collected.
+        """
+        reference = weakref.ref(self)
+
+        def call():
+            participant = reference()
+            if participant is None:
+                return 0
+            return function(participant)
+        return call
+
     def __enter__(self):
         return self
 
@@ -1650,9 +1800,9 @@ class Participant:
                     factory.create_in_push_connector(converters,
                                                      transport.options))
             elif direction == 'in-pull':
+                options = dict(config.receiving_options, **transport.options)
                 transports.append(
-                    factory.create_in_pull_connector(converters,
-                                                     transport.options))
+                    factory.create_in_pull_connector(converters, options))
             elif direction == 'out':
                 transports.append(
                     factory.create_out_connector(converters,
@@ -1726,6 +1876,17 @@ class Informer(Participant):
             config.quality_of_service_spec
         self._configurator.scope = self.scope
 
+        self._add_metric(
+            'rsb_informer_events_published_total',
+            'Events published by informers',
+            rsb.metrics.Counter(self._metric_function(
+                lambda informer: informer._sequence_number)))
+        configurator = self._configurator
+        self._add_metric(
+            'rsb_informer_bytes_published_total',
+            'Payload bytes published by informers',
+            rsb.metrics.Counter(lambda: configurator.payload_bytes))
+
         self._activate()
 
     def __del__(self):
@@ -1768,6 +1929,58 @@ class Informer(Participant):
         """
         # TODO check activation
 
+        self._prepare_events([event])
+        self._send_event(event)
+        return event
+
+    def publish_events(self, events):
+        """
+        Publish multiple predefined events in one go.
+
+        Like :meth:`publish_event` but the events receive consecutive
+        sequence numbers and are passed to the transports as a single
+        batch which allows them to amortize per-event overhead such as
+        locking and socket writes.
+
+        Args:
+            events (list):
+                the events to send
+
+        Returns:
+            list:
+                the sent events
+        """
+        events = self._prepare_events(events)
+        self._send_events(events)
+        return events
+
+    def _prepare_events(self, events):
+        # Check EVENTS and assign consecutive ids. Callers which have to
+        # know the ids before the events are sent (for example to
+        # register pending calls for replies) can send the prepared
+        # events via _send_event and _send_events.
+        events = list(events)
+        for event in events:
+            self._check_event(event)
+
+        with self._mutex:
+            for event in events:
+                event.event_id = EventId(self.participant_id,
+                                         self._sequence_number)
+                self._sequence_number += 1
+        for event in events:
+            event.trace = rsb.tracing.begin('publish')
+        return events
+
+    def _send_event(self, event):
+        self._logger.debug("Publishing event '%s'", event)
+        self._configurator.handle(event)
+
+    def _send_events(self, events):
+        self._logger.debug("Publishing %d events", len(events))
+        self._configurator.handle_batch(events)
+
+    def _check_event(self, event):
         if not event.scope == self.scope \
                 and not event.scope.is_sub_scope_of(self.scope):
             raise ValueError("Scope {} of event {} is not a sub-scope of "
@@ -1778,14 +1991,6 @@ class Informer(Participant):
                              "this informer's type {}.".format(
                                  event.data, event, self.data_type))
 
-        with self._mutex:
-            event.event_id = EventId(self.participant_id,
-                                     self._sequence_number)
-            self._sequence_number += 1
-        self._logger.debug("Publishing event '%s'", event)
-        self._configurator.handle(event)
-        return event
-
     def _activate(self):
         with self._mutex:
             if self._active:
@@ -1848,6 +2053,7 @@ class Listener(Participant):
 
         self._filters = []
         self._handlers = []
+        self._dispatched_handlers = []
         self._configurator = None
         self._active = False
         self._mutex = threading.Lock()
@@ -1859,11 +2065,42 @@ class Listener(Participant):
             for connector in connectors:
                 connector.quality_of_service_spec = \
                     config.quality_of_service_spec
+            if receiving_strategy is None:
+                receiving_strategy = \
+                    rsb.eventprocessing.ParallelEventReceivingStrategy(
+                        capacity=config.receive_queue_size,
+                        overflow=config.receive_overflow)
             self._configurator = rsb.eventprocessing.InPushRouteConfigurator(
                 connectors=connectors,
                 receiving_strategy=receiving_strategy)
         self._configurator.scope = self.scope
 
+        configurator = self._configurator
+        self._add_metric(
+            'rsb_listener_events_received_total',
+            'Events received by listeners',
+            rsb.metrics.Counter(lambda: configurator.received))
+        self._add_metric(
+            'rsb_listener_bytes_received_total',
+            'Payload bytes received by listeners',
+            rsb.metrics.Counter(lambda: configurator.payload_bytes))
+        self._add_metric(
+            'rsb_listener_events_dropped_total',
+            'Events dropped by listeners because queues were full',
+            rsb.metrics.Counter(lambda: configurator.dropped))
+        self._add_metric(
+            'rsb_listener_queued_events',
+            'Events waiting to be processed by handlers of listeners',
+            rsb.metrics.Gauge(lambda: configurator.queued))
+        # Timing every handler call is only worth its cost if the
+        # introspection publishes the durations.
+        self._handler_duration = None
+        if config.introspection and config.introspection_statistics:
+            self._handler_duration = self._add_metric(
+                'rsb_listener_handler_duration_seconds',
+                'Time spent in handlers of listeners',
+                rsb.metrics.Histogram())
+
         self._activate()
 
     def __del__(self):
@@ -1874,6 +2111,17 @@ class Listener(Participant):
     def transport_urls(self):
         return self._configurator.transport_urls
 
+    @property
+    def dropped(self):
+        """
+        Return the number of events dropped because queues were full.
+
+        Returns:
+            int:
+                The number of dropped events.
+        """
+        return self._configurator.dropped
+
     def _activate(self):
         # TODO commonality with Informer... refactor
         with self._mutex:
@@ -1942,8 +2190,10 @@ class Listener(Participant):
 
         with self._mutex:
             if handler not in self._handlers:
+                dispatched = self._timed(handler)
                 self._handlers.append(handler)
-                self._configurator.handler_added(handler, wait)
+                self._dispatched_handlers.append(dispatched)
+                self._configurator.handler_added(dispatched, wait)
 
     def remove_handler(self, handler, wait=True):
         """
@@ -1960,8 +2210,11 @@ class Listener(Participant):
 
         with self._mutex:
             if handler in self._handlers:
-                self._configurator.handlerRemoved(handler, wait)
-                self._handlers.remove(handler)
+                index = self._handlers.index(handler)
+                self._configurator.handler_removed(
+                    self._dispatched_handlers[index], wait)
+                del self._handlers[index]
+                del self._dispatched_handlers[index]
 
     def get_handlers(self):
         """
@@ -1974,14 +2227,27 @@ class Listener(Participant):
         with self._mutex:
             return list(self._handlers)
 
+    def _timed(self, handler):
+        histogram = self._handler_duration
+        if histogram is None:
+            return handler
+
+        def timed(event):
+            start = time.monotonic()
+            try:
+                handler(event)
+            finally:
+                histogram.record(time.monotonic() - start)
+        return timed
+
 
 class Reader(Participant):
     """
     Receives events by manually pulling them from the wire.
 
-    Clients need to continuously call the :meth:`read` method to receive
-    events. Being too slow to receive events will usually terminate the
-    connection and is fatal.
+    Clients need to continuously call the :meth:`read` or :meth:`read_many`
+    methods or iterate over the reader to receive events. Being too slow to
+    receive events will usually terminate the connection and is fatal.
 
     .. codeauthor:: jwienke
     """
@@ -2024,6 +2290,24 @@ class Reader(Participant):
                 connectors=connectors, receiving_strategy=receiving_strategy)
         self._configurator.scope = self.scope
 
+        configurator = self._configurator
+        self._read = self._add_metric(
+            'rsb_reader_events_read_total',
+            'Events read from readers',
+            rsb.metrics.Counter())
+        self._add_metric(
+            'rsb_reader_bytes_received_total',
+            'Payload bytes received by readers',
+            rsb.metrics.Counter(lambda: configurator.payload_bytes))
+        self._add_metric(
+            'rsb_reader_events_dropped_total',
+            'Events dropped by readers because queues were full',
+            rsb.metrics.Counter(lambda: configurator.dropped))
+        self._add_metric(
+            'rsb_reader_queued_events',
+            'Events waiting to be read from readers',
+            rsb.metrics.Gauge(lambda: configurator.queued))
+
         self._activate()
 
     def __del__(self):
@@ -2034,6 +2318,17 @@ class Reader(Participant):
     def transport_urls(self):
         return self._configurator.transport_urls
 
+    @property
+    def dropped(self):
+        """
+        Return the number of events dropped because queues were full.
+
+        Returns:
+            int:
+                The number of dropped events.
+        """
+        return self._configurator.dropped
+
     def _activate(self):
         with self._mutex:
             if self._active:
@@ -2062,7 +2357,7 @@ class Reader(Participant):
 
         super().deactivate()
 
-    def read(self, block=True):
+    def read(self, block=True, timeout=None):
         """
         Read the next event from the wire.
 
@@ -2071,12 +2366,58 @@ class Reader(Participant):
         Args:
             block (bool):
                 If ``True``, block until the next event is received.
+            timeout (float or None):
+                If ``block`` is ``True``, the maximum time in seconds to wait
+                for the next event. ``None`` means waiting indefinitely.
 
         Returns:
-            rsb.Event
-                the received event
+            rsb.Event or None
+                the received event or ``None`` if no event was received in
+                time or the reader has been deactivated
+        """
+        strategy = self._configurator.get_receiving_strategy()
+        if timeout is None:
+            event = strategy.raise_event(block)
+        else:
+            event = strategy.raise_event(block, timeout)
+        if event is not None:
+            self._read.inc()
+        return event
+
+    def read_many(self, max_count, timeout=None):
         """
-        return self._configurator.get_receiving_strategy().raise_event(block)
+        Read up to ``max_count`` already received events.
+
+        Blocks only until the first event is available.
+
+        Args:
+            max_count (int):
+                The maximum number of returned events.
+            timeout (float or None):
+                The maximum time in seconds to wait for the first event.
+                ``None`` means waiting indefinitely, zero means not waiting.
+
+        Returns:
+            list:
+                The received events in the order of reception, possibly
+                empty.
+        """
+        events = self._configurator.get_receiving_strategy().raise_events(
+            max_count, timeout)
+        self._read.inc(len(events))
+        return events
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._active:
+            raise StopIteration()
+        event = self.read(True)
+        if event is None:
+            # The reader has been deactivated while waiting.
+            raise StopIteration()
+        return event
 
 
 _default_configuration_options = _config_default_sources_to_dict()
@@ -2102,6 +2443,10 @@ def set_default_participant_config(config):
     _default_participant_config = config
 
 
+if _config_value_is_true(
+        _default_configuration_options.get('tracing.enabled', '0')):
+    rsb.tracing.enable()
+
 _introspection_display_name = _default_configuration_options.get(
     'introspection.displayname')
 _introspection_initialized = False
@@ -2117,6 +2462,29 @@ def _initialize_introspection():
             _introspection_initialized = True
 
 
+_metrics_port = _default_configuration_options.get('metrics.port')
+_metrics_address = _default_configuration_options.get(
+    'metrics.address', '127.0.0.1')
+_metrics_initialized = False
+_metrics_mutex = threading.RLock()
+
+
+def _initialize_metrics():
+    global _metrics_initialized
+    with _metrics_mutex:
+        if not _metrics_initialized:
+            _metrics_initialized = True
+            try:
+                server = rsb.metrics.start_http_server(int(_metrics_port),
+                                                       _metrics_address)
+            except (OSError, ValueError) as e:
+                _logger.warning('Could not serve metrics on %s:%s: %s',
+                                _metrics_address, _metrics_port, e)
+            else:
+                _logger.info('Serving metrics on %s:%d',
+                             _metrics_address, server.port)
+
+
 def create_participant(cls, scope, config, parent=None, **kwargs):
     """
     Create and returns a new participant of type `cls`.
@@ -2143,6 +2511,8 @@ def create_participant(cls, scope, config, parent=None, **kwargs):
 
     if config.introspection:
         _initialize_introspection()
+    if _metrics_port is not None:
+        _initialize_metrics()
 
     participant = cls(scope, config=config, **kwargs)
     participant_creation_hook.run(participant, parent=parent)
@@ -0,0 +1,131 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Benchmark suite for RSB, available as the ``rsb-bench`` command.
+
+Benchmarks are registered with :obj:`rsb.benchmark.common.benchmark` and
+produce measurements consisting of parameters and metrics. Results of a
+run are written as a JSON document so that different runs can be
+compared.
+
+.. codeauthor:: jmoringe
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from rsb.benchmark import (converters,  # noqa: F401 register benchmarks
+                           eventprocessing,
+                           framing,
+                           rpc,
+                           transports)
+from rsb.benchmark.common import BENCHMARKS, Context
+import rsb.version
+
+
+def run(names=None, context=None, progress=None):
+    """
+    Run benchmarks and return their results.
+
+    Args:
+        names (list of str or None):
+            The names of the benchmarks to run or ``None`` for all
+            benchmarks.
+        context (rsb.benchmark.common.Context or None):
+            The settings for the benchmarks. A default context is used if
+            ``None``.
+        progress (callable or None):
+            If not ``None``, called with the name of each benchmark before
+            it is run.
+
+    Returns:
+        dict:
+            A JSON-compatible document describing the environment and
+            containing one entry per measurement in ``results``.
+
+    Raises:
+        KeyError:
+            If one of ``names`` is not a known benchmark.
+    """
+    if context is None:
+        context = Context()
+    if names is None:
+        names = list(BENCHMARKS)
+    functions = [(name, BENCHMARKS[name]) for name in names]
+
+    results = []
+    for name, function in functions:
+        if progress is not None:
+            progress(name)
+        for measurement in function(context):
+            results.append(dict(measurement, benchmark=name))
+
+    return {'rsb_version': rsb.version.get_version(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'time': time.time(),
+            'scale': context.scale,
+            'results': results}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='rsb-bench',
+        description='Run RSB benchmarks and write the results as JSON.')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help='Names of benchmarks to run. All benchmarks '
+                             'are run if none are given.')
+    parser.add_argument('--list', action='store_true',
+                        help='List available benchmarks and exit.')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Factor for the number of repetitions.')
+    parser.add_argument('--port', type=int, default=55667,
+                        help='TCP port for the socket transport.')
+    parser.add_argument('--output', '-o', default='-',
+                        help='File for the results or - for standard '
+                             'output.')
+    arguments = parser.parse_args(args)
+
+    if arguments.list:
+        for name, function in BENCHMARKS.items():
+            print('{:<22} {}'.format(name, function.__doc__))  # noqa: T001
+        return 0
+
+    unknown = [name for name in arguments.benchmarks
+               if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmark(s): {}'.format(', '.join(unknown)))
+
+    document = run(arguments.benchmarks or None,
+                   Context(scale=arguments.scale, port=arguments.port),
+                   progress=lambda name: print(  # noqa: T001
+                       'Running {}'.format(name), file=sys.stderr))
+    if arguments.output == '-':
+        json.dump(document, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(arguments.output, 'w') as stream:
+            json.dump(document, stream, indent=2)
+    return 0
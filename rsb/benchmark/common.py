@@ -0,0 +1,291 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Registry and helpers shared by the benchmarks.
+
+.. codeauthor:: jmoringe
+"""
+
+import collections
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import rsb
+from rsb.protocol.Notification_pb2 import Notification
+from rsb.transport.socket import BusConnection
+
+BENCHMARKS = collections.OrderedDict()
+
+TRANSPORTS = ('inprocess', 'socket')
+
+
+def benchmark(name):
+    """
+    Register the decorated function as the benchmark ``name``.
+
+    The function is called with a :obj:`Context` and has to return an
+    iterable of measurements. Each measurement is a dictionary with the
+    keys ``parameters`` and ``metrics`` which map to dictionaries of
+    JSON-compatible values.
+
+    Args:
+        name (str):
+            The name under which the benchmark can be selected.
+    """
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+class Context:
+    """
+    Settings for one benchmark run.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, scale=1.0, port=55667):
+        """
+        Create a new context.
+
+        Args:
+            scale (float):
+                Factor applied to the number of repetitions of all
+                measurements.
+            port (int):
+                The TCP port used by benchmarks of the socket transport.
+        """
+        self.scale = scale
+        self.port = port
+
+    def count(self, count):
+        """Return ``count`` scaled by :attr:`scale`, but at least 1."""
+        return max(1, int(count * self.scale))
+
+    def config(self, transport, **options):
+        """
+        Return a configuration which only enables ``transport``.
+
+        Args:
+            transport (str):
+                One of :data:`TRANSPORTS`.
+            options:
+                Additional configuration options.
+
+        Returns:
+            rsb.ParticipantConfig:
+                The configuration.
+        """
+        settings = {'introspection.enabled': '0',
+                    'transport.inprocess.enabled': '0',
+                    'transport.socket.enabled': '0',
+                    'transport.{}.enabled'.format(transport): '1'}
+        if transport == 'socket':
+            settings['transport.socket.port'] = str(self.port)
+        settings.update(options)
+        return rsb.ParticipantConfig.from_dict(settings)
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def summarize(samples):
+    """
+    Return summary statistics of durations in microseconds.
+
+    Args:
+        samples (list of float):
+            The durations in seconds.
+
+    Returns:
+        dict:
+            The number of samples, the mean, the 50th, 90th and 99th
+            percentile and the maximum.
+    """
+    samples = sorted(samples)
+    return {'count': len(samples),
+            'mean': sum(samples) / len(samples) * 1e6,
+            'p50': percentile(samples, 0.5) * 1e6,
+            'p90': percentile(samples, 0.9) * 1e6,
+            'p99': percentile(samples, 0.99) * 1e6,
+            'max': samples[-1] * 1e6}
+
+
+def measure_delivery(informer, listener, payload, count, timeout=60):
+    """
+    Measure throughput and latency from ``informer`` to ``listener``.
+
+    First, ``count`` events are published as fast as possible and the
+    time until all of them have been delivered is measured. Then events
+    are published one at a time, waiting for the delivery of each before
+    publishing the next.
+
+    Args:
+        informer (rsb.Informer):
+            The informer publishing the events.
+        listener (rsb.Listener):
+            A listener receiving the events of ``informer``.
+        payload:
+            The payload of the events.
+        count (int):
+            The number of events for the throughput measurement. The
+            latency measurement uses a tenth of it.
+        timeout (float):
+            The maximum number of seconds to wait for deliveries.
+
+    Returns:
+        dict:
+            The throughput in events per second and the latency summary
+            (see :obj:`summarize`).
+
+    Raises:
+        RuntimeError:
+            If events are not delivered within ``timeout``.
+    """
+    condition = threading.Condition()
+    received = [0]
+
+    def handle(event):
+        with condition:
+            received[0] += 1
+            condition.notify_all()
+
+    def wait_for(target):
+        with condition:
+            if not condition.wait_for(lambda: received[0] >= target,
+                                      timeout):
+                raise RuntimeError(
+                    'Only {} of {} events delivered'.format(
+                        received[0], target))
+
+    listener.add_handler(handle)
+    try:
+        start = time.perf_counter()
+        for _ in range(count):
+            informer.publish_data(payload)
+        wait_for(count)
+        duration = time.perf_counter() - start
+
+        samples = []
+        for index in range(max(1, count // 10)):
+            start = time.perf_counter()
+            informer.publish_data(payload)
+            wait_for(count + index + 1)
+            samples.append(time.perf_counter() - start)
+    finally:
+        listener.remove_handler(handle)
+
+    return {'throughput_per_s': count / duration,
+            'latency_us': summarize(samples)}
+
+
+def make_notification(payload, scope=b'/benchmark/'):
+    """
+    Return a serialized notification carrying ``payload``.
+
+    Args:
+        payload (bytes):
+            The data of the notification.
+        scope (bytes):
+            The scope of the notification.
+
+    Returns:
+        bytes:
+            The serialized notification.
+    """
+    notification = Notification()
+    notification.event_id.sender_id = bytes(16)
+    notification.event_id.sequence_number = 0
+    notification.scope = scope
+    notification.wire_schema = b'bytes'
+    notification.data = payload
+    notification.meta_data.create_time = 0
+    notification.meta_data.send_time = 0
+    return notification.SerializeToString()
+
+
+def connect(family, handler, receiver_class=BusConnection, **options):
+    """
+    Return a pair of connected, active bus connections.
+
+    Args:
+        family (str):
+            Either ``'tcp'`` for TCP loopback or ``'unix'`` for a Unix
+            domain socket.
+        handler (callable):
+            Handler for notifications received by the second connection.
+        receiver_class (type):
+            The class of the second connection.
+        options:
+            Keyword arguments for both :obj:`BusConnection` objects.
+
+    Returns:
+        tuple:
+            The client connection without handlers and the server
+            connection with ``handler``. The client connection is not
+            activated.
+    """
+    path = None
+    if family == 'unix':
+        path = os.path.join(tempfile.mkdtemp(), 'bus.sock')
+        listen_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listen_socket.bind(path)
+    else:
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_socket.bind(('127.0.0.1', 0))
+    listen_socket.listen(1)
+    result = []
+
+    # The server end has to be active to answer extension requests of the
+    # client end.
+    def accept():
+        server_socket, _ = listen_socket.accept()
+        receiver = receiver_class(socket_=server_socket, is_server=True,
+                                  **options)
+        receiver.add_handler(handler)
+        receiver.activate()
+        result.append(receiver)
+    thread = threading.Thread(target=accept)
+    thread.start()
+    if path is None:
+        host, port = listen_socket.getsockname()
+        sender = BusConnection(host, port, **options)
+    else:
+        sender = BusConnection(path=path, **options)
+    thread.join()
+    listen_socket.close()
+    if path is not None:
+        os.unlink(path)
+        os.rmdir(os.path.dirname(path))
+    return sender, result[0]
+
+
+def disconnect(sender, receiver):
+    """Shut down and deactivate connections returned by :obj:`connect`."""
+    sender.shutdown()
+    for connection in (sender, receiver):
+        connection.wait_for_deactivation()
+        connection.deactivate()
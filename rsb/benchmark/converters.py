@@ -0,0 +1,119 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Benchmarks of the converters in :obj:`rsb.converter` and scope parsing.
+
+.. codeauthor:: jmoringe
+"""
+
+import time
+
+import rsb
+from rsb.benchmark.common import benchmark, make_notification
+import rsb.converter
+from rsb.protocol.Notification_pb2 import Notification
+
+SIZES = (16, 4096, 262144)
+
+
+def _notification(size):
+    notification = Notification()
+    notification.ParseFromString(make_notification(bytes(size)))
+    return notification
+
+
+# Converter and a function returning a payload of approximately the
+# given size. Converters for fixed-size types ignore the size.
+CONVERTERS = [
+    (rsb.converter.NoneConverter(), lambda size: None, False),
+    (rsb.converter.DoubleConverter(), lambda size: 1.5, False),
+    (rsb.converter.FloatConverter(), lambda size: 1.5, False),
+    (rsb.converter.Int32Converter(), lambda size: -42, False),
+    (rsb.converter.Uint32Converter(), lambda size: 42, False),
+    (rsb.converter.Int64Converter(), lambda size: -42, False),
+    (rsb.converter.Uint64Converter(), lambda size: 42, False),
+    (rsb.converter.BoolConverter(), lambda size: True, False),
+    (rsb.converter.ScopeConverter(),
+     lambda size: rsb.Scope('/benchmark/converter/scope'), False),
+    (rsb.converter.BytesConverter(), bytes, True),
+    (rsb.converter.StringConverter(), lambda size: 'x' * size, True),
+    (rsb.converter.ByteArrayConverter(), bytes, True),
+    (rsb.converter.SchemaAndByteArrayConverter(),
+     lambda size: ('.benchmark', bytes(size)), True),
+    (rsb.converter.ProtocolBufferConverter(Notification), _notification,
+     True),
+]
+
+
+@benchmark('converters')
+def converters(context):
+    """Measure serialization and deserialization time per payload size."""
+    for converter, make_payload, sized in CONVERTERS:
+        for size in SIZES if sized else (None,):
+            payload = make_payload(size)
+            count = context.count(20000 if not size or size < 65536
+                                  else 500)
+
+            start = time.perf_counter()
+            for _ in range(count):
+                wire_data, wire_schema = converter.serialize(payload)
+            serialize = (time.perf_counter() - start) / count
+
+            start = time.perf_counter()
+            for _ in range(count):
+                converter.deserialize(wire_data, wire_schema)
+            deserialize = (time.perf_counter() - start) / count
+
+            yield {'parameters': {'converter': type(converter).__name__,
+                                  'size': size},
+                   'metrics': {'wire_bytes': len(wire_data),
+                               'serialize_us': serialize * 1e6,
+                               'deserialize_us': deserialize * 1e6}}
+
+
+@benchmark('scope')
+def scope(context):
+    """Measure the time for parsing, concatenating and comparing scopes."""
+    for depth in (1, 4, 16):
+        string = ''.join('/component{}'.format(i) for i in range(depth))
+        count = context.count(50000)
+
+        start = time.perf_counter()
+        for _ in range(count):
+            parsed = rsb.Scope(string)
+        parse = (time.perf_counter() - start) / count
+
+        other = rsb.Scope('/suffix')
+        start = time.perf_counter()
+        for _ in range(count):
+            parsed.concat(other)
+        concat = (time.perf_counter() - start) / count
+
+        root = rsb.Scope('/component0')
+        start = time.perf_counter()
+        for _ in range(count):
+            parsed.is_sub_scope_of(root)
+        sub_scope = (time.perf_counter() - start) / count
+
+        yield {'parameters': {'depth': depth},
+               'metrics': {'parse_us': parse * 1e6,
+                           'concat_us': concat * 1e6,
+                           'is_sub_scope_of_us': sub_scope * 1e6}}
@@ -0,0 +1,60 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Benchmarks of the event receiving strategies.
+
+.. codeauthor:: jmoringe
+"""
+
+import rsb
+from rsb.benchmark.common import benchmark, measure_delivery
+from rsb.eventprocessing import (DirectEventReceivingStrategy,
+                                 FullyParallelEventReceivingStrategy,
+                                 NonQueuingParallelEventReceivingStrategy,
+                                 ParallelEventReceivingStrategy)
+
+STRATEGIES = {
+    'direct': DirectEventReceivingStrategy,
+    'parallel': ParallelEventReceivingStrategy,
+    'fully-parallel': lambda: FullyParallelEventReceivingStrategy(
+        capacity=16, max_threads=16),
+    'non-queuing-parallel': NonQueuingParallelEventReceivingStrategy,
+}
+
+
+@benchmark('receiving-strategies')
+def receiving_strategies(context):
+    """Measure delivery throughput and latency per receiving strategy."""
+    config = context.config('inprocess')
+    for name, make_strategy in sorted(STRATEGIES.items()):
+        for handlers in (1, 4):
+            scope = '/benchmark/strategy'
+            with rsb.create_listener(
+                    scope, config,
+                    receiving_strategy=make_strategy()) as listener, \
+                    rsb.create_informer(scope, config,
+                                        data_type=int) as informer:
+                for _ in range(handlers - 1):
+                    listener.add_handler(lambda event: None)
+                metrics = measure_delivery(informer, listener, 0,
+                                           context.count(5000))
+            yield {'parameters': {'strategy': name, 'handlers': handlers},
+                   'metrics': metrics}
@@ -0,0 +1,151 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Benchmarks of the framing layer of the socket transport.
+
+Notifications are sent directly through pairs of
+:obj:`rsb.transport.socket.BusConnection` objects, bypassing buses and
+participants.
+
+.. codeauthor:: jmoringe
+"""
+
+import array
+import math
+import os
+import threading
+import time
+
+from rsb.benchmark.common import (benchmark,
+                                  connect,
+                                  disconnect,
+                                  make_notification,
+                                  summarize)
+from rsb.transport.socket import BusConnection, EXTENSION_ZLIB
+
+
+@benchmark('socket-latency')
+def socket_latency(context):
+    """Measure round trips through TCP loopback and Unix domain sockets."""
+    for size in (64, 4096, 65536):
+        for family in ('tcp', 'unix'):
+            samples = _echo(family, bytes(size), context.count(1000))
+            yield {'parameters': {'family': family, 'size': size},
+                   'metrics': {'round_trip_us': summarize(samples)}}
+
+
+def _echo(family, payload, count):
+    # The echoing end sends each notification back through its own
+    # connection.
+    echo = []
+    sender, receiver = connect(
+        family, lambda notification: echo[0].handle(notification))
+    echo.append(receiver)
+    returned = threading.Semaphore(0)
+    sender.add_handler(lambda notification: returned.release())
+    sender.activate()
+    serialized = make_notification(payload)
+
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        sender.send_notification(serialized)
+        returned.acquire()
+        samples.append(time.perf_counter() - start)
+
+    disconnect(sender, receiver)
+    return samples
+
+
+def image_payload(size):
+    # Smooth gradient with a little noise, like a camera image.
+    noise = os.urandom(size)
+    return bytes((index // 64 + (noise[index] & 0x03)) & 0xff
+                 for index in range(size))
+
+
+def point_cloud_payload(size):
+    # Points on a wavy surface as float32 x, y, z triples.
+    count = size // 12
+    width = max(1, int(math.sqrt(count)))
+    points = array.array('f')
+    for index in range(count):
+        x, y = index % width * 0.01, index // width * 0.01
+        points.extend((x, y, math.sin(x) * math.cos(y)))
+    return points.tobytes()[:size]
+
+
+def random_payload(size):
+    return os.urandom(size)
+
+
+PAYLOADS = {'image': image_payload,
+            'pointcloud': point_cloud_payload,
+            'random': random_payload}
+
+
+class CountingConnection(BusConnection):
+
+    def __init__(self, *args, **kwargs):
+        self.wire_bytes = 0
+        super().__init__(*args, **kwargs)
+
+    def receive_frame(self):
+        flags, payload = super().receive_frame()
+        self.wire_bytes += len(payload) + (5 if self.extensions else 4)
+        return flags, payload
+
+
+@benchmark('socket-compression')
+def socket_compression(context):
+    """Measure wire bytes and CPU time with and without compression."""
+    for name, make_payload in sorted(PAYLOADS.items()):
+        for size in (4096, 65536):
+            payload = make_payload(size)
+            for extensions in [(), (EXTENSION_ZLIB,)]:
+                wire, wall, cpu = _compress(payload, context.count(50),
+                                            extensions)
+                yield {'parameters': {'payload': name, 'size': size,
+                                      'compression': bool(extensions)},
+                       'metrics': {'wire_bytes': wire,
+                                   'ratio': wire / size,
+                                   'wall_us': wall * 1e6,
+                                   'cpu_us': cpu * 1e6}}
+
+
+def _compress(payload, count, extensions):
+    received = threading.Semaphore(0)
+    sender, receiver = connect(
+        'tcp', lambda notification: received.release(),
+        receiver_class=CountingConnection, extensions=extensions)
+    sender.activate()
+    serialized = make_notification(payload)
+
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    for _ in range(count):
+        sender.send_notification(serialized)
+    for _ in range(count):
+        received.acquire()
+    wall = time.perf_counter() - start_wall
+    cpu = time.process_time() - start_cpu
+
+    disconnect(sender, receiver)
+    return receiver.wire_bytes / count, wall / count, cpu / count
@@ -0,0 +1,61 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Benchmarks of remote procedure calls through :obj:`rsb.patterns`.
+
+.. codeauthor:: jmoringe
+"""
+
+import time
+
+import rsb
+from rsb.benchmark.common import benchmark, summarize, TRANSPORTS
+
+
+@benchmark('rpc')
+def rpc(context):
+    """Measure synchronous call latency and pipelined call throughput."""
+    for transport in TRANSPORTS:
+        config = context.config(transport)
+        for size in (16, 65536):
+            scope = '/benchmark/rpc'
+            with rsb.create_local_server(
+                    scope, config,
+                    methods=[('echo', lambda x: x, bytes, bytes)]), \
+                    rsb.create_remote_server(scope, config) as remote:
+                payload = bytes(size)
+                remote.echo(payload, timeout=10)  # Create participants
+
+                samples = []
+                for _ in range(context.count(500)):
+                    start = time.perf_counter()
+                    remote.echo(payload, timeout=10)
+                    samples.append(time.perf_counter() - start)
+
+                count = context.count(2000)
+                start = time.perf_counter()
+                for _ in remote.echo.map([payload] * count, timeout=10):
+                    pass
+                pipelined = count / (time.perf_counter() - start)
+
+            yield {'parameters': {'transport': transport, 'size': size},
+                   'metrics': {'round_trip_us': summarize(samples),
+                               'pipelined_calls_per_s': pipelined}}
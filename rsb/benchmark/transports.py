@@ -0,0 +1,108 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Benchmarks of participants communicating through the transports.
+
+.. codeauthor:: jmoringe
+"""
+
+import time
+
+import rsb
+from rsb.benchmark.common import (benchmark,
+                                  measure_delivery,
+                                  summarize,
+                                  TRANSPORTS)
+
+
+@benchmark('publish')
+def publish(context):
+    """Measure publish to deliver throughput and latency per transport."""
+    for transport in TRANSPORTS:
+        config = context.config(transport)
+        for size in (16, 4096, 262144):
+            scope = '/benchmark/publish'
+            with rsb.create_listener(scope, config) as listener, \
+                    rsb.create_informer(scope, config,
+                                        data_type=bytes) as informer:
+                metrics = measure_delivery(informer, listener, bytes(size),
+                                           context.count(2000))
+            yield {'parameters': {'transport': transport, 'size': size},
+                   'metrics': metrics}
+
+
+@benchmark('reader-batch')
+def reader_batch(context):
+    """Compare per-event and batched pulls from a :obj:`rsb.Reader`."""
+    config = context.config('inprocess')
+    count = context.count(100000)
+    for batch_size in (1, 16, 256):
+        scope = '/benchmark/reader'
+        with rsb.create_reader(scope, config=config) as reader, \
+                rsb.create_informer(scope, config=config,
+                                    data_type=int) as informer:
+            for i in range(count):
+                informer.publish_data(i)
+
+            start = time.perf_counter()
+            received = 0
+            while received < count:
+                if batch_size == 1:
+                    reader.read()
+                    received += 1
+                else:
+                    received += len(reader.read_many(batch_size))
+            duration = time.perf_counter() - start
+        yield {'parameters': {'batch_size': batch_size},
+               'metrics': {'throughput_per_s': count / duration}}
+
+
+PARTICIPANTS = {
+    'informer': lambda scope, config: rsb.create_informer(
+        scope, config, data_type=bytes),
+    'listener': rsb.create_listener,
+    'reader': rsb.create_reader,
+    'local-server': rsb.create_local_server,
+    'remote-server': rsb.create_remote_server,
+}
+
+
+@benchmark('participants')
+def participants(context):
+    """Measure the time for creating and deactivating participants."""
+    for transport in TRANSPORTS:
+        config = context.config(transport)
+        # Keep one participant alive so that the measurements do not
+        # include setting up the transport itself.
+        with rsb.create_informer('/benchmark/keepalive', config):
+            for kind, create in sorted(PARTICIPANTS.items()):
+                creation, deactivation = [], []
+                for _ in range(context.count(200)):
+                    start = time.perf_counter()
+                    participant = create('/benchmark/participant', config)
+                    middle = time.perf_counter()
+                    participant.deactivate()
+                    creation.append(middle - start)
+                    deactivation.append(time.perf_counter() - middle)
+                yield {'parameters': {'transport': transport,
+                                      'participant': kind},
+                       'metrics': {'create_us': summarize(creation),
+                                   'deactivate_us': summarize(deactivation)}}
@@ -32,6 +32,8 @@ import queue
 import threading
 
 import rsb.filter
+import rsb.metrics
+import rsb.tracing
 import rsb.util
 
 
@@ -166,6 +168,30 @@ class EventReceivingStrategy(metaclass=abc.ABCMeta):
     .. codeauthor:: jwienke
     """
 
+    @property
+    def dropped(self):
+        """
+        Return the number of events dropped because buffers were full.
+
+        Returns:
+            int:
+                The number of dropped events. Strategies without bounded
+                buffers always return zero.
+        """
+        return 0
+
+    @property
+    def queued(self):
+        """
+        Return the number of events waiting to be processed.
+
+        Returns:
+            int:
+                The number of queued events. Strategies without buffers
+                always return zero.
+        """
+        return 0
+
 
 class PushEventReceivingStrategy(EventReceivingStrategy):
     """
@@ -208,7 +234,7 @@ class PullEventReceivingStrategy(EventReceivingStrategy):
         pass
 
     @abc.abstractmethod
-    def raise_event(self, block):
+    def raise_event(self, block, timeout=None):
         """
         Receive the next event.
 
@@ -216,9 +242,39 @@ class PullEventReceivingStrategy(EventReceivingStrategy):
             block (bool):
                 if ``True``, wait for the next event. Else, immediately return,
                 potentially a ``None``.
+            timeout (float or None):
+                If ``block`` is ``True``, the maximum time in seconds to wait
+                for the next event. ``None`` means waiting indefinitely.
         """
         pass
 
+    def raise_events(self, max_count, timeout=None):
+        """
+        Receive up to ``max_count`` events.
+
+        Only waits for the first event. Subclasses should override this
+        method if their connectors can provide multiple events at once.
+
+        Args:
+            max_count (int):
+                The maximum number of returned events.
+            timeout (float or None):
+                The maximum time in seconds to wait for the first event.
+                ``None`` means waiting indefinitely, zero means not waiting.
+
+        Returns:
+            list:
+                The received events, possibly empty.
+        """
+        events = []
+        event = self.raise_event(timeout != 0, timeout)
+        while event is not None:
+            events.append(event)
+            if len(events) >= max_count:
+                break
+            event = self.raise_event(False)
+        return events
+
 
 class FirstConnectorPullEventReceivingStrategy(PullEventReceivingStrategy):
     """
@@ -232,14 +288,84 @@ class FirstConnectorPullEventReceivingStrategy(PullEventReceivingStrategy):
             raise ValueError("There must be at least on connector")
         self._connectors = connectors
 
-    def raise_event(self, block):
+    def raise_event(self, block, timeout=None):
         assert self._connectors
 
-        event = self._connectors[0].raise_event(block)
+        if timeout is None:
+            event = self._connectors[0].raise_event(block)
+        else:
+            event = self._connectors[0].raise_event(block, timeout)
         if event:
             event.meta_data.set_deliver_time()
         return event
 
+    @property
+    def dropped(self):
+        return getattr(self._connectors[0], 'dropped', 0)
+
+    @property
+    def queued(self):
+        return getattr(self._connectors[0], 'queued', 0)
+
+    def raise_events(self, max_count, timeout=None):
+        assert self._connectors
+
+        events = self._connectors[0].read_many(max_count, timeout)
+        for event in events:
+            event.meta_data.set_deliver_time()
+        return events
+
+
+class DirectEventReceivingStrategy(PushEventReceivingStrategy):
+    """
+    Dispatches events to handlers in the thread which delivers them.
+
+    An :obj:`PushEventReceivingStrategy` that uses neither queues nor
+    threads. Handlers delay the delivering transport and should
+    therefore return quickly, for example by handing events to a queue.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self):
+        self._filters = []
+        self._handlers = []
+        self._mutex = threading.Lock()
+
+    def deactivate(self):
+        pass
+
+    def handle(self, event):
+        event.meta_data.set_deliver_time()
+        rsb.tracing.mark(event, 'enqueue')
+        # The lists are replaced instead of modified and can thus be
+        # used without locking.
+        for f in self._filters:
+            if not f.match(event):
+                return
+        traced = event.trace is not None
+        for handler in self._handlers:
+            if traced:
+                rsb.tracing.call_handler(handler, event)
+            else:
+                handler(event)
+
+    def add_handler(self, handler, wait):
+        with self._mutex:
+            self._handlers = self._handlers + [handler]
+
+    def remove_handler(self, handler, wait):
+        with self._mutex:
+            self._handlers = [h for h in self._handlers if h != handler]
+
+    def add_filter(self, the_filter):
+        with self._mutex:
+            self._filters = self._filters + [the_filter]
+
+    def remove_filter(self, the_filter):
+        with self._mutex:
+            self._filters = [f for f in self._filters if f != the_filter]
+
 
 class ParallelEventReceivingStrategy(PushEventReceivingStrategy):
     """
@@ -249,15 +375,20 @@ class ParallelEventReceivingStrategy(PushEventReceivingStrategy):
     handlers in individual threads in parallel. Each handler is called only
     sequentially but potentially from different threads.
 
+    Each handler has a queue of pending events which holds at most
+    ``capacity`` events. ``overflow`` selects what happens to events which
+    do not fit (see :obj:`rsb.util.BoundedQueue`).
+
     .. codeauthor:: jwienke
     """
 
-    def __init__(self, num_threads=5):
+    def __init__(self, num_threads=5, capacity=0, overflow='drop-oldest'):
         self._logger = rsb.util.get_logger_by_class(self.__class__)
         self._pool = rsb.util.OrderedQueueDispatcherPool(
             thread_pool_size=num_threads, del_func=self._deliver,
-            filter_func=self._filter)
+            filter_func=self._filter, capacity=capacity, overflow=overflow)
         self._pool.start()
+        self._dropped = 0
         self._filters = []
         self._filtersMutex = threading.RLock()
 
@@ -265,14 +396,32 @@ class ParallelEventReceivingStrategy(PushEventReceivingStrategy):
         self._logger.debug("Destructing ParallelEventReceivingStrategy")
         self.deactivate()
 
+    @property
+    def dropped(self):
+        pool = self._pool
+        if pool is None:
+            return self._dropped
+        return pool.dropped
+
+    @property
+    def queued(self):
+        pool = self._pool
+        if pool is None:
+            return 0
+        return pool.queued
+
     def deactivate(self):
         self._logger.debug("Deactivating ParallelEventReceivingStrategy")
         if self._pool:
             self._pool.stop()
+            self._dropped = self._pool.dropped
             self._pool = None
 
     def _deliver(self, action, event):
-        action(event)
+        if event.trace is None:
+            action(event)
+        else:
+            rsb.tracing.call_handler(action, event)
 
     def _filter(self, action, event):
         with self._filtersMutex:
@@ -290,10 +439,19 @@ class ParallelEventReceivingStrategy(PushEventReceivingStrategy):
         Args:
             event:
                 event to dispatch
+
+        Raises:
+            queue.Full:
+                If the queue of a handler is full and the overflow policy
+                is ``raise``.
         """
         self._logger.debug("Processing event %s", event)
+        pool = self._pool
+        if pool is None:
+            return
         event.meta_data.set_deliver_time()
-        self._pool.push(event)
+        rsb.tracing.mark(event, 'enqueue')
+        pool.push(event)
 
     def add_handler(self, handler, wait):
         # We can ignore wait since the pool implements the desired
@@ -322,33 +480,85 @@ class FullyParallelEventReceivingStrategy(PushEventReceivingStrategy):
     handlers in individual threads in parallel. Each handler can be called
     in parallel for different requests.
 
+    If ``max_threads`` is not zero, at most ``max_threads`` handler calls
+    run in parallel and further calls wait in a queue for a free thread.
+    If ``capacity`` is not zero, at most ``capacity`` calls wait in the
+    queue and ``overflow`` selects what happens to calls which do not fit
+    into it (see :obj:`rsb.util.BoundedQueue`).
+
     .. codeauthor:: jwienke
     """
 
-    def __init__(self):
+    def __init__(self, capacity=0, overflow='drop-oldest', max_threads=0):
         self._logger = rsb.util.get_logger_by_class(self.__class__)
         self._filters = []
         self._mutex = threading.RLock()
         self._handlers = []
+        self._max_threads = max_threads
+        self._pending = rsb.util.BoundedQueue(capacity, overflow)
+        self._running = 0
+
+    @property
+    def dropped(self):
+        return self._pending.dropped
+
+    @property
+    def queued(self):
+        return len(self._pending)
 
     def deactivate(self):
-        pass
+        # Release publishers waiting for space in the queue.
+        self._pending.close()
 
     class Worker(threading.Thread):
 
-        def __init__(self, handler, event, filters):
+        def __init__(self, strategy, handler, event, filters):
             super().__init__(name='DispatcherThread')
+            self.strategy = strategy
             self.handler = handler
             self.event = event
             self.filters = filters
 
         def run(self):
-
-            for f in self.filters:
-                if not f.match(self.event):
+            job = (self.handler, self.event, self.filters)
+            while job is not None:
+                self.process(*job)
+                job = self.strategy._next_job()
+
+        @staticmethod
+        def process(handler, event, filters):
+            for f in filters:
+                if not f.match(event):
                     return
 
-            self.handler(self.event)
+            if event.trace is None:
+                handler(event)
+            else:
+                rsb.tracing.call_handler(handler, event)
+
+    def _next_job(self):
+        # Either hand a queued call to the calling worker or let the
+        # worker terminate.
+        with self._mutex:
+            try:
+                return self._pending.get(False)
+            except queue.Empty:
+                self._running -= 1
+                return None
+
+    def _start_workers(self):
+        # Start workers for queued calls if there are free threads.
+        workers = []
+        with self._mutex:
+            while self._running < self._max_threads:
+                try:
+                    job = self._pending.get(False)
+                except queue.Empty:
+                    break
+                self._running += 1
+                workers.append(self.Worker(self, *job))
+        for w in workers:
+            w.start()
 
     def handle(self, event):
         """
@@ -357,15 +567,35 @@ class FullyParallelEventReceivingStrategy(PushEventReceivingStrategy):
         Args:
             event:
                 event to dispatch
+
+        Raises:
+            queue.Full:
+                If the queue is full and the overflow policy is ``raise``.
         """
         self._logger.debug("Processing event %s", event)
         event.meta_data.set_deliver_time()
+        rsb.tracing.mark(event, 'enqueue')
         workers = []
+        queued = []
         with self._mutex:
             for h in self._handlers:
-                workers.append(self.Worker(h, event, list(self._filters)))
+                if not self._max_threads \
+                        or self._running < self._max_threads:
+                    self._running += 1
+                    workers.append(
+                        self.Worker(self, h, event, list(self._filters)))
+                else:
+                    queued.append((h, event, list(self._filters)))
         for w in workers:
             w.start()
+        if queued:
+            # Queue outside of the lock since putting into a full queue
+            # may block until a worker makes room.
+            try:
+                for job in queued:
+                    self._pending.put(job)
+            finally:
+                self._start_workers()
 
     def add_handler(self, handler, wait):
         # We can ignore wait since the pool implements the desired
@@ -411,6 +641,10 @@ class NonQueuingParallelEventReceivingStrategy(PushEventReceivingStrategy):
         self._thread = threading.Thread(target=self._work)
         self._thread.start()
 
+    @property
+    def queued(self):
+        return self._queue.qsize()
+
     def deactivate(self):
         self._interrupted = True
         self._queue.put(None, True)
@@ -433,11 +667,15 @@ class NonQueuingParallelEventReceivingStrategy(PushEventReceivingStrategy):
                     if not f.match(event):
                         return
                 for handler in self._handlers:
-                    handler(event)
+                    if event.trace is None:
+                        handler(event)
+                    else:
+                        rsb.tracing.call_handler(handler, event)
 
     def handle(self, event):
         self._logger.debug("Processing event %s", event)
         event.meta_data.set_deliver_time()
+        rsb.tracing.mark(event, 'enqueue')
         self._queue.put(event, True)
 
     def add_handler(self, handler, wait):
@@ -476,6 +714,10 @@ class EventSendingStrategy(metaclass=abc.ABCMeta):
     def handle(self, event):
         pass
 
+    def handle_batch(self, events):
+        for event in events:
+            self.handle(event)
+
 
 class DirectEventSendingStrategy(EventSendingStrategy):
 
@@ -496,6 +738,10 @@ class DirectEventSendingStrategy(EventSendingStrategy):
         for connector in self._connectors:
             connector.handle(event)
 
+    def handle_batch(self, events):
+        for connector in self._connectors:
+            connector.handle_batch(events)
+
 
 class Configurator:
     """
@@ -558,6 +804,18 @@ class Configurator:
         """
         return {x.get_transport_url() for x in self._connectors}
 
+    @property
+    def payload_bytes(self):
+        """
+        Return the number of payload bytes transferred by the connectors.
+
+        Returns:
+            int:
+                The sum of :obj:`rsb.transport.Connector.payload_bytes`
+                over all connectors.
+        """
+        return sum(x.payload_bytes for x in self._connectors)
+
     @property
     def active(self):
         return self._active
@@ -619,16 +877,45 @@ class InPushRouteConfigurator(Configurator):
         else:
             self._receiving_strategy = receiving_strategy
 
+        self._received = rsb.metrics.Counter()
         for connector in self.connectors:
-            connector.set_observer_action(self._receiving_strategy.handle)
+            connector.set_observer_action(self._handle)
 
-    def deactivate(self):
-        super().deactivate()
+    @property
+    def received(self):
+        """
+        Return the number of events received from the connectors.
+
+        Returns:
+            int:
+                The number of received events including dropped and
+                filtered ones.
+        """
+        return self._received.value
+
+    @property
+    def dropped(self):
+        return self._receiving_strategy.dropped
 
+    @property
+    def queued(self):
+        return self._receiving_strategy.queued
+
+    def _handle(self, event):
+        self._received.inc()
+        self._receiving_strategy.handle(event)
+
+    def deactivate(self):
+        # Detach and deactivate the receiving strategy first: a
+        # connector may be blocked delivering an event to a full queue
+        # of the strategy while holding locks which deactivating the
+        # connector requires.
         for connector in self.connectors:
             connector.set_observer_action(None)
         self._receiving_strategy.deactivate()
 
+        super().deactivate()
+
     def handler_added(self, handler, wait):
         self._receiving_strategy.add_handler(handler, wait)
 
@@ -679,6 +966,14 @@ class InPullRouteConfigurator(Configurator):
             self._receiving_strategy = receiving_strategy
         self._receiving_strategy.set_connectors(connectors)
 
+    @property
+    def dropped(self):
+        return self._receiving_strategy.dropped
+
+    @property
+    def queued(self):
+        return self._receiving_strategy.queued
+
     def get_receiving_strategy(self):
         return self._receiving_strategy
 
@@ -713,3 +1008,10 @@ class OutRouteConfigurator(Configurator):
 
         self._logger.debug("Publishing event: %s", event)
         self._sending_strategy.handle(event)
+
+    def handle_batch(self, events):
+        if not self.active:
+            raise RuntimeError("Trying to publish events on Configurator "
+                               "which is not active.")
+
+        self._sending_strategy.handle_batch(events)
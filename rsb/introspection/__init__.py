@@ -27,18 +27,27 @@ and thus built on top of "ordinary" RSB communication.
 This package implements the "local introspection" (i.e. introspection
 sender) part of the introspection architecture.
 
+In addition to the hello, bye and pong messages of the introspection
+protocol, the sender can periodically publish performance statistics of
+participants whose configuration sets the ``introspection.statistics``
+option (see :obj:`IntrospectionSender.send_statistics`).
+
 .. codeauthor:: jmoringe
 """
 
 import copy
 import getpass
+import json
 import os
 import platform
 import sys
+import threading
+import time
 import uuid
 
 import rsb
 import rsb.converter
+import rsb.metrics
 from rsb.protocol.introspection.Bye_pb2 import Bye
 from rsb.protocol.introspection.Hello_pb2 import Hello
 from rsb.util import get_logger_by_class
@@ -465,6 +474,122 @@ class HostInfo:
     def __repr__(self):
         return str(self)
 
+# Statistics
+
+
+def _sum_metrics(samples, suffixes):
+    return sum(value for name, value in samples.items()
+               if name.endswith(suffixes))
+
+
+class ParticipantStatistics:
+    """
+    Computes performance statistics of one participant.
+
+    The statistics are derived from the metrics which participants
+    register in the :obj:`rsb.metrics` registry. Totals are read from the
+    metrics and rates are computed from the difference to the previous
+    update, so that the statistics cause no work in the event processing
+    itself.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, interval, now=None):
+        """
+        Create statistics which are updated every ``interval`` seconds.
+
+        Args:
+            interval (float):
+                The interval between updates in seconds.
+            now (float or NoneType):
+                The current :func:`time.monotonic` time.
+        """
+        if now is None:
+            now = time.monotonic()
+        self._interval = interval
+        self._time = now
+        self._due = now + interval
+        self._events = 0
+        self._bytes = 0
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @property
+    def due(self):
+        """
+        Return the time of the next update.
+
+        Returns:
+            float:
+                The :func:`time.monotonic` time.
+        """
+        return self._due
+
+    def update(self, samples, now=None):
+        """
+        Compute the statistics from ``samples`` and schedule the next update.
+
+        Args:
+            samples (dict):
+                Maps names of metrics of the participant to their values.
+            now (float or NoneType):
+                The current :func:`time.monotonic` time.
+
+        Returns:
+            dict or NoneType:
+                The statistics described in
+                :obj:`IntrospectionSender.send_statistics` or ``None`` if
+                ``samples`` is empty, for example because the participant
+                has no metrics or is being deactivated.
+        """
+        if now is None:
+            now = time.monotonic()
+        # Skip missed updates instead of publishing them in a burst.
+        self._due = max(self._due + self._interval, now)
+        if not samples:
+            return None
+
+        events = _sum_metrics(samples, ('_events_published_total',
+                                        '_events_received_total',
+                                        '_events_read_total'))
+        payload_bytes = _sum_metrics(samples, ('_bytes_published_total',
+                                               '_bytes_received_total'))
+        elapsed = now - self._time
+
+        result = {
+            'interval': elapsed,
+            'events_total': events,
+            'events_per_second':
+                (events - self._events) / elapsed if elapsed > 0 else 0.0,
+            'bytes_total': payload_bytes,
+            'bytes_per_second':
+                (payload_bytes - self._bytes) / elapsed
+                if elapsed > 0 else 0.0,
+            'queued_events': _sum_metrics(samples, ('_queued_events',)),
+            'dropped_events_total':
+                _sum_metrics(samples, ('_events_dropped_total',))}
+        duration = samples.get('rsb_listener_handler_duration_seconds')
+        if duration is not None:
+            result['handler_duration_seconds'] = duration.summary()
+
+        self._time = now
+        self._events = events
+        self._bytes = payload_bytes
+        return result
+
+
+def _participant_samples():
+    result = {}
+    for name, _, _, samples in rsb.metrics.get_registry().collect():
+        for labels, value in samples:
+            participant_id = labels.get('participant')
+            if participant_id is not None:
+                result.setdefault(participant_id, {})[name] = value
+    return result
+
 # IntrospectionSender
 
 
@@ -492,6 +617,11 @@ class IntrospectionSender:
     process itself and the local host to receivers of introspection
     information.
 
+    For participants whose configuration sets a positive
+    :obj:`rsb.ParticipantConfig.introspection_statistics` interval, a
+    background thread publishes performance statistics at that interval
+    (see :obj:`send_statistics`).
+
     Instances need to be notified of created and destroyed
     participants via calls of the :obj:`add_participant` and
     :obj:`remove_participant` methods.
@@ -504,6 +634,10 @@ class IntrospectionSender:
 
         self._participants = []
 
+        self._statistics = {}
+        self._statistics_condition = threading.Condition()
+        self._statistics_thread = None
+
         self._process = ProcessInfo()
         self._host = HostInfo()
 
@@ -567,6 +701,12 @@ class IntrospectionSender:
                                 reply_type=rsb.Event)
 
     def deactivate(self):
+        with self._statistics_condition:
+            thread, self._statistics_thread = self._statistics_thread, None
+            self._statistics_condition.notify_all()
+        if thread is not None:
+            thread.join()
+
         self._listener.deactivate()
         self._informer.deactivate()
         self._server.deactivate()
@@ -604,6 +744,10 @@ class IntrospectionSender:
 
         self.send_hello(info)
 
+        interval = participant.config.introspection_statistics
+        if interval:
+            self._add_statistics(info, interval)
+
     def remove_participant(self, participant):
         removed = None
         for p in self._participants:
@@ -613,6 +757,8 @@ class IntrospectionSender:
 
         if removed is not None:
             self._participants.remove(removed)
+            with self._statistics_condition:
+                self._statistics.pop(removed.participant_id, None)
             self.send_bye(removed)
 
         return bool(self._participants)
@@ -680,6 +826,92 @@ class IntrospectionSender:
             pong_event.add_cause(query.event_id)
         self._informer.publish_event(pong_event)
 
+    def send_statistics(self, participant, statistics):
+        """
+        Publish performance statistics of ``participant``.
+
+        Statistics are published on the scope of the participant with the
+        method ``STATISTICS``. The payload is a JSON object with the
+        entries
+
+        ``interval``
+          Seconds since the previous statistics of the participant.
+        ``events_total``, ``events_per_second``
+          Events published, received or read, respectively.
+        ``bytes_total``, ``bytes_per_second``
+          Serialized payload bytes. Zero for transports which do not
+          serialize events.
+        ``queued_events``
+          Events waiting to be processed or read.
+        ``dropped_events_total``
+          Events dropped because queues were full.
+        ``handler_duration_seconds``
+          For listeners, a summary of the durations of handler calls (see
+          :meth:`rsb.util.Histogram.summary`).
+
+        Args:
+            participant (ParticipantInfo):
+                The participant.
+            statistics (dict):
+                The statistics as computed by
+                :meth:`ParticipantStatistics.update`.
+        """
+        scope = participant_scope(
+            participant.participant_id, self._informer.scope)
+        statistics_event = rsb.Event(
+            scope=scope,
+            method='STATISTICS',
+            data=json.dumps(statistics, sort_keys=True),
+            data_type=str)
+        self._informer.publish_event(statistics_event)
+
+    def _add_statistics(self, participant, interval):
+        with self._statistics_condition:
+            self._statistics[participant.participant_id] = (
+                participant, ParticipantStatistics(interval))
+            if self._statistics_thread is None:
+                self._statistics_thread = threading.Thread(
+                    target=self._publish_statistics,
+                    name='IntrospectionStatistics',
+                    daemon=True)
+                self._statistics_thread.start()
+            self._statistics_condition.notify_all()
+
+    def _publish_statistics(self):
+        condition = self._statistics_condition
+        while True:
+            with condition:
+                if self._statistics_thread is not threading.current_thread():
+                    return
+                now = time.monotonic()
+                due = [(participant, statistics)
+                       for participant, statistics
+                       in self._statistics.values()
+                       if statistics.due <= now]
+                if not due:
+                    timeout = None
+                    if self._statistics:
+                        timeout = min(statistics.due for _, statistics
+                                      in self._statistics.values()) - now
+                    condition.wait(timeout)
+                    continue
+                samples = _participant_samples()
+                updates = []
+                for participant, statistics in due:
+                    participant_samples = samples.get(
+                        str(participant.participant_id), {})
+                    updates.append((participant, statistics.update(
+                        participant_samples, now)))
+            for participant, update in updates:
+                if update is None:
+                    continue
+                try:
+                    self.send_statistics(participant, update)
+                except Exception:
+                    self._logger.warning(
+                        'Could not publish statistics of %s',
+                        participant, exc_info=True)
+
 
 _sender = None
 
@@ -0,0 +1,436 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+A registry of runtime metrics and their export in Prometheus text format.
+
+Participants, buses and connections register metrics in the registry
+returned by :func:`get_registry` while they are active. The current
+values can be obtained as a dictionary via :meth:`Registry.snapshot` or as
+text in the Prometheus exposition format via
+:meth:`Registry.prometheus_text`, which :func:`start_http_server` serves
+over HTTP. The server is started automatically for the first participant
+if the ``metrics.port`` configuration option is set.
+
+Most metrics are computed from counts which components maintain anyway
+and only read when the metrics are collected. Other counters lock only
+for the duration of an addition.
+
+.. codeauthor:: jmoringe
+"""
+
+import http.server
+import math
+import socketserver
+import threading
+
+import rsb.util
+
+
+class Counter:
+    """
+    A monotonically increasing count.
+
+    .. codeauthor:: jmoringe
+    """
+
+    type = 'counter'  # noqa: A003
+
+    def __init__(self, function=None):
+        """
+        Create a new counter.
+
+        Args:
+            function (callable or None):
+                If not ``None``, a function returning the current count
+                which is called whenever the value is read. Calling
+                :meth:`inc` is not allowed in this case.
+        """
+        self._function = function
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self):
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+    def inc(self, amount=1):
+        """
+        Increase the count by ``amount``.
+
+        Args:
+            amount (int or float):
+                A non-negative amount.
+        """
+        with self._lock:
+            self._value += amount
+
+
+class Gauge:
+    """
+    A value that can go up and down, like the length of a queue.
+
+    .. codeauthor:: jmoringe
+    """
+
+    type = 'gauge'  # noqa: A003
+
+    def __init__(self, function=None):
+        """
+        Create a new gauge.
+
+        Args:
+            function (callable or None):
+                If not ``None``, a function returning the current value
+                which is called whenever the value is read.
+        """
+        self._function = function
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self):
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+    def set(self, value):  # noqa: A003
+        self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+
+class Histogram:
+    """
+    The distribution of observed values, for example durations.
+
+    .. codeauthor:: jmoringe
+    """
+
+    type = 'histogram'  # noqa: A003
+
+    def __init__(self):
+        self._histogram = rsb.util.Histogram()
+        self._lock = threading.Lock()
+
+    @property
+    def value(self):
+        """
+        Return a copy of the recorded distribution.
+
+        Returns:
+            rsb.util.Histogram:
+                The copy.
+        """
+        with self._lock:
+            return self._histogram.copy()
+
+    def record(self, value):
+        with self._lock:
+            self._histogram.record(value)
+
+
+class Registry:
+    """
+    Holds named and labeled metrics.
+
+    Metrics with the same name form a family and have to be of the same
+    type. Within a family, metrics are distinguished by their labels.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}
+
+    def add(self, name, description, metric, **labels):
+        """
+        Register ``metric`` under ``name`` and ``labels``.
+
+        A metric registered previously under the same name and labels is
+        replaced.
+
+        Args:
+            name (str):
+                The name of the metric family, for example
+                ``rsb_events_published_total``.
+            description (str):
+                A description of the metric family.
+            metric (Counter or Gauge or Histogram):
+                The metric.
+            labels:
+                Label names and string values.
+
+        Returns:
+            The registered metric.
+
+        Raises:
+            ValueError:
+                If the family ``name`` contains metrics of a different type.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = (metric.type, description, {})
+            elif family[0] != metric.type:
+                raise ValueError(
+                    'Metric family {} is of type {}, not {}'.format(
+                        name, family[0], metric.type))
+            family[2][key] = metric
+        return metric
+
+    def counter(self, name, description, **labels):
+        """Create and register a :obj:`Counter` (see :meth:`add`)."""
+        return self.add(name, description, Counter(), **labels)
+
+    def gauge(self, name, description, function=None, **labels):
+        """Create and register a :obj:`Gauge` (see :meth:`add`)."""
+        return self.add(name, description, Gauge(function), **labels)
+
+    def histogram(self, name, description, **labels):
+        """Create and register a :obj:`Histogram` (see :meth:`add`)."""
+        return self.add(name, description, Histogram(), **labels)
+
+    def remove(self, name, **labels):
+        """
+        Remove the metric registered under ``name`` and ``labels``.
+
+        Does nothing if there is no such metric.
+
+        Args:
+            name (str):
+                The name of the metric family.
+            labels:
+                The labels of the metric.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                return
+            family[2].pop(key, None)
+            if not family[2]:
+                del self._families[name]
+
+    def get(self, name, **labels):
+        """
+        Return the metric registered under ``name`` and ``labels``.
+
+        Returns:
+            The metric or ``None``.
+        """
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                return None
+            return family[2].get(tuple(sorted(labels.items())))
+
+    def collect(self):
+        """
+        Read the values of all metrics.
+
+        Returns:
+            list of tuple:
+                For each family, sorted by name, a tuple of the name, the
+                type, the description and a list of pairs of a label
+                dictionary and the value of a metric.
+        """
+        with self._lock:
+            families = [(name, type_, description, list(metrics.items()))
+                        for name, (type_, description, metrics)
+                        in sorted(self._families.items())]
+        # Read values without holding the lock since metrics computed by
+        # functions may lock other objects.
+        return [(name, type_, description,
+                 [(dict(key), metric.value) for key, metric in metrics])
+                for name, type_, description, metrics in families]
+
+    def snapshot(self):
+        """
+        Return the values of all metrics.
+
+        Returns:
+            dict:
+                For each family name, a dictionary with the ``type``, the
+                ``help`` text and a list of ``samples``, each a dictionary
+                with ``labels`` and ``value``. Values of histograms are
+                summaries (see :meth:`rsb.util.Histogram.summary`).
+        """
+        result = {}
+        for name, type_, description, samples in self.collect():
+            result[name] = {
+                'type': type_,
+                'help': description,
+                'samples': [
+                    {'labels': labels,
+                     'value': (value.summary() if type_ == 'histogram'
+                               else value)}
+                    for labels, value in samples]}
+        return result
+
+    def prometheus_text(self):
+        """
+        Return the values of all metrics in the Prometheus text format.
+
+        Returns:
+            str:
+                The metrics in version 0.0.4 of the exposition format.
+        """
+        lines = []
+        for name, type_, description, samples in self.collect():
+            lines.append('# HELP {} {}'.format(
+                name, _escape(description, False)))
+            lines.append('# TYPE {} {}'.format(name, type_))
+            for labels, value in samples:
+                if type_ == 'histogram':
+                    for bound, count in value.buckets():
+                        lines.append(_sample(name + '_bucket', labels,
+                                             count, le=_number(bound)))
+                    lines.append(_sample(name + '_bucket', labels,
+                                         value.count, le='+Inf'))
+                    lines.append(_sample(name + '_sum', labels, value.sum))
+                    lines.append(_sample(name + '_count', labels,
+                                         value.count))
+                else:
+                    lines.append(_sample(name, labels, value))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value, quotes=True):
+    value = value.replace('\\', '\\\\').replace('\n', '\\n')
+    if quotes:
+        value = value.replace('"', '\\"')
+    return value
+
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+def _sample(name, labels, value, **extra):
+    labels = dict(labels, **extra)
+    if labels:
+        name += '{' + ','.join(
+            '{}="{}"'.format(key, _escape(str(labels[key])))
+            for key in sorted(labels)) + '}'
+    return '{} {}'.format(name, _number(value))
+
+
+_registry = Registry()
+
+
+def get_registry():
+    """
+    Return the registry in which RSB components register their metrics.
+
+    Returns:
+        Registry:
+            The process-wide registry.
+    """
+    return _registry
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):  # noqa: N802
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type',
+                         'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+class MetricsServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """
+    Serves the metrics of a :obj:`Registry` in Prometheus text format.
+
+    Requests for ``/`` and ``/metrics`` are answered. Use
+    :func:`start_http_server` to create instances.
+
+    .. codeauthor:: jmoringe
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, registry):
+        super().__init__(address, _Handler)
+        self.registry = registry
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name='MetricsServer', daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving requests and close the listen socket."""
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+def start_http_server(port=0, address='127.0.0.1', registry=None):
+    """
+    Serve the metrics of ``registry`` over HTTP in a background thread.
+
+    Args:
+        port (int):
+            The TCP port to listen on. Zero selects a free port.
+        address (str):
+            The address of the interface to listen on.
+        registry (Registry or None):
+            The registry to serve or ``None`` for :func:`get_registry`.
+
+    Returns:
+        MetricsServer:
+            The running server. Its ``port`` attribute contains the actual
+            port.
+    """
+    if registry is None:
+        registry = get_registry()
+    server = MetricsServer((address, port), registry)
+    server.start()
+    return server
@@ -28,12 +28,28 @@ For instance, RPC based on the basic participants :obj:`rsb.Listener` and
 .. codeauthor:: jwienke
 """
 
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import heapq
+import itertools
 import threading
+import time
+import types
 
 import rsb
-from rsb.eventprocessing import FullyParallelEventReceivingStrategy
+import rsb.converter
+from rsb.eventprocessing import (DirectEventReceivingStrategy,
+                                 FullyParallelEventReceivingStrategy)
 import rsb.filter
-from rsb.patterns.future import DataFuture, Future
+import rsb.metrics
+from rsb.patterns.future import (DataFuture,
+                                 Future,
+                                 FutureExecutionError,
+                                 FutureTimeout)
+from rsb.patterns.group import WorkGroup
+import rsb.util
 
 
 # TODO superclass for RSB Errors?
@@ -234,6 +250,262 @@ class Server(rsb.Participant):
 ######################################################################
 
 
+class CallStatistics:
+    """
+    Accumulates timing information about the calls of a :obj:`LocalMethod`.
+
+    The queue time of a call is the time between the reception of the
+    request by the transport and the start of its execution. The
+    execution time is the time spent in the function implementing the
+    method. Requests which are skipped because their deadline has passed
+    are counted separately.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._rejected = 0
+        self._expired = 0
+        self._queue_time = 0.0
+        self._max_queue_time = 0.0
+        self._execution_time = 0.0
+        self._max_execution_time = 0.0
+
+    @property
+    def calls(self):
+        """
+        Return the number of executed calls.
+
+        Returns:
+            int:
+                The number of calls, including failed ones.
+        """
+        return self._calls
+
+    @property
+    def rejected(self):
+        """
+        Return the number of requests rejected because of overload.
+
+        Returns:
+            int:
+                The number of rejected requests.
+        """
+        return self._rejected
+
+    @property
+    def expired(self):
+        """
+        Return the number of requests skipped because of their deadline.
+
+        Returns:
+            int:
+                The number of expired requests.
+        """
+        return self._expired
+
+    @property
+    def mean_queue_time(self):
+        with self._lock:
+            return self._queue_time / self._calls if self._calls else 0.0
+
+    @property
+    def max_queue_time(self):
+        return self._max_queue_time
+
+    @property
+    def mean_execution_time(self):
+        with self._lock:
+            return self._execution_time / self._calls if self._calls else 0.0
+
+    @property
+    def max_execution_time(self):
+        return self._max_execution_time
+
+    def record_call(self, queue_time, execution_time):
+        with self._lock:
+            self._calls += 1
+            self._queue_time += queue_time
+            self._max_queue_time = max(self._max_queue_time, queue_time)
+            self._execution_time += execution_time
+            self._max_execution_time = max(self._max_execution_time,
+                                           execution_time)
+
+    def record_rejection(self):
+        with self._lock:
+            self._rejected += 1
+
+    def record_expiry(self):
+        with self._lock:
+            self._expired += 1
+
+    def __str__(self):
+        return ('<{} {} calls, {} rejected, {} expired, queue time '
+                '{:.6f} s (max {:.6f} s), execution time {:.6f} s '
+                '(max {:.6f} s) at 0x{:x}>').format(
+                    type(self).__name__, self.calls, self.rejected,
+                    self.expired,
+                    self.mean_queue_time, self.max_queue_time,
+                    self.mean_execution_time, self.max_execution_time,
+                    id(self))
+
+
+class ReplyCache:
+    """
+    Memoizes the replies of an idempotent :obj:`LocalMethod`.
+
+    Entries are keyed by the request payload serialized with the global
+    converter for its type and the resulting wire schema so that
+    unhashable payloads such as protocol buffer messages can be used.
+    Payloads without such a converter are not cached. At most
+    ``max_size`` entries are kept, evicting the least recently used one
+    first, and entries expire ``ttl`` seconds after they have been
+    stored.
+
+    Error replies and replies which are events are never cached.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, max_size=128, ttl=None):
+        """
+        Create a new, empty cache.
+
+        Args:
+            max_size (int or None):
+                The maximum number of entries or ``None`` for no limit.
+            ttl (float or None):
+                The number of seconds after which an entry expires or
+                ``None`` if entries do not expire.
+
+        Raises:
+            ValueError:
+                If ``max_size`` or ``ttl`` is not positive.
+        """
+        if max_size is not None and max_size < 1:
+            raise ValueError(
+                'max_size must be positive, not {}'.format(max_size))
+        if ttl is not None and ttl <= 0:
+            raise ValueError('ttl must be positive, not {}'.format(ttl))
+
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(data):
+        """
+        Return the cache key for the request payload ``data``.
+
+        Args:
+            data:
+                The request payload.
+
+        Returns:
+            tuple or None:
+                The wire schema and serialized payload or ``None`` if there
+                is no converter for the type of ``data``.
+        """
+        converters = rsb.converter.get_global_converter_map(bytes)
+        try:
+            converter = converters.get_converter_for_data_type(type(data))
+        except KeyError:
+            return None
+        wire_data, wire_schema = converter.serialize(data)
+        return wire_schema, bytes(wire_data)
+
+    def lookup(self, key):
+        """
+        Return the cached reply for ``key``.
+
+        Args:
+            key (tuple):
+                A key returned by :obj:`key`.
+
+        Returns:
+            tuple or None:
+                The reply payload and its type or ``None`` if there is no
+                valid entry for ``key``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None \
+                    and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def store(self, key, reply):
+        """
+        Store ``reply`` as the reply for ``key``.
+
+        Args:
+            key (tuple):
+                A key returned by :obj:`key`.
+            reply (tuple):
+                The reply payload and its type.
+        """
+        expiry = None if self._ttl is None else time.monotonic() + self._ttl
+        with self._lock:
+            self._entries[key] = (expiry, reply)
+            self._entries.move_to_end(key)
+            if self._max_size is not None \
+                    and len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *args):
+        """
+        Remove the entries for the request payloads ``args``.
+
+        Args:
+            args:
+                The request payloads whose replies should be removed. If
+                none are given, all entries are removed.
+        """
+        keys = [self.key(arg) for arg in args]
+        with self._lock:
+            if not args:
+                self._entries.clear()
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def __str__(self):
+        return '<{} {} entries, {} hits, {} misses at 0x{:x}>'.format(
+            type(self).__name__, len(self), self.hits, self.misses, id(self))
+
+    def __repr__(self):
+        return str(self)
+
+
 class LocalMethod(Method):
     """
     Implements and makes available a method of a local server.
@@ -241,34 +513,143 @@ class LocalMethod(Method):
     The actual behavior of methods is implemented by invoking
     arbitrary user-supplied callables.
 
+    Requests are received by the :obj:`LocalServer` of the method, replies
+    are published through the informer of the server.
+
+    Methods with a ``max_concurrency`` execute requests in at most that
+    many threads of their own. Requests which arrive while all threads
+    are busy wait in a queue of at most ``max_queue`` requests. Requests
+    which do not fit into the queue are rejected with an error reply.
+
+    Requests which carry a deadline in the ``rsb:deadline`` user time
+    (see :obj:`RemoteMethod.asynchronous`) are skipped without a reply
+    if the deadline has passed when their execution would start.
+
+    Methods with a :obj:`ReplyCache` answer requests from the cache
+    without calling their function if possible.
+
+    If the function returns a generator, each generated item is published
+    as a separate reply chunk carrying its index in the ``rsb:chunk`` user
+    info, followed by a final reply which carries the number of chunks in
+    the ``rsb:chunks`` user info (see :obj:`RemoteMethod.stream`). If the
+    request carries a window in the ``rsb:window`` user info, at most
+    that many chunks are published ahead of the credit granted by the
+    client through ``CREDIT`` events. Streams for which no credit arrives
+    within :attr:`credit_timeout` seconds are abandoned with an error
+    reply. Unless the method has a ``max_concurrency``, chunks are
+    published by a thread of their own so that waiting for credit does
+    not occupy the threads which the server shares among its methods.
+
     .. codeauthor:: jmoringe
     """
 
+    credit_timeout = 60.0
+
     def __init__(self, scope, config,
                  server, name, func, request_type, reply_type,
-                 allow_parallel_execution):
+                 allow_parallel_execution,
+                 max_concurrency=None, max_queue=None, cache=None):
         super().__init__(
             scope, config, server, name, request_type, reply_type)
 
+        self._logger = rsb.util.get_logger_by_class(self.__class__)
+
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(
+                'max_concurrency must be positive, not {}'.format(
+                    max_concurrency))
+        if max_queue is not None:
+            if max_concurrency is None:
+                raise ValueError('max_queue requires max_concurrency')
+            if max_queue < 0:
+                raise ValueError(
+                    'max_queue must not be negative, not {}'.format(
+                        max_queue))
+
         self._allow_parallel_execution = allow_parallel_execution
         self._func = func
-        self.listener  # force listener creation
 
-    def make_listener(self):
-        receiving_strategy = None
-        if self._allow_parallel_execution:
-            receiving_strategy = FullyParallelEventReceivingStrategy()
-        listener = rsb.create_listener(self.scope, self.config,
-                                       parent=self,
-                                       receiving_strategy=receiving_strategy)
-        listener.add_filter(rsb.filter.MethodFilter(method='REQUEST'))
-        listener.add_handler(self._handle_request)
-        return listener
+        self._max_concurrency = max_concurrency
+        self._max_queue = max_queue
+        self._pending = collections.deque()
+        self._running = 0
+        self._admission_lock = threading.Lock()
+        self._statistics = CallStatistics()
+        self._cache = cache
 
-    def make_informer(self):
-        return rsb.create_informer(self.scope, self.config,
-                                   parent=self,
-                                   data_type=object)
+    @property
+    def allow_parallel_execution(self):
+        return self._allow_parallel_execution
+
+    @property
+    def max_concurrency(self):
+        return self._max_concurrency
+
+    @property
+    def max_queue(self):
+        return self._max_queue
+
+    @property
+    def statistics(self):
+        """
+        Return timing statistics about the calls of this method.
+
+        Returns:
+            CallStatistics:
+                The statistics, updated as calls are processed.
+        """
+        return self._statistics
+
+    @property
+    def cache(self):
+        """
+        Return the cache of replies of this method.
+
+        Returns:
+            ReplyCache or None:
+                The cache or ``None`` if replies are not cached.
+        """
+        return self._cache
+
+    def _submit(self, request):
+        # Admission control for methods with a concurrency limit: run
+        # the request in a new worker thread if the limit has not been
+        # reached, queue it if there is space, and reject it
+        # otherwise.
+        with self._admission_lock:
+            if self._running < self._max_concurrency:
+                self._running += 1
+                worker = threading.Thread(target=self._work,
+                                          args=(request,),
+                                          name='LocalMethodWorker',
+                                          daemon=True)
+            elif self._max_queue is None \
+                    or len(self._pending) < self._max_queue:
+                self._pending.append(request)
+                return
+            else:
+                running, queued = self._running, len(self._pending)
+                worker = None
+
+        if worker is not None:
+            worker.start()
+        else:
+            self._statistics.record_rejection()
+            self._publish_reply(
+                request,
+                'Method {} is overloaded: {} calls running, {} queued'.format(
+                    self.name, running, queued),
+                str, is_error=True)
+
+    def _work(self, request):
+        while request is not None:
+            self._handle_request(request)
+            with self._admission_lock:
+                if self._pending:
+                    request = self._pending.popleft()
+                else:
+                    self._running -= 1
+                    request = None
 
     def _handle_request(self, request):
         # Call the callable implementing the behavior of this
@@ -276,8 +657,22 @@ class LocalMethod(Method):
         # (i.e. self.request_type is type(None)), call it without
         # argument. Otherwise pass the payload of the request event to
         # it.
-        user_infos = {}
-        causes = [request.event_id]
+        now = time.time()
+        deadline = request.meta_data.user_times.get('rsb:deadline')
+        if deadline is not None and deadline < now:
+            self._statistics.record_expiry()
+            return
+
+        key = None
+        if self._cache is not None:
+            key = self._cache.key(request.data)
+            reply = None if key is None else self._cache.lookup(key)
+            if reply is not None:
+                self._publish_reply(request, *reply)
+                return
+
+        queue_time = max(0.0, now - request.meta_data.receive_time)
+        start = time.perf_counter()
         is_error = False
         try:
             if self.request_type is type(None):  # noqa: E721
@@ -290,9 +685,67 @@ class LocalMethod(Method):
             result_type = type(result)
         except Exception as e:
             is_error = True
-            user_infos['rsb:error?'] = '1'
             result = str(e)
             result_type = str
+        self._statistics.record_call(queue_time,
+                                     time.perf_counter() - start)
+
+        if isinstance(result, types.GeneratorType):
+            window = int(request.meta_data.user_infos.get('rsb:window', '0'))
+            credit = self.server._open_stream(request.event_id, window)
+            if self._max_concurrency is not None:
+                self._publish_chunks(request, result, credit)
+            else:
+                threading.Thread(target=self._stream,
+                                 args=(request, result, credit),
+                                 name='LocalMethodStream',
+                                 daemon=True).start()
+            return
+
+        if key is not None and not is_error \
+                and not isinstance(result, rsb.Event):
+            self._cache.store(key, (result, result_type))
+        self._publish_reply(request, result, result_type, is_error)
+
+    def _stream(self, request, chunks, credit):
+        try:
+            self._publish_chunks(request, chunks, credit)
+        except Exception:
+            self._logger.warning('Failed to publish reply chunks for %s',
+                                 request, exc_info=True)
+
+    def _publish_chunks(self, request, chunks, credit):
+        index = 0
+        try:
+            for chunk in chunks:
+                if not credit.acquire(index, self.credit_timeout):
+                    if not credit.cancelled:
+                        self._publish_reply(
+                            request,
+                            'Stream abandoned since no credit arrived '
+                            'within {} seconds'.format(self.credit_timeout),
+                            str, is_error=True,
+                            user_infos={'rsb:chunks': str(index)})
+                    return
+                self._publish_reply(request, chunk, type(chunk),
+                                    user_infos={'rsb:chunk': str(index)})
+                index += 1
+        except Exception as e:
+            self._publish_reply(request, str(e), str, is_error=True,
+                                user_infos={'rsb:chunks': str(index)})
+        else:
+            self._publish_reply(request, None, type(None), check=False,
+                                user_infos={'rsb:chunks': str(index)})
+        finally:
+            chunks.close()
+            self.server._close_stream(request.event_id)
+
+    def _publish_reply(self, request, result, result_type, is_error=False,
+                       user_infos=None, check=True):
+        user_infos = dict(user_infos or {})
+        if is_error:
+            user_infos['rsb:error?'] = '1'
+        causes = [request.event_id]
 
         # If the returned result is an event, use it as reply event
         # (after adding the request as cause). Otherwise add all
@@ -301,15 +754,17 @@ class LocalMethod(Method):
             reply = result
             reply.method = 'REPLY'
             reply.causes += causes
+            reply.meta_data.user_infos.update(user_infos)
         else:
             # This check is required because the reply informer is
             # created with type 'object' to enable throwing exceptions
-            if not is_error and not isinstance(result, self.reply_type):
+            if check and not is_error \
+                    and not isinstance(result, self.reply_type):
                 raise ValueError(
                     "The result '{}' (of type {}) of method {} does not match "
                     "the method's declared return type {}.".format(
                         result, result_type, self.name, self.reply_type))
-            reply = rsb.Event(scope=self.informer.scope,
+            reply = rsb.Event(scope=self.scope,
                               method='REPLY',
                               data=result,
                               data_type=result_type,
@@ -317,7 +772,52 @@ class LocalMethod(Method):
                               causes=causes)
 
         # Publish the reply event.
-        self.informer.publish_event(reply)
+        self.server.informer.publish_event(reply)
+
+    def deactivate(self):
+        # Requests which have not been started yet are discarded.
+        with self._admission_lock:
+            self._pending.clear()
+
+        super().deactivate()
+
+
+class _StreamCredit:
+    """
+    Tracks the number of reply chunks a client is willing to receive.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, window):
+        self._condition = threading.Condition()
+        self._credit = window or None
+        self._cancelled = False
+
+    def grant(self, credit):
+        with self._condition:
+            if self._credit is not None and credit > self._credit:
+                self._credit = credit
+                self._condition.notify_all()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        with self._condition:
+            self._cancelled = True
+            self._condition.notify_all()
+
+    def acquire(self, index, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self._available(index),
+                                     timeout)
+            return not self._cancelled and self._available(index)
+
+    def _available(self, index):
+        return self._cancelled or self._credit is None \
+            or index < self._credit
 
 
 class LocalServer(Server):
@@ -328,10 +828,22 @@ class LocalServer(Server):
     which are implemented by callback functions with a scope under
     which these methods are exposed for remote clients.
 
+    A single listener on the scope of the server receives the requests
+    for all methods and routes them to the methods by scope. Requests of
+    each method are processed in order, using a thread pool shared by all
+    methods, unless the method allows parallel execution or has its own
+    concurrency limit. All replies are published through a single
+    informer.
+
+    With ``work_sharing``, multiple servers on the same scope form a
+    :obj:`rsb.patterns.group.WorkGroup` and each server only executes the
+    requests it owns within the group instead of all requests.
+
     .. codeauthor:: jmoringe
     """
 
-    def __init__(self, scope, config):
+    def __init__(self, scope, config, work_sharing=False,
+                 heartbeat_interval=1.0):
         """
         Create a :obj:`LocalServer` that provides methods under a given scope.
 
@@ -342,14 +854,142 @@ class LocalServer(Server):
             config (rsb.ParticipantConfig):
                 The transport configuration that should be used for
                 communication performed by this server.
+            work_sharing (bool):
+                If ``True``, share requests with the other work sharing
+                servers on ``scope`` so that each request is executed once.
+            heartbeat_interval (float):
+                The number of seconds between the membership announcements
+                of a work sharing server.
 
         See Also:
             :obj:`rsb.create_server`
         """
+        self._logger = rsb.util.get_logger_by_class(self.__class__)
+
+        self._listener = None
+        self._informer = None
+        self._routes = {}
+        self._streams = {}
+        self._lock = threading.RLock()
+
         super().__init__(scope, config)
 
+        self._pool = rsb.util.OrderedQueueDispatcherPool(
+            thread_pool_size=5,
+            del_func=lambda method, request: method._handle_request(request),
+            capacity=config.receive_queue_size,
+            overflow=config.receive_overflow)
+        self._pool.start()
+        self._parallel = FullyParallelEventReceivingStrategy(
+            capacity=config.receive_queue_size,
+            overflow=config.receive_overflow,
+            max_threads=config.receive_threads)
+        self._parallel.add_handler(self._handle_parallel_request, True)
+        self._group = None
+        if work_sharing:
+            self._group = WorkGroup(self, heartbeat_interval)
+
+    @property
+    def listener(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = self.make_listener()
+            return self._listener
+
+    @property
+    def informer(self):
+        with self._lock:
+            if self._informer is None:
+                self._informer = self.make_informer()
+            return self._informer
+
+    @property
+    def group(self):
+        """
+        Return the group in which this server shares work.
+
+        Returns:
+            rsb.patterns.group.WorkGroup or None:
+                The group or ``None`` if the server executes all requests.
+        """
+        return self._group
+
+    def make_listener(self):
+        listener = rsb.create_listener(
+            self.scope, self.config,
+            parent=self,
+            receiving_strategy=DirectEventReceivingStrategy())
+        listener.add_handler(self._handle_event)
+        return listener
+
+    def make_informer(self):
+        return rsb.create_informer(self.scope, self.config,
+                                   parent=self,
+                                   data_type=object)
+
+    def _handle_event(self, event):
+        # This handler runs in the receiving thread of the transport. An
+        # exception would terminate the connection, so errors only drop
+        # the offending event.
+        try:
+            if event.method == 'REQUEST':
+                self._handle_request(event)
+            elif event.method in ('CREDIT', 'CANCEL') and event.causes:
+                self._handle_flow_control(event)
+        except Exception:
+            self._logger.error('Dropping event %s which could not be '
+                               'processed', event, exc_info=True)
+
+    def _handle_flow_control(self, event):
+        credit = self._streams.get(event.causes[0])
+        if credit is None:
+            return
+        if event.method == 'CANCEL':
+            credit.cancel()
+            return
+        value = event.meta_data.user_infos.get('rsb:credit')
+        try:
+            credit.grant(int(value))
+        except (TypeError, ValueError):
+            self._logger.warning('Ignoring CREDIT event %s with invalid '
+                                 'credit %r', event, value)
+
+    def _open_stream(self, request_id, window):
+        credit = _StreamCredit(window)
+        with self._lock:
+            self._streams[request_id] = credit
+        return credit
+
+    def _close_stream(self, request_id):
+        with self._lock:
+            self._streams.pop(request_id, None)
+
+    def _handle_request(self, request):
+        method = self._routes.get(request.scope)
+        if method is None:
+            return
+        if self._group is not None and not self._group.owns(request.event_id):
+            return
+        if method.max_concurrency is not None:
+            method._submit(request)
+        elif method.allow_parallel_execution:
+            self._parallel.handle(request)
+        else:
+            self._pool.push_to(method, request)
+
+    @staticmethod
+    def _uses_pool(method):
+        return method.max_concurrency is None \
+            and not method.allow_parallel_execution
+
+    def _handle_parallel_request(self, request):
+        method = self._routes.get(request.scope)
+        if method is not None:
+            method._handle_request(request)
+
     def add_method(self, name, func, request_type=object, reply_type=object,
-                   allow_parallel_execution=False):
+                   allow_parallel_execution=False,
+                   max_concurrency=None, max_queue=None, cache=None):
         """
         Add a method named ``name`` that is implemented by ``func``.
 
@@ -368,10 +1008,27 @@ class LocalServer(Server):
                 if set to True, the method will be called fully asynchronously
                 and even multiple calls may enter the method in parallel. Also,
                 no ordering is guaranteed anymore.
+            max_concurrency (int or None):
+                If not ``None``, execute requests in at most this many
+                threads which are dedicated to the method. Takes
+                precedence over ``allow_parallel_execution``. Requests are
+                only executed in order if this is 1.
+            max_queue (int or None):
+                If not ``None``, the maximum number of requests which wait
+                for one of the ``max_concurrency`` threads. Further
+                requests are rejected with an error reply. Requires
+                ``max_concurrency``.
+            cache (ReplyCache or None):
+                If not ``None``, memoize the replies of the method in this
+                cache. Only suitable for methods without side effects.
 
         Returns:
             LocalMethod:
                 The newly created method.
+
+        Raises:
+            ValueError:
+                If ``max_concurrency`` or ``max_queue`` is invalid.
         """
         scope = self.scope.concat(rsb.Scope('/' + name))
         method = rsb.create_participant(
@@ -382,15 +1039,52 @@ class LocalServer(Server):
             func=func,
             request_type=request_type,
             reply_type=reply_type,
-            allow_parallel_execution=allow_parallel_execution)
+            allow_parallel_execution=allow_parallel_execution,
+            max_concurrency=max_concurrency,
+            max_queue=max_queue,
+            cache=cache)
         super().add_method(method)
+        if self._uses_pool(method):
+            self._pool.register_receiver(method)
+        # The routing table is replaced instead of modified so that
+        # requests can be routed without locking.
+        with self._lock:
+            routes = dict(self._routes)
+            routes[method.scope] = method
+            self._routes = routes
+        self.listener  # Force listener creation
         return method
 
     def remove_method(self, method):
         if isinstance(method, str):
             method = self.get_method(method)
+        with self._lock:
+            self._routes = {scope: m for (scope, m) in self._routes.items()
+                            if m is not method}
+        if self._uses_pool(method):
+            self._pool.unregister_receiver(method)
         super().remove_method(method)
 
+    def deactivate(self):
+        if self._listener is not None:
+            self._listener.deactivate()
+            self._listener = None
+        if self._group is not None:
+            self._group.deactivate()
+            self._group = None
+        self._pool.stop()
+        self._parallel.deactivate()
+        # Let streaming methods stop waiting for credit.
+        with self._lock:
+            streams = list(self._streams.values())
+        for credit in streams:
+            credit.cancel()
+        if self._informer is not None:
+            self._informer.deactivate()
+            self._informer = None
+
+        super().deactivate()
+
 ######################################################################
 #
 # Remote Server
@@ -398,12 +1092,161 @@ class LocalServer(Server):
 ######################################################################
 
 
+class ReplyStream:
+    """
+    Iterates over the reply chunks of a streaming remote method call.
+
+    Instances are returned by :obj:`RemoteMethod.stream` and can be used
+    as iterators and asynchronous iterators. Chunks are yielded in the
+    order in which the remote method generated them.
+
+    If the call has a window, the stream grants the remote method credit
+    for the next chunks whenever half of the window has been consumed so
+    that at most one window of unconsumed chunks is buffered.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, method, window, timeout, events):
+        self._logger = rsb.util.get_logger_by_class(self.__class__)
+
+        self._method = method
+        self._window = window
+        self._timeout = timeout
+        self._events = events
+        self._request_id = None
+        self._canceller = None
+
+        self._condition = threading.Condition()
+        self._chunks = {}
+        self._next = 0
+        self._total = None
+        self._error = None
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._condition:
+            if not self._condition.wait_for(self._ready, self._timeout):
+                timed_out = True
+            else:
+                timed_out = False
+                if self._next in self._chunks:
+                    event = self._chunks.pop(self._next)
+                    self._next += 1
+                    consumed = self._next
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    raise StopIteration
+        if timed_out:
+            self.close()
+            raise FutureTimeout(
+                'No reply chunk within {} seconds'.format(self._timeout))
+
+        step = max(1, self._window // 2)
+        if self._window and consumed % step == 0 and not self._finished():
+            self._send_control('CREDIT',
+                               {'rsb:credit': str(consumed + self._window)})
+        return event if self._events else event.data
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # StopIteration cannot be passed through a future.
+        # get_running_loop is not available before Python 3.7.
+        loop = getattr(asyncio, 'get_running_loop',
+                       asyncio.get_event_loop)()
+        chunk = await loop.run_in_executor(None, next, self, self)
+        if chunk is self:
+            raise StopAsyncIteration
+        return chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop receiving chunks and cancel the remote generator if needed."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            finished = self._finished()
+            self._condition.notify_all()
+        if self._canceller is not None:
+            self._canceller()
+        if not finished:
+            self._send_control('CANCEL')
+
+    def cancel(self):
+        self.close()
+        return True
+
+    def set_exception(self, exception):
+        with self._condition:
+            if self._error is None:
+                self._error = exception
+            self._condition.notify_all()
+
+    def _ready(self):
+        return self._next in self._chunks or self._error is not None \
+            or self._closed or self._finished()
+
+    def _finished(self):
+        return self._total is not None and self._next >= self._total
+
+    def _add_reply(self, event):
+        # Return True when no further replies are expected.
+        user_infos = event.meta_data.user_infos
+        with self._condition:
+            if 'rsb:chunk' in user_infos:
+                self._chunks[int(user_infos['rsb:chunk'])] = event
+            elif 'rsb:chunks' in user_infos:
+                self._total = int(user_infos['rsb:chunks'])
+                if 'rsb:error?' in user_infos:
+                    self._error = FutureExecutionError(
+                        'Failed to execute operation: {}'.format(event.data))
+            elif 'rsb:error?' in user_infos:
+                self._total = 0
+                self._error = FutureExecutionError(
+                    'Failed to execute operation: {}'.format(event.data))
+            else:
+                # The method did not return a generator.
+                self._chunks[0] = event
+                self._total = 1
+            self._condition.notify_all()
+            return self._total is not None \
+                and len(self._chunks) + self._next >= self._total
+
+    def _send_control(self, method, user_infos=None):
+        informer = self._method.informer
+        try:
+            informer.publish_event(rsb.Event(
+                scope=informer.scope, method=method,
+                data=None, data_type=type(None),
+                user_infos=user_infos, causes=[self._request_id]))
+        except Exception as e:
+            self._logger.warning(
+                'Failed to send %s for stream %s: %s',
+                method, self._request_id, e)
+
+
 class RemoteMethod(Method):
     """
     Represents a method provided by a remote server.
 
     Method objects are callable like regular bound method objects.
 
+    Replies are received and dispatched to the pending calls by the
+    :obj:`RemoteServer` of the method. The informer for requests is only
+    created when the method is called for the first time.
+
     .. codeauthor:: jmoringe
     """
 
@@ -411,40 +1254,11 @@ class RemoteMethod(Method):
         super().__init__(scope, config, server, name,
                          request_type, reply_type)
 
-        self._calls = {}
-        self._lock = threading.RLock()
-
-    def make_listener(self):
-        listener = rsb.create_listener(self.scope, self.config,
-                                       parent=self)
-        listener.add_filter(rsb.filter.MethodFilter(method='REPLY'))
-        listener.add_handler(self._handle_reply)
-        return listener
-
     def make_informer(self):
         return rsb.create_informer(self.scope, self.config,
                                    parent=self,
                                    data_type=self.request_type)
 
-    def _handle_reply(self, event):
-        if not event.causes:
-            return
-
-        key = event.causes[0]
-        with self._lock:
-            # We can receive reply events which aren't actually
-            # intended for us. We ignore these.
-            if key not in self._calls:
-                return
-
-            # The result future
-            result = self._calls[key]
-            del self._calls[key]
-        if 'rsb:error?' in event.meta_data.user_infos:
-            result.set_error(event.data)
-        else:
-            result.set_result(event)
-
     def __call__(self, arg=None, timeout=0):
         """
         Call the method synchronously and returns the results.
@@ -490,9 +1304,14 @@ class RemoteMethod(Method):
             :obj:`asynchronous`
 
         """
-        return self.asynchronous(arg).get(timeout=timeout)
+        result = self.asynchronous(arg, timeout=timeout or None)
+        try:
+            return result.get(timeout=timeout)
+        except FutureTimeout:
+            result.cancel()
+            raise
 
-    def asynchronous(self, arg=None):
+    def asynchronous(self, arg=None, timeout=None):
         """
         Call the method asynchronously and returns a :obj:`Future`.
 
@@ -513,6 +1332,15 @@ class RemoteMethod(Method):
             arg:
                 The argument object that should be passed to the remote method.
                 A converter has to be available for the type of ``arg``.
+            timeout (float or None):
+                If not ``None``, the number of seconds after which the call
+                expires if no reply has been received. The returned future
+                then fails with :obj:`FutureTimeout`. Without a timeout, the
+                call is only forgotten when a reply arrives or the future is
+                cancelled. The deadline is also sent to the server as the
+                ``rsb:deadline`` user time of the request so that the
+                server can skip the call if it cannot start it in time.
+                This requires reasonably synchronized clocks.
 
         Returns:
             Future or DataFuture:
@@ -536,8 +1364,190 @@ class RemoteMethod(Method):
             ...                           data='bla', type=str)).get()
             Event[id = ..., data = 'bla', ...]
         """
-        self.listener  # Force listener creation
+        event, result = self._make_request(arg, timeout)
+
+        # Publish the constructed request event and record the call as
+        # in-progress, waiting for a reply.
+        try:
+            self.server.publish_request(self, event, result, timeout)
+        except Exception as e:
+            raise RemoteCallError(self.server.scope, self, e) from e
+        return result
+
+    def call_many(self, args, timeout=None):
+        """
+        Call the method asynchronously once for each element of ``args``.
+
+        All request events are published as one batch which allows the
+        transports to send them with less per-call overhead than
+        individual :obj:`asynchronous` calls.
+
+        Args:
+            args (iterable):
+                The argument objects for the individual calls. Like in
+                :obj:`asynchronous`, :obj:`Event` instances are sent as
+                they are.
+            timeout (float or None):
+                If not ``None``, the number of seconds after which each
+                call expires if no reply has been received.
+
+        Returns:
+            list:
+                One :obj:`Future` or :obj:`DataFuture` per element of
+                ``args``, in the same order.
+
+        Raises:
+            RemoteCallError:
+                If an error occurs before the remote was invoked.
+
+        See Also:
+            :obj:`map`
+        """
+        events, results = [], []
+        for arg in args:
+            event, result = self._make_request(arg, timeout)
+            events.append(event)
+            results.append(result)
+        if not events:
+            return results
 
+        try:
+            self.server.publish_requests(self, events, results, timeout)
+        except Exception as e:
+            raise RemoteCallError(self.server.scope, self, e) from e
+        return results
+
+    def map(self, args, max_in_flight=64, timeout=None,  # noqa: A003
+            ordered=True):
+        """
+        Call the method for each element of ``args`` and yield the results.
+
+        At most ``max_in_flight`` calls are in progress at any time.
+        Whenever at least half of the window has completed, the next
+        arguments are sent as one batch (see :obj:`call_many`). ``args``
+        is consumed lazily so it can be a long or infinite iterable.
+
+        Closing the returned generator before it is exhausted cancels the
+        calls which are still in progress.
+
+        Examples:
+            >>> list(my_server.echo.map(['a', 'b', 'c']))
+            ['a', 'b', 'c']
+
+        Args:
+            args (iterable):
+                The argument objects for the individual calls.
+            max_in_flight (int):
+                The maximum number of calls which are in progress at the
+                same time.
+            timeout (float or None):
+                If not ``None``, the number of seconds after which each
+                call expires if no reply has been received.
+            ordered (bool):
+                If ``True``, yield results in the order of ``args``.
+                Otherwise, yield results in the order in which the replies
+                arrive.
+
+        Yields:
+            The results of the calls like :obj:`__call__` would return them.
+
+        Raises:
+            RemoteCallError:
+                If the requests cannot be sent.
+            FutureExecutionError:
+                If the remote method produces an error for one of the
+                calls.
+            FutureTimeout:
+                If ``timeout`` is not ``None`` and a call does not receive a
+                reply within the specified time frame.
+            ValueError:
+                If ``max_in_flight`` is smaller than 1.
+        """
+        if max_in_flight < 1:
+            raise ValueError(
+                'max_in_flight must be positive, not {}'.format(
+                    max_in_flight))
+
+        args = iter(args)
+        pending = collections.deque()
+        exhausted = False
+        try:
+            while True:
+                if not exhausted and len(pending) <= max_in_flight // 2:
+                    count = max_in_flight - len(pending)
+                    batch = list(itertools.islice(args, count))
+                    exhausted = len(batch) < count
+                    pending.extend(self.call_many(batch, timeout=timeout))
+                if not pending:
+                    return
+
+                if ordered:
+                    yield pending.popleft().get()
+                else:
+                    done, _ = concurrent.futures.wait(
+                        pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+                    pending = collections.deque(
+                        result for result in pending if result not in done)
+                    for result in done:
+                        yield result.get()
+        finally:
+            for result in pending:
+                result.cancel()
+
+    def stream(self, arg=None, window=16, timeout=None):
+        """
+        Call a method which generates its result in chunks.
+
+        The remote method has to return a generator (see
+        :obj:`LocalMethod`). Each generated item is delivered as a separate
+        reply so that the result does not have to be held in memory in
+        one piece and the first items are available before the remote
+        method has finished.
+
+        Examples:
+            >>> for line in my_server.lines.stream('file.txt'):
+            ...     print(line)
+
+        Args:
+            arg:
+                The argument object that should be passed to the remote method.
+                A converter has to be available for the type of ``arg``.
+            window (int):
+                The maximum number of chunks the remote method sends ahead
+                of their consumption. Zero disables flow control.
+            timeout (float or None):
+                If not ``None``, the maximum number of seconds to wait for
+                each chunk.
+
+        Returns:
+            ReplyStream:
+                An iterator over the payloads of the chunks or, if ``arg`` is
+                an :obj:`Event`, the chunk events. Closing it before it is
+                exhausted cancels the remote generator.
+
+        Raises:
+            RemoteCallError:
+                If an error occurs before the remote was invoked.
+            ValueError:
+                If ``window`` is negative.
+        """
+        if window < 0:
+            raise ValueError(
+                'window must not be negative, not {}'.format(window))
+
+        event, _ = self._make_request(arg, timeout)
+        event.meta_data.set_user_info('rsb:window', str(window))
+        result = ReplyStream(self, window, timeout,
+                             isinstance(arg, rsb.Event))
+        try:
+            event = self.server.publish_request(self, event, result)
+        except Exception as e:
+            raise RemoteCallError(self.server.scope, self, e) from e
+        result._request_id = event.event_id
+        return result
+
+    def _make_request(self, arg, timeout):
         # When the caller supplied an event, adjust the meta-data and
         # create a future that will return an event.
         if isinstance(arg, rsb.Event):
@@ -553,20 +1563,15 @@ class RemoteMethod(Method):
                               data=arg,
                               data_type=type(arg))
             result = DataFuture()
-
-        # Publish the constructed request event and record the call as
-        # in-progress, waiting for a reply.
-        try:
-            with self._lock:
-                event = self.informer.publish_event(event)
-                self._calls[event.event_id] = result
-        except Exception as e:
-            raise RemoteCallError(self.server.scope, self, e) from e
-        return result
+        if timeout is not None:
+            event.meta_data.set_user_time('rsb:deadline',
+                                          time.time() + timeout)
+        return event, result
 
     def __str__(self):
         return '<{} "{}" with {} in-progress calls at 0x{:x}>'.format(
-            type(self).__name__, self.name, len(self._calls), id(self))
+            type(self).__name__, self.name,
+            self.server.count_calls(self), id(self))
 
     def __repr__(self):
         return str(self)
@@ -576,6 +1581,17 @@ class RemoteServer(Server):
     """
     Represents remote servers in a way that allows using normal methods calls.
 
+    A single listener on the scope of the server receives the replies for
+    all methods. Replies are matched to pending calls through a table
+    which maps the ids of request events to the :obj:`Future` objects of
+    the calls.
+
+    Calls with a timeout are additionally recorded in a heap ordered by
+    their deadlines. A thread, which is started when the first such call
+    is made, removes expired calls from the table and fails their futures
+    with :obj:`FutureTimeout`. Cancelling a future removes its call from
+    the table.
+
     .. codeauthor:: jmoringe
     """
 
@@ -593,8 +1609,250 @@ class RemoteServer(Server):
         See Also:
             :obj:`rsb.create_remote_server`
         """
+        self._listener = None
+        self._calls = {}
+        self._lock = threading.RLock()
+
+        self._deadlines = []
+        self._deadline_sequence = itertools.count()
+        self._deadline_condition = threading.Condition(self._lock)
+        self._expiry_thread = None
+        self._expired_calls = 0
+
         super().__init__(scope, config)
 
+        self._add_metric(
+            'rsb_remote_server_calls_in_flight',
+            'Calls of remote servers waiting for replies',
+            rsb.metrics.Gauge(self._metric_function(
+                lambda server: server.outstanding_calls)))
+        self._add_metric(
+            'rsb_remote_server_calls_expired_total',
+            'Calls of remote servers which expired without a reply',
+            rsb.metrics.Counter(self._metric_function(
+                lambda server: server.expired_calls)))
+
+    @property
+    def listener(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = self.make_listener()
+            return self._listener
+
+    def make_listener(self):
+        listener = rsb.create_listener(self.scope, self.config,
+                                       parent=self)
+        listener.add_filter(rsb.filter.MethodFilter(method='REPLY'))
+        listener.add_handler(self._handle_reply)
+        return listener
+
+    def publish_request(self, method, event, result, timeout=None):
+        """
+        Publish the request ``event`` of a call of ``method``.
+
+        Args:
+            method (RemoteMethod):
+                The called method.
+            event (rsb.Event):
+                The request event.
+            result (Future):
+                The future which receives the reply to ``event``.
+            timeout (float or None):
+                If not ``None``, the number of seconds after which the call
+                expires if no reply has been received.
+
+        Returns:
+            rsb.Event:
+                The published event.
+        """
+        self.listener  # Force listener creation
+
+        # Record the call before publishing since the reply can arrive
+        # before publishing returns. Publishing does not hold the lock
+        # so that other calls and replies are not delayed by transports.
+        informer = method.informer
+        event, = informer._prepare_events([event])
+        with self._lock:
+            self._record_call(method, event, result, timeout)
+        try:
+            informer._send_event(event)
+        except Exception:
+            self._remove_call(event.event_id)
+            raise
+        return event
+
+    def publish_requests(self, method, events, results, timeout=None):
+        """
+        Publish the request ``events`` of multiple calls of ``method``.
+
+        Like :obj:`publish_request` but the events are published as one
+        batch.
+
+        Args:
+            method (RemoteMethod):
+                The called method.
+            events (list):
+                The request events.
+            results (list):
+                The futures which receive the replies to the respective
+                elements of ``events``.
+            timeout (float or None):
+                If not ``None``, the number of seconds after which each
+                call expires if no reply has been received.
+
+        Returns:
+            list:
+                The published events.
+        """
+        self.listener  # Force listener creation
+
+        informer = method.informer
+        events = informer._prepare_events(events)
+        with self._lock:
+            for event, result in zip(events, results):
+                self._record_call(method, event, result, timeout)
+        try:
+            informer._send_events(events)
+        except Exception:
+            for event in events:
+                self._remove_call(event.event_id)
+            raise
+        return events
+
+    def _record_call(self, method, event, result, timeout):
+        key = event.event_id
+        self._calls[key] = (method, result)
+        result._canceller = functools.partial(self._remove_call, key)
+        if timeout is not None:
+            self._add_deadline(time.monotonic() + timeout, key)
+
+    def count_calls(self, method=None):
+        """
+        Return the number of calls which wait for a reply.
+
+        Args:
+            method (RemoteMethod or None):
+                If not ``None``, only count calls of this method.
+
+        Returns:
+            int:
+                The number of in-progress calls.
+        """
+        with self._lock:
+            if method is None:
+                return len(self._calls)
+            return sum(1 for (m, _) in self._calls.values() if m is method)
+
+    @property
+    def outstanding_calls(self):
+        """
+        Return the number of calls which wait for a reply.
+
+        Returns:
+            int:
+                The number of in-progress calls of all methods.
+        """
+        return self.count_calls()
+
+    @property
+    def expired_calls(self):
+        """
+        Return the number of calls which expired without a reply.
+
+        Returns:
+            int:
+                The number of expired calls.
+        """
+        return self._expired_calls
+
+    def _remove_call(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def _add_deadline(self, deadline, key):
+        # Completed and cancelled calls are not removed from the heap
+        # but skipped when they are due. Rebuild the heap when these
+        # entries dominate.
+        if len(self._deadlines) > 2 * len(self._calls) + 64:
+            self._deadlines = [entry for entry in self._deadlines
+                               if entry[2] in self._calls]
+            heapq.heapify(self._deadlines)
+        heapq.heappush(self._deadlines,
+                       (deadline, next(self._deadline_sequence), key))
+        if self._expiry_thread is None:
+            self._expiry_thread = threading.Thread(
+                target=self._expire_calls, name='RemoteServerExpiry',
+                daemon=True)
+            self._expiry_thread.start()
+        elif self._deadlines[0][2] == key:
+            self._deadline_condition.notify()
+
+    def _expire_calls(self):
+        while True:
+            expired = []
+            with self._lock:
+                while not expired:
+                    if not self._active:
+                        return
+                    now = time.monotonic()
+                    while self._deadlines and self._deadlines[0][0] <= now:
+                        _, _, key = heapq.heappop(self._deadlines)
+                        call = self._calls.pop(key, None)
+                        if call is not None:
+                            expired.append((key, call[1]))
+                    if expired:
+                        break
+                    if self._deadlines:
+                        self._deadline_condition.wait(
+                            self._deadlines[0][0] - now)
+                    else:
+                        self._deadline_condition.wait()
+                self._expired_calls += len(expired)
+
+            for key, result in expired:
+                result.set_exception(FutureTimeout(
+                    'No reply to request {} before deadline'.format(key)))
+
+    def _handle_reply(self, event):
+        if not event.causes:
+            return
+
+        key = event.causes[0]
+        with self._lock:
+            # We can receive reply events which aren't actually
+            # intended for us. We ignore these.
+            call = self._calls.get(key)
+            if call is None:
+                return
+            # Streams receive multiple replies.
+            _, result = call
+            if not isinstance(result, ReplyStream):
+                del self._calls[key]
+
+        if isinstance(result, ReplyStream):
+            if result._add_reply(event):
+                self._remove_call(key)
+            return
+
+        # The result future
+        if 'rsb:error?' in event.meta_data.user_infos:
+            result.set_error(event.data)
+        else:
+            result.set_result(event)
+
+    def deactivate(self):
+        if self._listener is not None:
+            self._listener.deactivate()
+            self._listener = None
+
+        super().deactivate()
+
+        with self._lock:
+            self._deadline_condition.notify()
+        if self._expiry_thread is not None:
+            self._expiry_thread.join()
+            self._expiry_thread = None
+
     def ensure_method(self, name):
         method = super().get_method(name)
         if method is None:
@@ -21,10 +21,14 @@
 """
 Contains an implementation of the future pattern.
 
+The futures are :obj:`concurrent.futures.Future` objects and can therefore
+be used with :obj:`concurrent.futures.wait`,
+:obj:`concurrent.futures.as_completed` and :obj:`asyncio.wrap_future`.
+
 .. codeauthor:: jmoringe
 """
 
-import threading
+import concurrent.futures
 
 
 class FutureError(RuntimeError):
@@ -42,7 +46,12 @@ class FutureExecutionError(FutureError):
         super().__init__(*args)
 
 
-class Future:
+class FutureCancelled(FutureError, concurrent.futures.CancelledError):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+
+class Future(concurrent.futures.Future):
     """
     Represents the results of in-progress operations.
 
@@ -50,9 +59,18 @@ class Future:
     operation, waiting for the operation to finish and retrieving the
     result of the operation.
 
-    .. todo::
+    In addition to :meth:`get`, the methods of
+    :obj:`concurrent.futures.Future` such as :meth:`result`,
+    :meth:`exception`, :meth:`add_done_callback` and :meth:`cancel` are
+    available. Operations stay pending until they complete and can be
+    cancelled until then. Results which arrive after the operation has
+    been cancelled or has failed are ignored.
 
-       Support Python's native future protocol?
+    .. versionchanged:: 1.0
+       :meth:`done` and :meth:`cancelled` are methods as in
+       :obj:`concurrent.futures.Future` instead of properties. Code like
+       ``if future.done:`` has to be changed to ``if future.done():``
+       since the bound method is always true.
 
     .. codeauthor:: jmoringe
 
@@ -64,24 +82,9 @@ class Future:
         """
         Create a new :obj:`Future` object.
         """
-        self._error = False
-        self._result = None
-
-        self._lock = threading.Lock()
-        self._condition = threading.Condition(lock=self._lock)
-
-    @property
-    def done(self):
-        """
-        Check whether the represented operation is still in progress.
+        super().__init__()
 
-        Returns:
-            bool:
-                ``True`` is the represented operation finished successfully or
-                failed.
-        """
-        with self._lock:
-            return self._result is not None
+        self._canceller = None
 
     def get(self, timeout=0):
         """
@@ -104,38 +107,37 @@ class Future:
             FutureTimeoutException:
                 If the result does not become available within the amount of
                 time specified via ``timeout``.
+            FutureCancelled:
+                If the operation has been cancelled.
         """
-        with self._lock:
-            while self._result is None:
-                if timeout <= 0:
-                    self._condition.wait()
-                else:
-                    self._condition.wait(timeout=timeout)
-                    if self._result is None:
-                        raise FutureTimeout(
-                            'Timeout while waiting for result; '
-                            'Waited {} seconds.'.format(timeout))
-
-        if self._error:
-            raise FutureExecutionError(
-                'Failed to execute operation: {}'.format(self._result))
-
-        return self._result
+        try:
+            return self.result(timeout=timeout if timeout > 0 else None)
+        except concurrent.futures.TimeoutError:
+            raise FutureTimeout(
+                'Timeout while waiting for result; '
+                'Waited {} seconds.'.format(timeout)) from None
+        except FutureCancelled:
+            raise
+        except concurrent.futures.CancelledError:
+            raise FutureCancelled('Operation has been cancelled') from None
 
     def set_result(self, result):
         """
         Set the result and notify all waiting consumers.
 
-        Sets the result of the :obj:`Future` to ``result`` and wakes all
-        threads waiting for the result.
+        Sets the result of the :obj:`Future` to ``result``, wakes all
+        threads waiting for the result and calls the done callbacks. Does
+        nothing if the operation has already completed or has been
+        cancelled.
 
         Args:
             result:
                 The result of the :obj:`Future` object.
         """
-        with self._lock:
-            self._result = result
-            self._condition.notifyAll()
+        with self._condition:
+            if self.done():
+                return
+            super().set_result(result)
 
     def set_error(self, message):
         """
@@ -149,19 +151,53 @@ class Future:
             message (str):
                 An error message that explains why/how the operation failed.
         """
-        with self._lock:
-            self._result = message
-            self._error = True
-            self._condition.notify()
+        self.set_exception(FutureExecutionError(
+            'Failed to execute operation: {}'.format(message)))
+
+    def set_exception(self, exception):
+        """
+        Indicate a failure and notify all waiting consumers.
+
+        Like :meth:`set_error` but :meth:`get` raises ``exception``.
+
+        Args:
+            exception (Exception):
+                The exception which explains why/how the operation failed.
+        """
+        # The base class wakes all waiting threads via notify_all.
+        with self._condition:
+            if self.done():
+                return
+            super().set_exception(exception)
+
+    def cancel(self):
+        """
+        Cancel the represented operation unless it has already completed.
+
+        Threads waiting for the result are woken and :meth:`get` raises
+        :obj:`FutureCancelled`.
+
+        Returns:
+            bool:
+                ``True`` if the operation has been cancelled, ``False`` if
+                it had already completed.
+        """
+        if not super().cancel():
+            return False
+        canceller, self._canceller = self._canceller, None
+        if canceller is not None:
+            canceller()
+        return True
 
     def __str__(self):
-        with self._lock:
-            if self._result is None:
-                state = 'running'
-            elif self._error:
-                state = 'failed'
-            else:
-                state = 'completed'
+        if self.cancelled():
+            state = 'cancelled'
+        elif not self.done():
+            state = 'running'
+        elif self.exception() is not None:
+            state = 'failed'
+        else:
+            state = 'completed'
         return '<{} {} at 0x{:x}>'.format(type(self).__name__, state, id(self))
 
     def __repr__(self):
@@ -173,11 +209,11 @@ class DataFuture(Future):
     A :obj:`Future` that automatically returns the payload of an :obj:`Event`.
 
     Instances of this class are like ordinary :obj:`Future`s, the only
-    difference being that the :obj:`get` method returns the payload of an
-    :obj:`Event` object.
+    difference being that the :obj:`get` and :obj:`result` methods return
+    the payload of an :obj:`Event` object.
 
     .. codeauthor:: jmoringe
     """
 
-    def get(self, timeout=0):
-        return super().get(timeout=timeout).data
+    def result(self, timeout=None):
+        return super().result(timeout=timeout).data
@@ -0,0 +1,186 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Contains the membership protocol for work sharing between local servers.
+
+.. codeauthor:: jmoringe
+"""
+
+import threading
+import time
+import zlib
+
+import rsb
+from rsb.eventprocessing import DirectEventReceivingStrategy
+import rsb.util
+
+
+class WorkGroup:
+    """
+    Tracks the live instances of a :obj:`rsb.patterns.LocalServer` scope.
+
+    Each member periodically publishes an ``ANNOUNCE`` event on the
+    ``/__group__`` sub-scope of the server scope and answers the
+    announcement of a previously unknown member with an announcement of
+    its own so that new members are learned quickly. Members which have
+    not been heard of for three heartbeat intervals are forgotten and
+    members which are deactivated publish a ``LEAVE`` event.
+
+    Requests are assigned to members by rendezvous hashing of the request
+    :obj:`rsb.EventId` over the set of live members. As long as all
+    members have the same view of the group, every request is owned by
+    exactly one member. While members join or leave, requests can be
+    executed twice or not at all until the views agree again.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, server, interval=1.0):
+        """
+        Create a new group and join it as the member for ``server``.
+
+        Args:
+            server (rsb.patterns.LocalServer):
+                The server on whose behalf this object participates in the
+                group.
+            interval (float):
+                The number of seconds between heartbeat announcements.
+        """
+        self._logger = rsb.util.get_logger_by_class(self.__class__)
+
+        self._interval = interval
+        self._members = {}
+        self._view = ()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        scope = server.scope.concat(rsb.Scope('/__group__'))
+        self._informer = rsb.create_informer(scope, server.config,
+                                             parent=server,
+                                             data_type=type(None))
+        self._id = self._informer.participant_id
+        self._update_view()
+
+        self._listener = rsb.create_listener(
+            scope, server.config,
+            parent=server,
+            receiving_strategy=DirectEventReceivingStrategy())
+        self._listener.add_handler(self._handle_event)
+
+        self._thread = threading.Thread(target=self._heartbeat,
+                                        name='WorkGroupHeartbeat',
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def member_id(self):
+        return self._id
+
+    @property
+    def members(self):
+        """
+        Return the ids of the currently known live members.
+
+        Returns:
+            tuple:
+                The sorted :obj:`uuid.UUID` ids, including the id of this
+                member.
+        """
+        return self._view
+
+    def owner(self, event_id):
+        """
+        Return the id of the member responsible for a request.
+
+        Args:
+            event_id (rsb.EventId):
+                The id of the request event.
+
+        Returns:
+            uuid.UUID:
+                The id of the member which should execute the request.
+        """
+        key = event_id.participant_id.bytes \
+            + event_id.sequence_number.to_bytes(8, 'big')
+        return max(self._view,
+                   key=lambda member: (zlib.crc32(member.bytes + key),
+                                       member.bytes))
+
+    def owns(self, event_id):
+        return self.owner(event_id) == self._id
+
+    def _update_view(self):
+        self._view = tuple(sorted([self._id] + list(self._members)))
+
+    def _announce(self, method='ANNOUNCE'):
+        self._informer.publish_event(
+            rsb.Event(scope=self._informer.scope, method=method,
+                      data=None, data_type=type(None)))
+
+    def _handle_event(self, event):
+        member = event.sender_id
+        if member == self._id:
+            return
+
+        with self._lock:
+            if event.method == 'LEAVE':
+                if self._members.pop(member, None) is not None:
+                    self._update_view()
+                return
+            if event.method != 'ANNOUNCE':
+                return
+            new = member not in self._members
+            self._members[member] = time.monotonic()
+            if new:
+                self._update_view()
+        if new:
+            self._logger.info('Member %s joined the group', member)
+            self._announce()
+
+    def _heartbeat(self):
+        while True:
+            try:
+                self._announce()
+            except Exception as e:
+                self._logger.warning('Failed to announce membership: %s',
+                                     e, exc_info=True)
+            if self._stop.wait(self._interval):
+                return
+
+            deadline = time.monotonic() - 3 * self._interval
+            with self._lock:
+                expired = [member for (member, seen)
+                           in self._members.items() if seen < deadline]
+                for member in expired:
+                    del self._members[member]
+                if expired:
+                    self._update_view()
+            for member in expired:
+                self._logger.info('Member %s left the group', member)
+
+    def deactivate(self):
+        self._stop.set()
+        self._thread.join()
+        self._listener.deactivate()
+        try:
+            self._announce('LEAVE')
+        finally:
+            self._informer.deactivate()
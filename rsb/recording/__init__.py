@@ -0,0 +1,637 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Recording of the notifications exchanged via the socket transport.
+
+A :obj:`Recorder` attaches to a socket bus like the connectors of
+listeners, but stores notifications before their payloads are converted.
+A :obj:`LogWriter` appends the serialized notifications to segmented log
+files using large buffered writes. :obj:`Recording` reads such logs
+via :mod:`mmap` and uses their indexes to answer queries by time range
+and scope without reading the whole log. The ``rsb-record`` command
+records until it is interrupted. :mod:`rsb.recording.replay` publishes
+recordings again.
+
+Each segment of a recording consists of three files named after the
+number of the segment:
+
+``NNNNNNNN.log``
+  A magic header followed by one record per notification: the size of
+  the notification and its timestamp (little-endian 32 and 64 bit
+  unsigned integers) followed by the serialized
+  :obj:`rsb.protocol.Notification_pb2.Notification`.
+``NNNNNNNN.idx``
+  One fixed-size entry per record: the offset of the record in the log,
+  the timestamp, the number of the scope and the size of the
+  notification.
+``NNNNNNNN.scopes``
+  The scopes of the notifications in the segment, one per line, numbered
+  in the order of their first appearance.
+
+Timestamps are reception times in microseconds since the epoch. They do
+not decrease within a recording so that indexes can be searched by time.
+Index entries are written after the records they point to, so readers
+of a recording which is still being written only see complete records.
+
+.. codeauthor:: jmoringe
+"""
+
+import argparse
+import collections
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+
+import rsb
+import rsb.converter
+from rsb.protocol.Notification_pb2 import Notification
+import rsb.transport.socket
+from rsb.util import get_logger_by_class
+
+_LOG_MAGIC = b'RSBLOG\x00\x01'
+_RECORD_HEADER = struct.Struct('<IQ')
+_INDEX_ENTRY = struct.Struct('<QQII')
+_SEGMENT_PATTERN = re.compile(r'^(\d{8})\.log$')
+
+
+def _segment_numbers(directory):
+    numbers = []
+    for name in os.listdir(directory):
+        match = _SEGMENT_PATTERN.match(name)
+        if match:
+            numbers.append(int(match.group(1)))
+    return sorted(numbers)
+
+
+def _segment_base(directory, number):
+    return os.path.join(directory, '{:08d}'.format(number))
+
+
+def _last_timestamp(directory, number):
+    # Return the timestamp in microseconds of the last complete index
+    # entry of segment NUMBER or zero.
+    try:
+        with open(_segment_base(directory, number) + '.idx', 'rb') as stream:
+            count = os.fstat(stream.fileno()).st_size // _INDEX_ENTRY.size
+            if not count:
+                return 0
+            stream.seek((count - 1) * _INDEX_ENTRY.size)
+            return _INDEX_ENTRY.unpack(stream.read(_INDEX_ENTRY.size))[1]
+    except FileNotFoundError:
+        return 0
+
+
+def _in_scope(scope, filter_scope):
+    if filter_scope is None or scope == filter_scope:
+        return True
+    return scope.is_sub_scope_of(filter_scope)
+
+
+class _Chunk:
+
+    def __init__(self, segment):
+        self.segment = segment
+        self.log = bytearray()
+        self.index = bytearray()
+        self.scopes = bytearray()
+
+
+class LogWriter:
+    """
+    Appends serialized notifications to the segments of a recording.
+
+    :meth:`append` only copies the data into a buffer. A background thread
+    writes the buffer when it exceeds ``buffer_size`` or after
+    ``flush_interval`` seconds. Instances are thread-safe.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, directory,
+                 segment_size=256 * 1024 * 1024,
+                 buffer_size=4 * 1024 * 1024,
+                 flush_interval=1.0):
+        """
+        Create a writer which adds new segments to ``directory``.
+
+        Args:
+            directory (str):
+                The directory of the recording. It is created if it does
+                not exist. Segments already in the directory are kept.
+            segment_size (int):
+                The size in bytes after which a new log segment is
+                started.
+            buffer_size (int):
+                The number of buffered bytes which triggers a write.
+            flush_interval (float):
+                The maximum time in seconds for which data is buffered.
+        """
+        self._logger = get_logger_by_class(self.__class__)
+
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._segment_size = segment_size
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+
+        self._condition = threading.Condition()
+        self._chunks = []
+        self._buffered = 0
+        numbers = _segment_numbers(directory)
+        self._segment = numbers[-1] if numbers else -1
+        self._offset = None
+        self._scopes = {}
+        # Continue the monotonic timestamps of an existing recording.
+        self._last_time = _last_timestamp(directory, self._segment) \
+            if numbers else 0
+        self._count = 0
+        self._closed = False
+
+        # Serializes writes of the background thread and of flush.
+        self._write_lock = threading.Lock()
+        self._files = None
+
+        self._thread = threading.Thread(target=self._write_loop,
+                                        name='LogWriter', daemon=True)
+        self._thread.start()
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def count(self):
+        """
+        Return the number of appended notifications.
+
+        Returns:
+            int:
+                The number of notifications including buffered ones.
+        """
+        return self._count
+
+    def append(self, data, scope, timestamp=None):
+        """
+        Append a serialized notification.
+
+        Args:
+            data (bytes):
+                The serialized notification.
+            scope (str):
+                The scope of the notification.
+            timestamp (float or NoneType):
+                The reception time in seconds since the epoch. The current
+                time is used if ``None``.
+
+        Raises:
+            RuntimeError:
+                If the writer has been closed.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        size = _RECORD_HEADER.size + len(data)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Log writer has been closed')
+            micros = max(int(timestamp * 1000000), self._last_time)
+            self._last_time = micros
+
+            full = self._offset is not None \
+                and self._offset > len(_LOG_MAGIC) \
+                and self._offset + size > self._segment_size
+            if self._offset is None or full:
+                self._start_segment()
+            elif not self._chunks:
+                self._chunks.append(_Chunk(self._segment))
+            chunk = self._chunks[-1]
+
+            number = self._scopes.get(scope)
+            if number is None:
+                number = self._scopes[scope] = len(self._scopes)
+                chunk.scopes += scope.encode('utf-8') + b'\n'
+            chunk.index += _INDEX_ENTRY.pack(self._offset, micros, number,
+                                             len(data))
+            chunk.log += _RECORD_HEADER.pack(len(data), micros)
+            chunk.log += data
+
+            self._offset += size
+            self._buffered += size
+            self._count += 1
+            if self._buffered >= self._buffer_size:
+                self._condition.notify()
+
+    def flush(self):
+        """Write all buffered notifications."""
+        with self._write_lock:
+            self._write_pending()
+
+    def close(self):
+        """Write all buffered notifications and close the files."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _start_segment(self):
+        self._segment += 1
+        self._offset = len(_LOG_MAGIC)
+        self._scopes = {}
+        chunk = _Chunk(self._segment)
+        chunk.log += _LOG_MAGIC
+        self._chunks.append(chunk)
+        self._buffered += len(_LOG_MAGIC)
+
+    def _write_loop(self):
+        while True:
+            with self._condition:
+                if not self._closed and self._buffered < self._buffer_size:
+                    self._condition.wait(self._flush_interval)
+                closed = self._closed
+            with self._write_lock:
+                try:
+                    self._write_pending()
+                except OSError:
+                    self._logger.error('Could not write to %s',
+                                       self._directory, exc_info=True)
+                if closed:
+                    self._close_files()
+                    return
+
+    def _write_pending(self):
+        with self._condition:
+            chunks, self._chunks = self._chunks, []
+            self._buffered = 0
+        for chunk in chunks:
+            if self._files is None or self._files[0] != chunk.segment:
+                self._close_files()
+                base = _segment_base(self._directory, chunk.segment)
+                self._files = (chunk.segment,) + tuple(
+                    open(base + suffix, 'ab')
+                    for suffix in ('.log', '.scopes', '.idx'))
+            # Write the index last so that it only refers to complete
+            # records. Buffered files write all data before flush
+            # returns.
+            for stream, data in zip(self._files[1:],
+                                    (chunk.log, chunk.scopes, chunk.index)):
+                if data:
+                    stream.write(data)
+                    stream.flush()
+
+    def _close_files(self):
+        if self._files is not None:
+            for stream in self._files[1:]:
+                stream.close()
+            self._files = None
+
+
+Entry = collections.namedtuple('Entry', ['timestamp', 'scope', 'data'])
+Entry.__doc__ = """
+A recorded notification.
+
+Attributes:
+    timestamp (float):
+        The reception time in seconds since the epoch.
+    scope (rsb.Scope):
+        The scope of the notification.
+    data (bytes):
+        The serialized notification.
+"""
+
+
+class _Segment:
+
+    def __init__(self, base):
+        # Map the files in the reverse order of writing so that the
+        # index only refers to scopes and records which have been read.
+        self._index, self.index = self._map(base + '.idx')
+        with open(base + '.scopes', 'rb') as stream:
+            self.scopes = [rsb.Scope(line.decode('utf-8'))
+                           for line in stream.read().splitlines()]
+        self._log, self.log = self._map(base + '.log')
+        self.count = len(self.index) // _INDEX_ENTRY.size if self.index \
+            else 0
+
+    @staticmethod
+    def _map(path):
+        stream = open(path, 'rb')
+        if os.fstat(stream.fileno()).st_size == 0:
+            return stream, b''
+        return stream, mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def timestamp(self, position):
+        return _INDEX_ENTRY.unpack_from(
+            self.index, position * _INDEX_ENTRY.size)[1]
+
+    def find(self, micros):
+        # Position of the first entry not older than micros.
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < micros:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def close(self):
+        for data, stream in ((self.log, self._log),
+                             (self.index, self._index)):
+            if isinstance(data, mmap.mmap):
+                data.close()
+            stream.close()
+
+
+class Recording:
+    """
+    Reads the notifications stored by a :obj:`LogWriter`.
+
+    The segments are mapped into memory when the recording is opened.
+    Notifications written afterwards are not visible.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, directory):
+        """
+        Open the recording in ``directory``.
+
+        Args:
+            directory (str):
+                The directory of the recording.
+        """
+        self._segments = []
+        for number in _segment_numbers(directory):
+            segment = _Segment(_segment_base(directory, number))
+            if segment.count:
+                self._segments.append(segment)
+            else:
+                segment.close()
+
+    def __len__(self):
+        return sum(segment.count for segment in self._segments)
+
+    @property
+    def start_time(self):
+        """
+        Return the timestamp of the first notification.
+
+        Returns:
+            float or NoneType:
+                The time in seconds since the epoch or ``None`` if the
+                recording is empty.
+        """
+        if not self._segments:
+            return None
+        return self._segments[0].timestamp(0) / 1000000
+
+    @property
+    def end_time(self):
+        """
+        Return the timestamp of the last notification.
+
+        Returns:
+            float or NoneType:
+                The time in seconds since the epoch or ``None`` if the
+                recording is empty.
+        """
+        if not self._segments:
+            return None
+        segment = self._segments[-1]
+        return segment.timestamp(segment.count - 1) / 1000000
+
+    def scopes(self):
+        """
+        Return the scopes of the recorded notifications.
+
+        Returns:
+            set of rsb.Scope:
+                The scopes.
+        """
+        return {scope
+                for segment in self._segments
+                for scope in segment.scopes}
+
+    def entries(self, start=None, end=None, scope=None):
+        """
+        Iterate over the recorded notifications in the order of reception.
+
+        Args:
+            start (float or NoneType):
+                If not ``None``, skip notifications received before this
+                time in seconds since the epoch.
+            end (float or NoneType):
+                If not ``None``, stop at the first notification received
+                at or after this time.
+            scope (rsb.Scope or str or NoneType):
+                If not ``None``, only return notifications on this scope
+                or its sub-scopes.
+
+        Yields:
+            Entry:
+                The recorded notifications.
+        """
+        start_micros = None if start is None else int(start * 1000000)
+        end_micros = None if end is None else int(end * 1000000)
+        if scope is not None:
+            scope = rsb.Scope.ensure_scope(scope)
+
+        for segment in self._segments:
+            if end_micros is not None \
+                    and segment.timestamp(0) >= end_micros:
+                return
+            if start_micros is not None \
+                    and segment.timestamp(segment.count - 1) < start_micros:
+                continue
+            numbers = {number
+                       for number, segment_scope in enumerate(segment.scopes)
+                       if _in_scope(segment_scope, scope)}
+            if not numbers:
+                continue
+
+            position = 0 if start_micros is None \
+                else segment.find(start_micros)
+            index, log = segment.index, segment.log
+            for position in range(position, segment.count):
+                offset, micros, number, size = _INDEX_ENTRY.unpack_from(
+                    index, position * _INDEX_ENTRY.size)
+                if end_micros is not None and micros >= end_micros:
+                    return
+                if number in numbers:
+                    offset += _RECORD_HEADER.size
+                    yield Entry(micros / 1000000, segment.scopes[number],
+                                log[offset:offset + size])
+
+    def notifications(self, start=None, end=None, scope=None):
+        """
+        Iterate over parsed notifications like :meth:`entries`.
+
+        Payloads are not deserialized.
+
+        Yields:
+            tuple:
+                The timestamp and the
+                :obj:`rsb.protocol.Notification_pb2.Notification`.
+        """
+        for entry in self.entries(start, end, scope):
+            notification = Notification()
+            notification.ParseFromString(entry.data)
+            yield entry.timestamp, notification
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _RecordingConnector(rsb.transport.socket.InPushConnector):
+
+    def __init__(self, writer, **kwargs):
+        self._writer = writer
+
+        super().__init__(**kwargs)
+
+    def handle(self, notification):
+        self._writer.append(notification.SerializeToString(),
+                            notification.scope.decode('ASCII'))
+
+
+class Recorder:
+    """
+    Records the notifications of a socket bus.
+
+    The recorder receives the notifications for its scope and all
+    sub-scopes from the bus which the socket transport options of its
+    configuration designate. Notifications are stored as received, without
+    converting their payloads. Payloads which the shared memory transport
+    placed into shared memory segments are not recorded.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, directory, scope='/', config=None, **options):
+        """
+        Create a recorder and start recording.
+
+        Args:
+            directory (str):
+                The directory of the recording.
+            scope (rsb.Scope or str):
+                The scope to record.
+            config (rsb.ParticipantConfig or NoneType):
+                The configuration which provides the socket transport
+                options. The default participant configuration is used if
+                ``None``.
+            options:
+                Options for the :obj:`LogWriter`.
+
+        Raises:
+            ValueError:
+                If the configuration does not contain socket transport
+                options.
+        """
+        if config is None:
+            config = rsb.get_default_participant_config()
+        try:
+            transport = config.get_transport('socket')
+        except KeyError:
+            raise ValueError('Recording requires socket transport options '
+                             'in the configuration')
+
+        self._writer = LogWriter(directory, **options)
+        self._connector = _RecordingConnector(
+            self._writer,
+            converters=rsb.converter.get_global_converter_map(bytes),
+            options=transport.options)
+        self._connector.scope = rsb.Scope.ensure_scope(scope)
+        try:
+            self._connector.activate()
+        except Exception:
+            self._writer.close()
+            raise
+
+    @property
+    def writer(self):
+        return self._writer
+
+    @property
+    def count(self):
+        """
+        Return the number of recorded notifications.
+
+        Returns:
+            int:
+                The number of notifications.
+        """
+        return self._writer.count
+
+    def deactivate(self):
+        """Stop recording and write all buffered notifications."""
+        self._connector.deactivate()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.deactivate()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='rsb-record',
+        description='Record the notifications of a socket bus.')
+    parser.add_argument('directory',
+                        help='Directory of the recording.')
+    parser.add_argument('--scope', default='/',
+                        help='Scope to record including sub-scopes.')
+    parser.add_argument('--segment-size', type=int, default=256,
+                        help='Size of log segments in MiB.')
+    parser.add_argument('--duration', type=float, default=0,
+                        help='Seconds to record or 0 to record until '
+                             'interrupted.')
+    arguments = parser.parse_args(args)
+
+    with Recorder(arguments.directory, arguments.scope,
+                  segment_size=arguments.segment_size * 1024 * 1024) \
+            as recorder:
+        try:
+            if arguments.duration > 0:
+                time.sleep(arguments.duration)
+            else:
+                while True:
+                    time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    print('Recorded {} notifications'.format(recorder.count),  # noqa: T001
+          file=sys.stderr)
+    return 0
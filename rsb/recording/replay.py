@@ -0,0 +1,250 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Replay of recordings onto a socket bus, available as ``rsb-replay``.
+
+A :obj:`Replayer` publishes the notifications of a
+:obj:`rsb.recording.Recording` through a socket transport out connector.
+Only the notification envelopes are parsed, payloads are sent as
+recorded without invoking converters. Event ids and meta data are kept,
+so receivers see the original ``create_time`` and ``send_time``.
+
+.. codeauthor:: jmoringe
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+import rsb
+import rsb.converter
+from rsb.recording import Recording
+import rsb.transport.socket
+
+_BATCH_SIZE = 64
+
+
+def _original_time(notification, timestamp):
+    meta_data = notification.meta_data
+    micros = meta_data.send_time or meta_data.create_time
+    if micros:
+        return micros / 1000000
+    return timestamp
+
+
+class _ReplayConnector(rsb.transport.socket.OutConnector):
+
+    def send(self, notification):
+        self.bus.handle_outgoing(notification)
+
+    def send_batch(self, notifications):
+        self.bus.handle_outgoing_batch(notifications)
+
+
+class Replayer:
+    """
+    Publishes recorded notifications at their original or a scaled rate.
+
+    Notifications are scheduled relative to the start of the replay
+    according to the differences between their original send times (or
+    create times, or reception times if the notifications carry neither).
+    Each notification is scheduled against the start instead of its
+    predecessor, so delays in sending do not accumulate. Notifications
+    which are late are sent immediately.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, recording, speed=1.0, scope=None, start=None,
+                 end=None, config=None):
+        """
+        Create a replayer and connect it to the bus.
+
+        Args:
+            recording (rsb.recording.Recording):
+                The recording to replay.
+            speed (float or NoneType):
+                The factor by which the replay is faster than the
+                original, for example ``2.0`` or ``10.0``. ``None`` or
+                zero replays as fast as possible.
+            scope (rsb.Scope or str or NoneType):
+                If not ``None``, only replay notifications on this scope
+                or its sub-scopes.
+            start (float or NoneType):
+                If not ``None``, skip notifications received before this
+                time in seconds since the epoch.
+            end (float or NoneType):
+                If not ``None``, stop at the first notification received
+                at or after this time.
+            config (rsb.ParticipantConfig or NoneType):
+                The configuration which provides the socket transport
+                options. The default participant configuration is used if
+                ``None``.
+
+        Raises:
+            ValueError:
+                If ``speed`` is negative or the configuration does not
+                contain socket transport options.
+        """
+        if speed is not None and speed < 0:
+            raise ValueError(
+                'Speed has to be positive or zero, not {}'.format(speed))
+        if config is None:
+            config = rsb.get_default_participant_config()
+        try:
+            transport = config.get_transport('socket')
+        except KeyError:
+            raise ValueError('Replay requires socket transport options '
+                             'in the configuration')
+
+        self._recording = recording
+        self._speed = speed or None
+        self._scope = scope
+        self._start = start
+        self._end = end
+        self._stopped = threading.Event()
+        self._count = 0
+        self._lag = 0.0
+
+        self._connector = _ReplayConnector(
+            converters=rsb.converter.get_global_converter_map(bytes),
+            options=transport.options)
+        self._connector.scope = rsb.Scope('/')
+        self._connector.activate()
+
+    @property
+    def count(self):
+        """
+        Return the number of notifications replayed so far.
+
+        Returns:
+            int:
+                The number of notifications.
+        """
+        return self._count
+
+    @property
+    def lag(self):
+        """
+        Return the maximum delay behind the schedule.
+
+        Returns:
+            float:
+                The delay in seconds. Zero when replaying as fast as
+                possible.
+        """
+        return self._lag
+
+    def run(self):
+        """
+        Replay the recording.
+
+        Returns:
+            int:
+                The number of replayed notifications.
+        """
+        notifications = self._recording.notifications(
+            self._start, self._end, self._scope)
+        if self._speed is None:
+            self._run_fast(notifications)
+        else:
+            self._run_scheduled(notifications)
+        return self._count
+
+    def stop(self):
+        """Stop a replay which is running in another thread."""
+        self._stopped.set()
+
+    def deactivate(self):
+        self._connector.deactivate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.deactivate()
+
+    def _run_fast(self, notifications):
+        batch = []
+        for _, notification in notifications:
+            if self._stopped.is_set():
+                break
+            batch.append(notification)
+            if len(batch) == _BATCH_SIZE:
+                self._connector.send_batch(batch)
+                self._count += len(batch)
+                batch = []
+        if batch:
+            self._connector.send_batch(batch)
+            self._count += len(batch)
+
+    def _run_scheduled(self, notifications):
+        origin = start = None
+        latest = None
+        for timestamp, notification in notifications:
+            original = _original_time(notification, timestamp)
+            # Original times of different senders can be slightly out of
+            # order. Keep the recorded order.
+            if latest is None or original > latest:
+                latest = original
+            if origin is None:
+                origin, start = latest, time.monotonic()
+
+            due = start + (latest - origin) / self._speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                if self._stopped.wait(delay):
+                    break
+            else:
+                self._lag = max(self._lag, -delay)
+                if self._stopped.is_set():
+                    break
+            self._connector.send(notification)
+            self._count += 1
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='rsb-replay',
+        description='Publish the notifications of a recording.')
+    parser.add_argument('directory',
+                        help='Directory of the recording.')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Factor by which the replay is faster than '
+                             'the original or 0 for as fast as possible.')
+    parser.add_argument('--scope', default=None,
+                        help='Only replay this scope and its sub-scopes.')
+    arguments = parser.parse_args(args)
+    if arguments.speed < 0:
+        parser.error('speed must not be negative')
+
+    with Recording(arguments.directory) as recording, \
+            Replayer(recording, arguments.speed,
+                     scope=arguments.scope) as replayer:
+        try:
+            replayer.run()
+        except KeyboardInterrupt:
+            pass
+        message = 'Replayed {} notifications, maximum lag {:.6f} s'.format(
+            replayer.count, replayer.lag)
+        print(message, file=sys.stderr)  # noqa: T001
+    return 0
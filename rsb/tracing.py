@@ -0,0 +1,361 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Opt-in tracing of the stages events pass through.
+
+While tracing is enabled (see :func:`enable` and the ``tracing.enabled``
+configuration option), events carry a trace of monotonic timestamps
+(see :attr:`rsb.Event.trace`). Whenever an event reaches one of the
+stages in :data:`STAGES`, the time elapsed since the previous stage is
+recorded in a histogram of the active :obj:`Tracer` for the scope of the
+event and the reached stage. For example, the ``deserialize`` histogram
+of a scope contains the time spent in converters and the
+``handler-start`` histogram the time events waited in the queues of the
+receiving strategy.
+
+The stages in the order in which events pass them are:
+
+``publish``
+  :meth:`rsb.Informer.publish_event` has been called.
+``serialize``
+  The payload has been converted into wire data.
+``bus-write``
+  The notification has been handed to the bus and written to the
+  connections.
+``frame-read``
+  A frame containing the notification has been read from a connection.
+``parse``
+  The notification has been parsed.
+``deserialize``
+  The payload has been converted from wire data.
+``enqueue``
+  The event has been handed to the receiving strategy.
+``handler-start``
+  A handler is about to be called.
+``handler-end``
+  The handler has returned.
+
+Traces end at process boundaries since monotonic clocks of different
+processes cannot be compared. The receiving side starts a new trace at
+``frame-read``. Transports skip stages which do not apply to them: the
+inprocess transport neither serializes events nor uses frames. Pull
+connectors, as used by :obj:`rsb.Reader`, enqueue notifications before
+deserializing them when they are read. The inprocess transport also
+delivers the same event object, including its trace, to all receivers in
+the process so that stages of concurrent receivers can interleave.
+
+When tracing is disabled, events do not carry traces and each stage costs
+a single attribute check.
+
+.. codeauthor:: jmoringe
+"""
+
+import threading
+import time
+
+import rsb.util
+
+STAGES = ('publish', 'serialize', 'bus-write',
+          'frame-read', 'parse', 'deserialize',
+          'enqueue', 'handler-start', 'handler-end')
+
+
+class Tracer:
+    """
+    Aggregates the durations of pipeline stages into per-scope histograms.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    @property
+    def scopes(self):
+        """
+        Return the scopes for which durations have been recorded.
+
+        Returns:
+            list of rsb.Scope:
+                The scopes in no particular order.
+        """
+        with self._lock:
+            return list(self._histograms)
+
+    def record(self, scope, stage, duration):
+        """
+        Record that an event on ``scope`` took ``duration`` to reach ``stage``.
+
+        Args:
+            scope (rsb.Scope):
+                The scope of the event.
+            stage (str):
+                One of :data:`STAGES`.
+            duration (float):
+                The time in seconds since the previous stage.
+        """
+        with self._lock:
+            histograms = self._histograms.get(scope)
+            if histograms is None:
+                histograms = self._histograms[scope] = {}
+            histogram = histograms.get(stage)
+            if histogram is None:
+                histogram = histograms[stage] = rsb.util.Histogram()
+            histogram.record(max(duration, 0.0))
+
+    def histograms(self, scope, include_sub_scopes=False):
+        """
+        Return the histograms of the stages of events on ``scope``.
+
+        Args:
+            scope (rsb.Scope):
+                The scope for which histograms should be returned.
+            include_sub_scopes (bool):
+                If ``True``, the durations of events on sub-scopes of
+                ``scope`` are included.
+
+        Returns:
+            dict:
+                Copies of the histograms of the reached stages, keyed by
+                stage name, in the order of :data:`STAGES`.
+        """
+        merged = {}
+        with self._lock:
+            for other, histograms in self._histograms.items():
+                sub_scope = include_sub_scopes \
+                    and other.is_sub_scope_of(scope)
+                if not (other == scope or sub_scope):
+                    continue
+                for stage, histogram in histograms.items():
+                    if stage in merged:
+                        merged[stage].merge(histogram)
+                    else:
+                        merged[stage] = histogram.copy()
+        return {stage: merged[stage] for stage in STAGES if stage in merged}
+
+    def summary(self):
+        """
+        Summarize the recorded durations of all scopes.
+
+        Returns:
+            dict:
+                For each scope string, a dictionary mapping stage names to
+                the result of :meth:`rsb.util.Histogram.summary`.
+        """
+        result = {}
+        for scope in self.scopes:
+            result[scope.to_string()] = {
+                stage: histogram.summary()
+                for stage, histogram in self.histograms(scope).items()}
+        return result
+
+    def reset(self):
+        """Discard all recorded durations."""
+        with self._lock:
+            self._histograms = {}
+
+
+_tracer = None
+_incoming = threading.local()
+
+
+def enable(tracer=None):
+    """
+    Start tracing events created from now on.
+
+    Args:
+        tracer (Tracer or None):
+            The tracer which should receive durations. A new tracer is
+            created if ``None``.
+
+    Returns:
+        Tracer:
+            The active tracer.
+    """
+    global _tracer
+    if tracer is None:
+        tracer = Tracer()
+    _tracer = tracer
+    return tracer
+
+
+def disable():
+    """Stop tracing events."""
+    global _tracer
+    _tracer = None
+
+
+def get_tracer():
+    """
+    Return the active tracer.
+
+    Returns:
+        Tracer or None:
+            The active tracer or ``None`` if tracing is disabled.
+    """
+    return _tracer
+
+
+def begin(stage):
+    """
+    Start a trace which is not attached to an event yet.
+
+    Args:
+        stage (str):
+            The first stage of the trace.
+
+    Returns:
+        tuple or None:
+            The trace or ``None`` if tracing is disabled.
+    """
+    if _tracer is None:
+        return None
+    return ((stage, time.monotonic()),)
+
+
+def extend(trace, stage):
+    """
+    Add ``stage`` to a trace which is not attached to an event yet.
+
+    Args:
+        trace (tuple or None):
+            A trace returned by :func:`begin` or ``None``.
+        stage (str):
+            The reached stage.
+
+    Returns:
+        tuple or None:
+            The extended trace or ``None`` if ``trace`` is ``None``.
+    """
+    if trace is None:
+        return None
+    return trace + ((stage, time.monotonic()),)
+
+
+def set_incoming(notifications, trace):
+    """
+    Install ``trace`` for ``notifications`` dispatched by this thread.
+
+    Transports call this around dispatching received notifications so that
+    connectors can continue the trace with :func:`incoming`.
+
+    Args:
+        notifications (list):
+            The notifications which are about to be dispatched.
+        trace (tuple or None):
+            A trace returned by :func:`begin` or ``None`` to remove the
+            installed trace.
+    """
+    if trace is None:
+        _incoming.traces = None
+    else:
+        _incoming.traces = {id(notification): trace
+                            for notification in notifications}
+
+
+def incoming(notification):
+    """
+    Return the trace of ``notification`` which is dispatched by this thread.
+
+    Args:
+        notification:
+            The notification a connector received.
+
+    Returns:
+        tuple or None:
+            The trace installed with :func:`set_incoming`, an empty trace
+            if there is none but tracing is enabled or ``None``.
+    """
+    traces = getattr(_incoming, 'traces', None)
+    if traces is not None:
+        trace = traces.get(id(notification))
+        if trace is not None:
+            return trace
+    if _tracer is None:
+        return None
+    return ()
+
+
+def attach(event, trace):
+    """
+    Attach ``trace`` to ``event`` and record the durations it contains.
+
+    Args:
+        event (rsb.Event):
+            The event which was created from the traced notification.
+        trace (tuple or None):
+            A trace returned by :func:`begin`, :func:`extend` or
+            :func:`incoming`.
+    """
+    if trace is None:
+        return
+    event.trace = trace
+    for (_, previous), (stage, now) in zip(trace, trace[1:]):
+        _record(event.scope, stage, now - previous)
+
+
+def mark(event, stage):
+    """
+    Record that ``event`` has reached ``stage`` if it is traced.
+
+    Args:
+        event (rsb.Event):
+            The event.
+        stage (str):
+            One of :data:`STAGES`.
+    """
+    trace = event.trace
+    if trace is None:
+        return
+    now = time.monotonic()
+    event.trace = trace + ((stage, now),)
+    if trace:
+        _record(event.scope, stage, now - trace[-1][1])
+
+
+def call_handler(handler, event):
+    """
+    Call ``handler`` with the traced ``event`` and record its duration.
+
+    The ``handler-start`` and ``handler-end`` stages are not added to the
+    trace of ``event`` since the event can be passed to multiple handlers.
+
+    Args:
+        handler (callable):
+            The handler.
+        event (rsb.Event):
+            An event with a trace.
+    """
+    trace = event.trace
+    start = time.monotonic()
+    if trace:
+        _record(event.scope, 'handler-start', start - trace[-1][1])
+    try:
+        handler(event)
+    finally:
+        _record(event.scope, 'handler-end', time.monotonic() - start)
+
+
+def _record(scope, stage, duration):
+    tracer = _tracer
+    if tracer is not None:
+        tracer.record(scope, stage, duration)
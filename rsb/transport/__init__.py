@@ -89,6 +89,19 @@ class Connector(metaclass=abc.ABCMeta):
         """
         self._scope = new_value
 
+    @property
+    def payload_bytes(self):
+        """
+        Return the number of payload bytes transferred by this connector.
+
+        Returns:
+            int:
+                The total size of the serialized payloads sent or
+                received. Transports which do not serialize events return
+                zero.
+        """
+        return 0
+
     @abc.abstractmethod
     def activate(self):
         pass
@@ -136,7 +149,7 @@ class InPullConnector(Connector):
     """
 
     @abc.abstractmethod
-    def raise_event(self, block):
+    def raise_event(self, block, timeout=None):
         """
         Return the next received event.
 
@@ -144,12 +157,42 @@ class InPullConnector(Connector):
             block (bool):
                 If ``True``, wait for the next event, else immediately return,
                 possibly ``None``.
+            timeout (float or None):
+                If ``block`` is ``True``, the maximum time in seconds to wait
+                for the next event. ``None`` means waiting indefinitely.
         Returns:
             rsb.Event or ``None``
-                The next event or ``None`` if ``block`` is ``False``.
+                The next event or ``None`` if no event was received in time.
         """
         pass
 
+    def read_many(self, max_count, timeout=None):
+        """
+        Return up to ``max_count`` received events.
+
+        Only waits for the first event. Subclasses should override this
+        method if they can remove multiple events at once.
+
+        Args:
+            max_count (int):
+                The maximum number of returned events.
+            timeout (float or None):
+                The maximum time in seconds to wait for the first event.
+                ``None`` means waiting indefinitely, zero means not waiting.
+
+        Returns:
+            list:
+                The events in the order in which they were received.
+        """
+        events = []
+        event = self.raise_event(timeout != 0, timeout)
+        while event is not None:
+            events.append(event)
+            if len(events) >= max_count:
+                break
+            event = self.raise_event(False)
+        return events
+
 
 class OutConnector(Connector):
     """
@@ -169,6 +212,20 @@ class OutConnector(Connector):
         """
         pass
 
+    def handle_batch(self, events):
+        """
+        Send ``events`` in order.
+
+        Subclasses should override this method if they can send multiple
+        events more efficiently than one at a time.
+
+        Args:
+            events (list):
+                events to send
+        """
+        for event in events:
+            self.handle(event)
+
 
 class ConverterSelectingConnector:
     """
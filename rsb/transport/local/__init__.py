@@ -33,6 +33,8 @@ import queue
 from threading import RLock
 
 from rsb import transport
+import rsb.tracing
+import rsb.util
 
 
 class Bus:
@@ -170,18 +172,60 @@ class InPushConnector(transport.InPushConnector):
 
 
 class InPullConnector(transport.InPullConnector):
+    """
+    InPullConnector for the local transport.
+
+    Events are queued until they are pulled. The queue holds at most
+    ``queuesize`` (option, default zero for no limit) events. When it is
+    full, the ``overflow`` option (default ``drop-oldest``) decides what
+    happens to further events (see :obj:`rsb.util.BoundedQueue`). With
+    ``block`` and ``raise``, the publishing thread blocks or receives the
+    :obj:`queue.Full` exception respectively.
+
+    .. codeauthor:: jwienke
+    """
 
     def __init__(
             self, bus=global_bus, converters=None, options=None, **kwargs):
         super().__init__(wire_type=object, **kwargs)
         self._bus = bus
-        self._event_queue = queue.Queue()
+        if options is None:
+            options = {}
+        self._event_queue = rsb.util.BoundedQueue(
+            int(options.get('queuesize', '0')),
+            options.get('overflow', 'drop-oldest'))
+
+    @property
+    def dropped(self):
+        """
+        Return the number of events dropped because of overflow.
+
+        Returns:
+            int:
+                The number of dropped events.
+        """
+        return self._event_queue.dropped
+
+    @property
+    def queued(self):
+        """
+        Return the number of queued events.
+
+        Returns:
+            int:
+                The number of events waiting to be pulled.
+        """
+        return len(self._event_queue)
 
     def activate(self):
         assert self.scope is not None
+        self._event_queue.reopen()
         self._bus.add_sink(self)
 
     def deactivate(self):
+        # Release a publisher which waits for space in the queue while
+        # holding the lock of the bus.
+        self._event_queue.close()
         self._bus.remove_sink(self)
 
     def set_quality_of_service_spec(self, qos):
@@ -189,14 +233,21 @@ class InPullConnector(transport.InPullConnector):
 
     def handle(self, event):
         event.meta_data.set_receive_time()
+        rsb.tracing.mark(event, 'enqueue')
         self._event_queue.put(event)
 
-    def raise_event(self, block):
+    def raise_event(self, block, timeout=None):
         try:
-            return self._event_queue.get(block)
+            return self._event_queue.get(block, timeout)
         except queue.Empty:
             return None
 
+    def read_many(self, max_count, timeout=None):
+        return self._event_queue.get_many(max_count, timeout)
+
+    def get_transport_url(self):
+        return self._bus.get_transport_url()
+
 
 class TransportFactory(transport.TransportFactory):
     """
@@ -0,0 +1,901 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+"""
+Contains a same-host transport which passes payloads via shared memory.
+
+Each sending process places payloads into the slots of a memory-mapped
+ring :obj:`Segment` and sends small descriptors (slot, generation and
+length of the payload) over a socket bus which serves as the control
+channel. Receiving processes map the slot and hand a ``memoryview`` of
+the payload to converters which pass through their input unchanged.
+
+A receiving process announces itself by locking an entry of the reader
+table at the start of the segment file when it attaches to the segment.
+Whenever the sending process writes a slot, it marks the slot for each
+announced receiving process. A receiving process removes its mark once
+it no longer references the payload or, if none of its connectors
+leases the slot, as soon as its bus has delivered the descriptor. The
+sending process only reuses slots without marks of live receiving
+processes, so descriptors which are still in flight keep their payloads.
+Marks of terminated processes are ignored since their locks are gone.
+The descriptor which causes a process to attach to a segment is not
+covered by a mark and its payload may already have been overwritten.
+
+A sender which finds no free slot sends the payload inline in the
+control notification instead.
+
+.. codeauthor:: jmoringe
+"""
+
+import atexit
+import contextlib
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+
+import rsb.converter
+from rsb.protocol.Notification_pb2 import Notification
+import rsb.tracing
+import rsb.transport
+import rsb.transport.conversion as conversion
+import rsb.transport.socket
+import rsb.util
+
+
+# Each slot starts with the generation of its current content and a
+# bit mask of the reader table entries of the receiving processes
+# which may still reference the content. The generation is
+# incremented whenever the slot is written.
+_HEADER = struct.Struct('<QQ')
+
+# The reader table at the start of the segment file consists of one
+# byte per receiving process, locked by that process, followed by the
+# number of entries which have been used so far.
+_MAX_READERS = 64
+_READERS = struct.Struct('<Q')
+
+# The key of the meta-data item which carries the descriptor of a payload
+# placed in a segment.
+_DESCRIPTOR_KEY = 'rsb.transport.shm.slot'
+
+# Converters which pass through their input unchanged. Receivers give
+# them a memoryview of the payload in the shared segment, other
+# converters receive a copy.
+_ZERO_COPY_CONVERTERS = (rsb.converter.BytesConverter,
+                         rsb.converter.SchemaAndByteArrayConverter)
+
+# The time in seconds for which the file of a segment which is no
+# longer used for sending remains in place for receivers which still
+# reference its slots.
+_RETIRE_TIMEOUT = 5.0
+_RETIRE_INTERVAL = 0.01
+
+
+def _default_directory():
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+class Segment:
+    """
+    A file-backed ring of fixed-size slots shared between processes.
+
+    The process which creates a segment writes payloads into its slots,
+    other processes open the segment by path and lease slots for reading.
+    Instances are shared by all connectors of a process, see
+    :obj:`acquire_segment`.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, path, fd, slots, slot_size, writable):
+        self._logger = rsb.util.get_logger_by_class(self.__class__)
+
+        self._path = path
+        self._fd = fd
+        self._slots = slots
+        self._slot_size = slot_size
+        self._start = mmap.ALLOCATIONGRANULARITY
+
+        self._lock = threading.Lock()
+        # Number of leases per slot held in this process. In the sending
+        # process, a slot is also held while its descriptor is being
+        # delivered to the receivers of the process.
+        self._leases = [0] * slots
+        self._generations = [0] * slots
+        self._next = 0
+        self._users = 0
+        self._closed = False
+
+        self._map = None
+        self._reader = None
+        if writable:
+            self._map = mmap.mmap(fd, self._start + slots * slot_size)
+        else:
+            self._reader = self._register()
+
+    @classmethod
+    def create(cls, directory, slots, slot_size):
+        """
+        Create a new segment file in ``directory``.
+
+        Args:
+            directory (str):
+                The directory in which the segment file is created.
+            slots (int):
+                The number of slots.
+            slot_size (int):
+                The minimum size of a slot in bytes including its header.
+                Rounded up to the allocation granularity of the system.
+
+        Returns:
+            Segment:
+                The new, writable segment.
+        """
+        granularity = mmap.ALLOCATIONGRANULARITY
+        slot_size = -(-slot_size // granularity) * granularity
+        path = os.path.join(directory, 'rsb-shm-{}-{}'.format(
+            os.getpid(), uuid.uuid4().hex))
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            os.ftruncate(fd, granularity + slots * slot_size)
+            return cls(path, fd, slots, slot_size, writable=True)
+        except Exception:
+            os.close(fd)
+            os.unlink(path)
+            raise
+
+    @classmethod
+    def attach(cls, path, slots, slot_size):
+        """
+        Open an existing segment for reading.
+
+        Args:
+            path (str):
+                The path of the segment file.
+            slots (int):
+                The number of slots.
+            slot_size (int):
+                The size of a slot in bytes.
+
+        Returns:
+            Segment:
+                The opened segment.
+        """
+        # Marks in slot headers are updated by receivers as well.
+        fd = os.open(path, os.O_RDWR)
+        try:
+            size = mmap.ALLOCATIONGRANULARITY + slots * slot_size
+            if os.fstat(fd).st_size < size:
+                raise ValueError('Segment {} is smaller than {} slots of {} '
+                                 'bytes'.format(path, slots, slot_size))
+            return cls(path, fd, slots, slot_size, writable=False)
+        except Exception:
+            os.close(fd)
+            raise
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def slots(self):
+        return self._slots
+
+    @property
+    def slot_size(self):
+        return self._slot_size
+
+    @property
+    def capacity(self):
+        """
+        Return the maximum size of a payload stored in one slot.
+
+        Returns:
+            int:
+                The capacity of a slot in bytes.
+        """
+        return self._slot_size - _HEADER.size
+
+    def write(self, data):
+        """
+        Store ``data`` in a free slot.
+
+        The slot is held until it is returned via :obj:`release` so
+        that it cannot be reused before the receivers in this process
+        have leased it.
+
+        Args:
+            data (bytes-like):
+                The payload. Must not be larger than :obj:`capacity`.
+
+        Returns:
+            tuple or None:
+                The slot and generation of the stored payload or ``None``
+                if all slots are in use.
+        """
+        with self._lock:
+            slot = self._acquire_for_writing()
+            if slot is None:
+                return None
+            generation = self._generations[slot]
+        start = self._offset(slot) + _HEADER.size
+        self._map[start:start + len(data)] = data
+        return slot, generation
+
+    def release(self, slot):
+        """
+        Return a slot held since :obj:`write`.
+
+        Args:
+            slot (int):
+                The slot returned by :obj:`write`.
+        """
+        self._release(slot)
+
+    def lease(self, slot, generation, length):
+        """
+        Return a view of the payload in ``slot``.
+
+        The slot cannot be overwritten while the returned view (or any
+        object created from it) is alive.
+
+        Args:
+            slot (int):
+                The slot containing the payload.
+            generation (int):
+                The generation of the payload.
+            length (int):
+                The length of the payload in bytes.
+
+        Returns:
+            memoryview or None:
+                A read-only view of the payload or ``None`` if the slot has
+                already been overwritten.
+        """
+        if not (0 <= slot < self._slots and 0 <= length <= self.capacity):
+            raise ValueError('Invalid slot {} or length {}'.format(
+                slot, length))
+        offset = self._offset(slot)
+        with self._lock:
+            if self._closed:
+                return None
+            if self._map is None and self._reader is None:
+                return self._copy(slot, generation, length)
+            count = self._leases[slot]
+            if self._map is None and count == 0:
+                if not self._claim(slot, generation):
+                    return None
+                self._generations[slot] = generation
+            elif self._generations[slot] != generation:
+                return None
+            self._leases[slot] = count + 1
+
+        # Each lease maps the slot separately so that the lease ends when
+        # the last view of the mapping is gone.
+        try:
+            mapping = mmap.mmap(self._fd, self._slot_size, offset=offset,
+                                access=mmap.ACCESS_READ)
+        except Exception:
+            self._release(slot)
+            raise
+        weakref.finalize(mapping, self._release, slot)
+        return memoryview(mapping)[_HEADER.size:_HEADER.size + length]
+
+    def acknowledge(self, slot, generation):
+        """
+        Remove the mark of this process from ``slot`` unless it is leased.
+
+        Receiving processes call this method for each descriptor they
+        have seen so that payloads which none of their connectors leased
+        do not keep their slots.
+
+        Args:
+            slot (int):
+                The slot of the descriptor.
+            generation (int):
+                The generation of the descriptor.
+        """
+        with self._lock:
+            if self._reader is None or self._fd is None \
+                    or not 0 <= slot < self._slots:
+                return
+            if self._leases[slot] == 0:
+                self._unmark(slot, generation)
+
+    def in_use(self):
+        """
+        Return whether receivers may still reference slots of the segment.
+
+        Returns:
+            bool:
+                ``True`` if a slot is leased in this process or carries
+                the mark of a live receiving process.
+        """
+        with self._lock:
+            if any(self._leases):
+                return True
+            count = self._reader_count()
+            for slot in range(self._slots):
+                with self._locked(self._offset(slot), _HEADER.size):
+                    _, readers = self._read_header(slot)
+                if self._live_readers(readers, count):
+                    return True
+            return False
+
+    def close(self):
+        """Close the segment once no leases remain."""
+        with self._lock:
+            self._closed = True
+            self._maybe_close()
+
+    def unlink(self):
+        """Remove the segment file. Existing mappings remain valid."""
+        try:
+            os.unlink(self._path)
+        except OSError as e:
+            self._logger.warning('Failed to remove segment %s: %s',
+                                 self._path, e)
+
+    def _offset(self, slot):
+        return self._start + slot * self._slot_size
+
+    @contextlib.contextmanager
+    def _locked(self, offset, length):
+        # Byte-range locks do not exclude other threads of this process;
+        # callers hold self._lock.
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+
+    def _read_header(self, slot):
+        return _HEADER.unpack(
+            os.pread(self._fd, _HEADER.size, self._offset(slot)))
+
+    def _write_header(self, slot, generation, readers):
+        os.pwrite(self._fd, _HEADER.pack(generation, readers),
+                  self._offset(slot))
+
+    def _reader_count(self):
+        count = _READERS.unpack(
+            os.pread(self._fd, _READERS.size, _MAX_READERS))[0]
+        return min(count, _MAX_READERS)
+
+    def _register(self):
+        for index in range(_MAX_READERS):
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, index)
+                break
+            except OSError:
+                continue
+        else:
+            self._logger.warning('All reader entries of %s are in use; '
+                                 'copying payloads', self._path)
+            return None
+
+        with self._locked(_MAX_READERS, _READERS.size):
+            if self._reader_count() <= index:
+                os.pwrite(self._fd, _READERS.pack(index + 1), _MAX_READERS)
+        # Remove marks left behind by a terminated process which used
+        # the same entry.
+        for slot in range(self._slots):
+            self._unmark(slot, None, index)
+        return index
+
+    def _live_readers(self, readers, count):
+        live = 0
+        for index in range(count):
+            bit = 1 << index
+            if not readers & bit:
+                continue
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, index)
+            except OSError:
+                live |= bit
+            else:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, index)
+        return live
+
+    def _acquire_for_writing(self):
+        count = self._reader_count()
+        everyone = (1 << count) - 1
+        for index in range(self._slots):
+            slot = (self._next + index) % self._slots
+            if self._leases[slot] != 0:
+                continue
+            with self._locked(self._offset(slot), _HEADER.size):
+                _, readers = self._read_header(slot)
+                if self._live_readers(readers, count):
+                    continue
+                # Descriptors of the previous content no longer match
+                # once the generation has been changed.
+                generation = self._generations[slot] + 1
+                self._write_header(slot, generation,
+                                   self._live_readers(everyone, count))
+            self._generations[slot] = generation
+            self._leases[slot] = 1
+            self._next = slot + 1
+            return slot
+        return None
+
+    def _claim(self, slot, generation):
+        # Mark the slot in case this process was not marked when the
+        # slot was written.
+        bit = 1 << self._reader
+        with self._locked(self._offset(slot), _HEADER.size):
+            current, readers = self._read_header(slot)
+            if current != generation:
+                return False
+            if not readers & bit:
+                self._write_header(slot, current, readers | bit)
+        return True
+
+    def _unmark(self, slot, generation, index=None):
+        bit = 1 << (self._reader if index is None else index)
+        with self._locked(self._offset(slot), _HEADER.size):
+            current, readers = self._read_header(slot)
+            if readers & bit and generation in (None, current):
+                self._write_header(slot, current, readers & ~bit)
+
+    def _copy(self, slot, generation, length):
+        # Without an entry in the reader table, the slot can be
+        # overwritten at any time. Copy the payload and check that the
+        # generation did not change meanwhile.
+        offset = self._offset(slot)
+        if self._read_header(slot)[0] != generation:
+            return None
+        data = os.pread(self._fd, length, offset + _HEADER.size)
+        if self._read_header(slot)[0] != generation:
+            return None
+        return memoryview(data)
+
+    def _release(self, slot):
+        with self._lock:
+            self._leases[slot] -= 1
+            if self._leases[slot] == 0 and self._reader is not None:
+                self._unmark(slot, self._generations[slot])
+            self._maybe_close()
+
+    def _maybe_close(self):
+        # Closing the file descriptor would drop the reader table entry
+        # of this process.
+        if not self._closed or self._fd is None or any(self._leases):
+            return
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        os.close(self._fd)
+        self._fd = None
+
+    def __repr__(self):
+        return '<{} {} {} x {} bytes at 0x{:x}>'.format(
+            type(self).__name__, self._path, self._slots, self._slot_size,
+            id(self))
+
+
+_segments = {}
+_segments_lock = threading.Lock()
+_retiring = set()
+
+
+def acquire_segment(path=None, slots=None, slot_size=None, directory=None):
+    """
+    Return the segment of this process for ``path`` and mark it as in use.
+
+    Senders and receivers within one process have to share their
+    :obj:`Segment` objects since byte-range locks are held per process.
+
+    Args:
+        path (str or None):
+            The path of an existing segment or ``None`` to create a new
+            segment in ``directory``.
+        slots (int):
+            The number of slots.
+        slot_size (int):
+            The size of a slot in bytes.
+        directory (str or None):
+            The directory for a new segment.
+
+    Returns:
+        Segment:
+            The segment. Has to be returned via :obj:`release_segment`.
+    """
+    with _segments_lock:
+        if path is None:
+            segment = Segment.create(directory or _default_directory(),
+                                     slots, slot_size)
+        else:
+            segment = _segments.get(path)
+            if segment is None:
+                segment = Segment.attach(path, slots, slot_size)
+        _segments[segment.path] = segment
+        segment._users += 1
+        return segment
+
+
+def release_segment(segment):
+    """
+    Mark ``segment`` as no longer used by the caller.
+
+    Args:
+        segment (Segment):
+            A segment returned by :obj:`acquire_segment`.
+    """
+    with _segments_lock:
+        segment._users -= 1
+        if segment._users == 0:
+            del _segments[segment.path]
+            segment.close()
+
+
+def retire_segment(segment, timeout=_RETIRE_TIMEOUT):
+    """
+    Remove the file of ``segment`` and release it once it is no longer used.
+
+    Receivers which have not yet attached to the segment need its file
+    to lease slots of descriptors which are still in flight. The file is
+    therefore removed in a background thread once no receiver
+    references a slot of the segment or after ``timeout`` seconds.
+
+    Args:
+        segment (Segment):
+            A writable segment returned by :obj:`acquire_segment`.
+        timeout (float):
+            The maximum time in seconds to wait for receivers.
+    """
+    def retire():
+        deadline = time.monotonic() + timeout
+        while segment.in_use() and time.monotonic() < deadline:
+            time.sleep(_RETIRE_INTERVAL)
+        with _segments_lock:
+            if segment not in _retiring:
+                return
+            _retiring.discard(segment)
+        segment.unlink()
+        release_segment(segment)
+
+    with _segments_lock:
+        _retiring.add(segment)
+    threading.Thread(target=retire, name='rsb-shm-retire',
+                     daemon=True).start()
+
+
+@atexit.register
+def _remove_retiring_segments():
+    with _segments_lock:
+        segments = list(_retiring)
+        _retiring.clear()
+    for segment in segments:
+        segment.unlink()
+
+
+def _descriptor(notification):
+    for info in notification.meta_data.user_infos:
+        if info.key.decode('ASCII') == _DESCRIPTOR_KEY:
+            return info.value.decode('ASCII')
+    return None
+
+
+def _parse_descriptor(descriptor):
+    slot, generation, length, path = descriptor.split(' ', 3)
+    return int(slot), int(generation), int(length), path
+
+
+def _acknowledge(notification):
+    # Observer of the buses of receiving connectors, see
+    # Segment.acknowledge.
+    descriptor = _descriptor(notification)
+    if descriptor is None:
+        return
+    try:
+        slot, generation, _, path = _parse_descriptor(descriptor)
+    except ValueError:
+        return
+    with _segments_lock:
+        segment = _segments.get(path)
+    if segment is not None:
+        segment.acknowledge(slot, generation)
+
+
+class Connector(rsb.transport.socket.Connector):
+    """
+    Base class for connectors of the shared-memory transport.
+
+    The control channel is a socket bus which, by default, uses a Unix
+    domain socket.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, converters, options=None, **kwargs):
+        options = dict(options or {})
+        options.setdefault('path', os.path.join(tempfile.gettempdir(),
+                                                'rsb-shm.sock'))
+        super().__init__(converters=converters, options=options, **kwargs)
+
+        self._directory = options.get('directory') or _default_directory()
+        self._slots = int(options.get('slots', '16'))
+        self._slot_size = int(options.get('slotsize', str(4 * 1024 * 1024)))
+        self._threshold = int(options.get('threshold', str(64 * 1024)))
+
+    def get_transport_url(self):
+        return 'shm://' + self._path
+
+
+class InConnector(Connector):
+    """
+    Base class for connectors which receive payloads from shared memory.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, **kwargs):
+        self._segments = {}
+        self._segments_lock = threading.Lock()
+
+        super().__init__(**kwargs)
+
+    def activate(self):
+        super().activate()
+
+        self.bus.add_observer(_acknowledge)
+
+    def deactivate(self):
+        self.bus.remove_observer(_acknowledge)
+
+        super().deactivate()
+
+        with self._segments_lock:
+            segments, self._segments = self._segments, {}
+        for segment in segments.values():
+            release_segment(segment)
+
+    def _payload(self, notification):
+        descriptor = _descriptor(notification)
+        if descriptor is None:
+            return bytes(notification.data)
+        wire_data = self._lease(descriptor)
+        if wire_data is None:
+            self._logger.warning(
+                'Dropping event %s:%d since its payload has already '
+                'been overwritten',
+                notification.event_id.sender_id.hex(),
+                notification.event_id.sequence_number)
+        return wire_data
+
+    def _to_event(self, notification, wire_data):
+        wire_schema = notification.wire_schema.decode('ASCII')
+        converter = self.get_converter_for_wire_schema(wire_schema)
+        if isinstance(wire_data, memoryview) \
+                and type(converter) not in _ZERO_COPY_CONVERTERS:
+            view, wire_data = wire_data, bytes(wire_data)
+            view.release()
+        event = conversion.notification_to_event(
+            notification,
+            wire_data=wire_data,
+            wire_schema=wire_schema,
+            converter=converter)
+        event.meta_data.user_infos.pop(_DESCRIPTOR_KEY, None)
+        return event
+
+    def _lease(self, descriptor):
+        slot, generation, length, path = _parse_descriptor(descriptor)
+        if os.path.dirname(path) != self._directory:
+            raise ValueError(
+                'Segment {} is not in directory {}'.format(
+                    path, self._directory))
+        with self._segments_lock:
+            segment = self._segments.get(path)
+            if segment is None:
+                try:
+                    segment = acquire_segment(path, self._slots,
+                                              self._slot_size)
+                except FileNotFoundError:
+                    return None
+                self._segments[path] = segment
+        return segment.lease(slot, generation, length)
+
+
+class InPushConnector(InConnector,
+                      rsb.transport.socket.InPushConnector):
+    """
+    Receives events whose payloads may reside in shared memory.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def handle(self, notification):
+        if self._action is None:
+            return
+
+        trace = rsb.tracing.incoming(notification)
+        wire_data = self._payload(notification)
+        if wire_data is None:
+            return
+        self._payload_bytes.inc(len(wire_data))
+
+        event = self._to_event(notification, wire_data)
+        rsb.tracing.attach(event, trace)
+        rsb.tracing.mark(event, 'deserialize')
+        self._action(event)
+
+
+class InPullConnector(InConnector,
+                      rsb.transport.socket.InPullConnector):
+    """
+    Queues events whose payloads may reside in shared memory.
+
+    Queued events keep the slots of their payloads leased, so senders
+    send payloads inline while the queue holds all of their slots. The
+    ``queuesize`` and ``overflow`` options are the same as for
+    :obj:`rsb.transport.socket.InPullConnector`.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def handle(self, notification):
+        trace = rsb.tracing.extend(rsb.tracing.incoming(notification),
+                                   'enqueue')
+        wire_data = self._payload(notification)
+        if wire_data is None:
+            return
+        self._payload_bytes.inc(len(wire_data))
+        if not self._queue.put((notification, wire_data, time.time(),
+                                trace)):
+            self._logger.debug('Dropped notification since queue is full')
+
+    def _notification_to_event(self, notification, wire_data, receive_time,
+                               trace):
+        event = self._to_event(notification, wire_data)
+        event.meta_data.receive_time = receive_time
+        rsb.tracing.attach(event, trace)
+        rsb.tracing.mark(event, 'deserialize')
+        return event
+
+
+class OutConnector(Connector,
+                   rsb.transport.socket.OutConnector):
+    """
+    Sends events, placing large payloads in a shared-memory segment.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, **kwargs):
+        self._segment = None
+
+        super().__init__(**kwargs)
+
+    def activate(self):
+        super().activate()
+
+        self._segment = acquire_segment(slots=self._slots,
+                                        slot_size=self._slot_size,
+                                        directory=self._directory)
+
+    def deactivate(self):
+        super().deactivate()
+
+        retire_segment(self._segment)
+        self._segment = None
+
+    def handle(self, event):
+        notification, slot = self._encode(event)
+        try:
+            self.bus.handle_outgoing(notification)
+        finally:
+            if slot is not None:
+                self._segment.release(slot)
+        rsb.tracing.mark(event, 'bus-write')
+
+    def handle_batch(self, events):
+        notifications, slots = [], []
+        try:
+            for event in events:
+                notification, slot = self._encode(event)
+                notifications.append(notification)
+                if slot is not None:
+                    slots.append(slot)
+            self.bus.handle_outgoing_batch(notifications)
+        finally:
+            for slot in slots:
+                self._segment.release(slot)
+        for event in events:
+            rsb.tracing.mark(event, 'bus-write')
+
+    def _encode(self, event):
+        # Return the notification for EVENT and the slot holding its
+        # payload, if any. The slot has to be released once the
+        # notification has been handed to the bus.
+        event.meta_data.send_time = None
+        converter = self.get_converter_for_data_type(event.data_type)
+        wire_data, wire_schema = converter.serialize(event.data)
+        rsb.tracing.mark(event, 'serialize')
+        self._payload_bytes.inc(len(wire_data))
+
+        location = None
+        if self._threshold <= len(wire_data) <= self._segment.capacity:
+            location = self._segment.write(wire_data)
+            if location is None:
+                self._logger.info('No free slot in %s; sending payload '
+                                  'inline', self._segment)
+
+        notification = Notification()
+        if location is None:
+            conversion.event_to_notification(notification, event,
+                                             wire_schema=wire_schema,
+                                             data=wire_data)
+            return notification, None
+
+        try:
+            conversion.event_to_notification(notification, event,
+                                             wire_schema=wire_schema,
+                                             data=b'')
+            info = notification.meta_data.user_infos.add()
+            info.key = _DESCRIPTOR_KEY.encode('ASCII')
+            info.value = '{} {} {} {}'.format(
+                location[0], location[1], len(wire_data),
+                self._segment.path).encode('ASCII')
+        except Exception:
+            self._segment.release(location[0])
+            raise
+        return notification, location[0]
+
+
+class TransportFactory(rsb.transport.TransportFactory):
+    """
+    :obj:`TransportFactory` implementation for the shared-memory transport.
+
+    .. codeauthor:: jmoringe
+    """
+
+    @property
+    def name(self):
+        return 'shm'
+
+    @property
+    def remote(self):
+        return False
+
+    def create_in_push_connector(self, converters, options):
+        return InPushConnector(converters=converters, options=options)
+
+    def create_in_pull_connector(self, converters, options):
+        return InPullConnector(converters=converters, options=options)
+
+    def create_out_connector(self, converters, options):
+        return OutConnector(converters=converters, options=options)
+
+
+def initialize():
+    try:
+        rsb.transport.register_transport(TransportFactory())
+    except ValueError:
+        pass
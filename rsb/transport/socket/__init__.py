@@ -24,17 +24,522 @@ Contains a transport based on point-to-point socket connections.
 .. codeauthor:: jmoringe
 """
 
+import collections
 import copy
+import os
+import queue
 import socket
 import threading
+import time
+import zlib
 
 import rsb.eventprocessing
+import rsb.metrics
+from rsb.protocol.FragmentedNotification_pb2 import FragmentedNotification
 from rsb.protocol.Notification_pb2 import Notification
+import rsb.tracing
 import rsb.transport
 import rsb.transport.conversion as conversion
 import rsb.util
 
 
+# The maximum time in seconds closing a connection waits for buffered
+# output to be sent.
+_FLUSH_TIMEOUT = 1.0
+
+# Defaults for the time in seconds after which incomplete fragmented
+# notifications are discarded and for the number of payload bytes that
+# may be held by incomplete fragmented notifications.
+_ASSEMBLY_TIMEOUT = 30.0
+_ASSEMBLY_BUDGET = 256 * 1024 * 1024
+
+# Names of optional protocol extensions which can be negotiated between the
+# two ends of a BusConnection.
+EXTENSION_BATCH = 'batch'
+EXTENSION_ZLIB = 'zlib'
+EXTENSION_FRAGMENT = 'fragment'
+
+# Once any extension has been negotiated, frame headers consist of the
+# usual four byte size followed by one byte of flags.
+_FRAME_FLAG_BATCH = 0x01
+_FRAME_FLAG_COMPRESSED = 0x02
+_FRAME_FLAG_FRAGMENT = 0x04
+
+# Frames with payloads starting with a zero byte negotiate extensions
+# between the two ends of a single connection. Such payloads are never
+# valid Notification messages (there is no field number zero), so peers
+# which do not know about extensions fail to parse them instead of
+# dispatching them.
+_CONTROL_PREFIX = b'\0'
+_CONTROL_REQUEST = b'REQUEST'
+_CONTROL_ACCEPT = b'ACCEPT'
+
+
+def _encode_size(size):
+    return bytes([size & 0x000000ff,
+                  (size & 0x0000ff00) >> 8,
+                  (size & 0x00ff0000) >> 16,
+                  (size & 0xff000000) >> 24])
+
+
+def _decode_size(data, offset=0):
+    return data[offset] \
+        | data[offset + 1] << 8 \
+        | data[offset + 2] << 16 \
+        | data[offset + 3] << 24
+
+
+def _unpack_frames(payload):
+    """
+    Split the payload of a batch frame into the contained frames.
+
+    Args:
+        payload (bytes):
+            The payload of a batch frame, a sequence of frames with extended
+            headers.
+
+    Yields:
+        tuple:
+            Pairs of flags and payload of the contained frames.
+    """
+    offset = 0
+    while offset < len(payload):
+        if offset + 5 > len(payload):
+            raise RuntimeError('Truncated frame header in batch frame')
+        size = _decode_size(payload, offset)
+        flags = payload[offset + 4]
+        offset += 5
+        if offset + size > len(payload):
+            raise RuntimeError('Truncated frame payload in batch frame')
+        yield flags, payload[offset:offset + size]
+        offset += size
+
+
+def _is_control(payload):
+    return payload[:1] == _CONTROL_PREFIX
+
+
+def _encode_control(method, extensions):
+    return _CONTROL_PREFIX + method + b'\0' \
+        + ','.join(sorted(extensions)).encode('ASCII')
+
+
+def _decode_control(payload):
+    method, _, extensions = bytes(payload[1:]).partition(b'\0')
+    return method, frozenset(name
+                             for name in extensions.decode('ASCII').split(',')
+                             if name)
+
+
+def _copy_without_data(source, target):
+    # Copy all fields except the potentially large payload field.
+    for field, value in source.ListFields():
+        if field.name == 'data':
+            continue
+        if field.label == field.LABEL_REPEATED:
+            getattr(target, field.name).extend(value)
+        elif field.type == field.TYPE_MESSAGE:
+            getattr(target, field.name).CopyFrom(value)
+        else:
+            setattr(target, field.name, value)
+
+
+def _connect(host, port, path):
+    if path is None:
+        return socket.create_connection((host, port))
+    socket_ = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        socket_.connect(path)
+    except Exception:
+        socket_.close()
+        raise
+    return socket_
+
+
+def _send_buffers(socket_, buffers):
+    """
+    Write all ``buffers`` to ``socket_`` using as few system calls as possible.
+
+    Where available, ``sendmsg`` is used to transmit the buffers as one
+    scatter/gather write without first copying them into a contiguous
+    buffer. Partial writes are continued until all data has been sent.
+
+    Args:
+        socket_ (socket.socket):
+            The socket to which the data should be written.
+        buffers (list of bytes-like):
+            The buffers that should be written in order.
+    """
+    if not hasattr(socket_, 'sendmsg'):
+        socket_.sendall(b''.join(buffers))
+        return
+
+    views = [memoryview(buffer) for buffer in buffers if len(buffer)]
+    while views:
+        sent = socket_.sendmsg(views)
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if sent:
+            views[0] = views[0][sent:]
+
+
+class CoalescingWriter:
+    """
+    Gathers frames written to a socket and sends them in batches.
+
+    Frames are collected in a contiguous buffer which is written to the
+    socket when either the buffered amount of data reaches ``size`` bytes or
+    the oldest buffered frame has waited for ``delay`` seconds. Frames
+    which are larger than ``size`` on their own are sent immediately,
+    together with any pending data, without copying them into the buffer.
+
+    If a batch header function has been installed via
+    :obj:`set_batch_header`, multiple pending frames are sent as a single
+    batch frame, the header of which is produced by that function.
+
+    Data is never written to the socket while the internal buffer is
+    locked, so a socket which does not accept further data only blocks the
+    threads which actually send.
+
+    Errors which occur while a background flush writes to the socket are
+    reported to ``error_hook`` right away and raised from the next call to
+    :obj:`write` or :obj:`flush`.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, socket_, size, delay, error_hook=None):
+        """
+        Create a new writer for ``socket_``.
+
+        Args:
+            socket_ (socket.socket):
+                The socket to which buffered frames should be written.
+            size (int):
+                The number of buffered bytes which triggers a flush.
+            delay (float):
+                The maximum time in seconds a frame remains in the buffer.
+            error_hook (callable or None):
+                Called with the exception if a background flush fails.
+        """
+        self._logger = rsb.util.get_logger_by_class(self.__class__)
+
+        self._socket = socket_
+        self._size = size
+        self._delay = delay
+        self._error_hook = error_hook
+
+        self._buffer = bytearray()
+        self._count = 0
+        self._batch_header = None
+        self._outbox = []
+        self._deadline = None
+        self._error = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._flush_on_deadline,
+                                        name='CoalescingWriterThread')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, *buffers):
+        """
+        Append a frame consisting of ``buffers`` to the pending output.
+
+        Args:
+            buffers (bytes-like):
+                The parts of the frame, e.g. a header and a payload.
+        """
+        with self._condition:
+            self._check_error()
+            if self._closed:
+                raise RuntimeError('Trying to write to closed writer')
+
+            length = sum(len(buffer) for buffer in buffers)
+            if length >= self._size:
+                self._take_pending()
+                self._outbox.extend(buffers)
+            else:
+                if not self._buffer:
+                    self._deadline = time.monotonic() + self._delay
+                    self._condition.notify()
+                for buffer in buffers:
+                    self._buffer += buffer
+                self._count += 1
+                if len(self._buffer) < self._size:
+                    return
+                self._take_pending()
+        self._send_outbox()
+
+    def set_batch_header(self, batch_header):
+        """
+        Install a function producing headers for batch frames.
+
+        Frames pending at the time of the call are flushed first since they
+        may use a different framing.
+
+        Args:
+            batch_header (callable or None):
+                A function which accepts the size of the batch payload and
+                returns the header of the batch frame. ``None`` disables
+                batching.
+        """
+        with self._condition:
+            self._check_error()
+            self._take_pending()
+            self._batch_header = batch_header
+        self._send_outbox()
+
+    def flush(self):
+        """Send all pending output."""
+        with self._condition:
+            self._check_error()
+            self._take_pending()
+        self._send_outbox()
+
+    def close(self, timeout=None):
+        """
+        Send all pending output and stop the background flushing.
+
+        Args:
+            timeout (float or None):
+                The maximum time in seconds to wait for pending output to
+                be sent or ``None`` to wait indefinitely.
+
+        Returns:
+            bool:
+                ``False`` if pending output could not be sent within
+                ``timeout``, ``True`` otherwise.
+        """
+        with self._condition:
+            if self._closed:
+                return True
+            self._closed = True
+            self._condition.notify()
+        if threading.current_thread() is self._thread:
+            return True
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self._logger.warning(
+                'Failed to send pending output within %s second(s)', timeout)
+            return False
+        return True
+
+    def _check_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _take_pending(self):
+        if self._count > 1 and self._batch_header is not None:
+            self._outbox.append(self._batch_header(len(self._buffer)))
+        if self._buffer:
+            self._outbox.append(self._buffer)
+        self._buffer, self._count, self._deadline = bytearray(), 0, None
+
+    def _send_outbox(self):
+        # Frames are appended to the outbox in order while holding the
+        # condition, the outbox is drained by one thread at a time.
+        with self._send_lock:
+            with self._condition:
+                buffers, self._outbox = self._outbox, []
+            if buffers:
+                _send_buffers(self._socket, buffers)
+
+    def _flush_on_deadline(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._deadline is None:
+                        self._condition.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                closed = self._closed
+                self._take_pending()
+            try:
+                self._send_outbox()
+            except Exception as e:
+                self._logger.warning('Failed to flush pending output: %s',
+                                     e, exc_info=True)
+                if not closed:
+                    self._report_error(e)
+            if closed:
+                return
+
+    def _report_error(self, error):
+        with self._condition:
+            self._error = error
+            self._outbox = []
+        if self._error_hook is not None:
+            self._error_hook(error)
+
+
+class AssemblyPool:
+    """
+    Reassembles notifications which have been sent in fragments.
+
+    Incomplete notifications are discarded if no fragment arrives within
+    the configured timeout or if storing a fragment would exceed the
+    memory budget, which is shared by all incomplete notifications in the
+    pool. Later fragments of a discarded notification are ignored.
+
+    Instances can be shared between connections and are thread-safe.
+
+    .. codeauthor:: jmoringe
+    """
+
+    class _Assembly:
+
+        def __init__(self, num_parts):
+            self.notification = None
+            self.chunks = [None] * num_parts
+            self.missing = num_parts
+            self.size = 0
+            self.deadline = None
+
+    def __init__(self, timeout=_ASSEMBLY_TIMEOUT, budget=_ASSEMBLY_BUDGET):
+        """
+        Create a new instance.
+
+        Args:
+            timeout (float):
+                The time in seconds after the most recent fragment after
+                which an incomplete notification is discarded.
+            budget (int):
+                The maximum number of payload bytes held by incomplete
+                notifications.
+        """
+        self._logger = rsb.util.get_logger_by_class(self.__class__)
+
+        self._timeout = timeout
+        self._budget = budget
+
+        self._lock = threading.Lock()
+        # Ordered by the time of the most recent fragment.
+        self._assemblies = collections.OrderedDict()
+        self._discarded = collections.OrderedDict()
+        self._size = 0
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @property
+    def size(self):
+        """
+        Return the number of payload bytes held by incomplete notifications.
+
+        Returns:
+            int:
+                The number of bytes.
+        """
+        return self._size
+
+    def __len__(self):
+        return len(self._assemblies)
+
+    def add(self, fragment, chunk):
+        """
+        Add a fragment and return the notification it completes, if any.
+
+        Args:
+            fragment (FragmentedNotification):
+                The fragment without its payload chunk. The notification of
+                the first fragment carries the meta-data of the event.
+            chunk (bytes-like):
+                The payload chunk of the fragment.
+
+        Returns:
+            Notification or None:
+                The complete notification or ``None`` if fragments are
+                missing or the notification has been discarded.
+        """
+        event_id = fragment.notification.event_id
+        key = (event_id.sender_id, event_id.sequence_number)
+        num_parts, part = fragment.num_data_parts, fragment.data_part
+        if part >= num_parts:
+            raise RuntimeError(
+                'Fragment {} of notification with {} fragments'.format(
+                    part, num_parts))
+
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if key in self._discarded:
+                return None
+
+            assembly = self._assemblies.get(key)
+            if assembly is None:
+                assembly = self._Assembly(num_parts)
+                self._assemblies[key] = assembly
+            elif len(assembly.chunks) != num_parts:
+                raise RuntimeError(
+                    'Inconsistent number of fragments {} and {}'.format(
+                        len(assembly.chunks), num_parts))
+            if assembly.chunks[part] is not None:
+                return None
+
+            if self._size + len(chunk) > self._budget:
+                self._logger.warning(
+                    'Discarding fragmented notification %s:%d since its '
+                    'fragments would exceed the budget of %d bytes',
+                    key[0].hex(), key[1], self._budget)
+                self._discard(key, now)
+                return None
+
+            if part == 0:
+                assembly.notification = fragment.notification
+            assembly.chunks[part] = chunk
+            assembly.missing -= 1
+            assembly.size += len(chunk)
+            assembly.deadline = now + self._timeout
+            self._size += len(chunk)
+            self._assemblies.move_to_end(key)
+            if assembly.missing:
+                return None
+
+            del self._assemblies[key]
+            self._size -= assembly.size
+
+        notification = assembly.notification
+        notification.data = b''.join(assembly.chunks)
+        return notification
+
+    def _discard(self, key, now):
+        assembly = self._assemblies.pop(key, None)
+        if assembly is not None:
+            self._size -= assembly.size
+        self._discarded[key] = now + self._timeout
+
+    def _expire(self, now):
+        while self._discarded:
+            key, deadline = next(iter(self._discarded.items()))
+            if deadline > now:
+                break
+            del self._discarded[key]
+        while self._assemblies:
+            key, assembly = next(iter(self._assemblies.items()))
+            if assembly.deadline > now:
+                break
+            self._logger.warning(
+                'Discarding fragmented notification %s:%d after %d of %d '
+                'fragments since no fragment arrived within %s seconds',
+                key[0].hex(), key[1],
+                len(assembly.chunks) - assembly.missing,
+                len(assembly.chunks), self._timeout)
+            self._discard(key, now)
+
+
 class BusConnection(rsb.eventprocessing.BroadcastProcessor):
     """
     Implements a connection to a socket-based bus.
@@ -51,6 +556,21 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
     (via the :obj:`BusServer` class) one :obj:`BusConnection` object for each
     client (remote process) connected to the bus.
 
+    Optional protocol extensions are negotiated as part of the handshake: a
+    client end with enabled extensions requests them right after receiving
+    the greeting of the server and waits for the server to answer with the
+    accepted subset. Afterwards, both ends use extended frame headers which
+    carry a flags byte. Servers which do not know about extensions fail to
+    parse the request and drop the connection, in which case the client
+    reconnects without requesting extensions. Clients which do not request
+    extensions never see any additional frames.
+
+    With the :obj:`EXTENSION_FRAGMENT` extension, notifications with large
+    payloads are sent as a sequence of fragment frames. Since each
+    fragment is written separately, frames of other notifications can be
+    sent in between. Received fragments are collected in an
+    :obj:`AssemblyPool`.
+
     .. codeauthor:: jmoringe
 
     Args:
@@ -61,7 +581,15 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
 
     def __init__(self,
                  host=None, port=None, socket_=None,
-                 is_server=False, tcpnodelay=True):
+                 is_server=False, tcpnodelay=True,
+                 coalesce_size=0, coalesce_delay=0.0001,
+                 extensions=(),
+                 compression_threshold=1024, compression_level=-1,
+                 path=None,
+                 fragment_size=0,
+                 assembly_timeout=_ASSEMBLY_TIMEOUT,
+                 assembly_budget=_ASSEMBLY_BUDGET,
+                 assembly_pool=None):
         """
         Create a new instance.
 
@@ -78,6 +606,37 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
                 handshake protocol.
             tcpnodelay (bool):
                 If True, the socket will be set to TCP_NODELAY.
+            coalesce_size (int):
+                If greater than zero, outgoing frames are gathered by a
+                :obj:`CoalescingWriter` and written once this many bytes
+                are pending.
+            coalesce_delay (float):
+                The maximum time in seconds an outgoing frame is delayed
+                when ``coalesce_size`` is greater than zero.
+            extensions (collection of str):
+                Names of protocol extensions (e.g. :obj:`EXTENSION_BATCH`)
+                which may be used if the remote end supports them.
+            compression_threshold (int):
+                If :obj:`EXTENSION_ZLIB` has been negotiated, notifications
+                of at least this many bytes are compressed.
+            compression_level (int):
+                The zlib compression level for compressed notifications.
+            path (str or None):
+                Filesystem path of the Unix domain socket of the bus server.
+                Used instead of ``host`` and ``port``.
+            fragment_size (int):
+                If :obj:`EXTENSION_FRAGMENT` has been negotiated, payloads of
+                notifications which are larger than this many bytes are
+                sent in fragments of this size.
+            assembly_timeout (float):
+                Timeout of the :obj:`AssemblyPool` created if
+                ``assembly_pool`` is ``None``.
+            assembly_budget (int):
+                Memory budget of the :obj:`AssemblyPool` created if
+                ``assembly_pool`` is ``None``.
+            assembly_pool (AssemblyPool or None):
+                A pool, usually shared by the connections of a bus, in
+                which received fragments are collected.
 
         See Also:
             :obj:`get_bus_client_for`, :obj:`get_bus_server_for`.
@@ -88,6 +647,19 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
 
         self._thread = None
         self._socket = None
+        self._writer = None
+
+        self._is_server = is_server
+        self._extensions = frozenset(extensions)
+        self._send_extensions = frozenset()
+        self._receive_extended = False
+        self._pending = []
+        self._compression_threshold = compression_threshold
+        self._compression_level = compression_level
+        self._fragment_size = fragment_size
+        if assembly_pool is None:
+            assembly_pool = AssemblyPool(assembly_timeout, assembly_budget)
+        self._assembly_pool = assembly_pool
 
         self._error_hook = None
 
@@ -96,28 +668,49 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
 
         self._lock = threading.RLock()
 
+        self._bytes_sent = 0
+        self._bytes_received = 0
+
         # Create a socket connection or store the provided connection.
-        if host is not None and port is not None:
+        if path is not None or (host is not None and port is not None):
             if socket_ is None:
-                self._socket = socket.create_connection((host, port))
+                self._socket = _connect(host, port, path)
             else:
-                raise ValueError('Specify either host and port or socket')
+                raise ValueError(
+                    'Specify either host and port, path or socket')
         elif socket_ is not None:
             self._socket = socket_
         else:
-            raise ValueError('Specify either host and port or socket_')
-        if tcpnodelay:
-            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-        else:
-            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 0)
+            raise ValueError('Specify either host and port, path or socket_')
+        self._set_tcpnodelay(tcpnodelay)
+        self._peer = self._describe_peer()
 
         # Perform the client or server part of the handshake.
         if is_server:
-            self._socket.send(b'\0\0\0\0')
+            _send_buffers(self._socket, [b'\0\0\0\0'])
         else:
-            zero = self._socket.recv(4)
-            if zero != b'\0\0\0\0':
-                raise RuntimeError('Incorrect handshake')
+            self._receive_greeting()
+            if self._extensions:
+                try:
+                    self._request_extensions()
+                except (EOFError, ConnectionError) as e:
+                    if socket_ is not None:
+                        raise RuntimeError(
+                            'Remote end rejected extension request') from e
+                    self._logger.info(
+                        'Server does not support extensions (%s); '
+                        'reconnecting without extensions', e)
+                    self._socket.close()
+                    self._socket = _connect(host, port, path)
+                    self._set_tcpnodelay(tcpnodelay)
+                    self._receive_greeting()
+
+        if coalesce_size > 0:
+            self._writer = CoalescingWriter(
+                self._socket, coalesce_size, coalesce_delay,
+                error_hook=self._handle_writer_error)
+            if EXTENSION_BATCH in self._send_extensions:
+                self._writer.set_batch_header(self._batch_header)
 
     def __del__(self):
         if self._active:
@@ -131,23 +724,177 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
     def error_hook(self, new_value):
         self._error_hook = new_value
 
+    @property
+    def assembly_pool(self):
+        return self._assembly_pool
+
+    @property
+    def peer(self):
+        """
+        Return a description of the remote end of the connection.
+
+        Returns:
+            str:
+                ``host:port`` for TCP connections, the socket path or, if
+                the remote end is not bound, the file descriptor for Unix
+                domain socket connections.
+        """
+        return self._peer
+
+    @property
+    def bytes_sent(self):
+        """
+        Return the number of bytes of frames written to the connection.
+
+        Returns:
+            int:
+                The number of bytes including frame headers.
+        """
+        return self._bytes_sent
+
+    @property
+    def bytes_received(self):
+        """
+        Return the number of bytes of frames read from the connection.
+
+        Returns:
+            int:
+                The number of bytes including frame headers.
+        """
+        return self._bytes_received
+
+    @property
+    def extensions(self):
+        """
+        Return the extensions negotiated with the remote end.
+
+        Returns:
+            frozenset:
+                Names of the extensions which are used for sending. Empty
+                if negotiation has not (yet) succeeded.
+        """
+        return self._send_extensions
+
+    def _handle_writer_error(self, exception):
+        # Buffered output could not be sent, so the connection is
+        # unusable. Report this right away instead of waiting for the
+        # next send attempt.
+        if self.error_hook is not None:
+            self.error_hook(exception)
+
+    # handshake
+
+    def _describe_peer(self):
+        try:
+            address = self._socket.getpeername()
+        except OSError:
+            address = None
+        if isinstance(address, tuple):
+            return '{}:{}'.format(*address[:2])
+        if address:
+            return address
+        return 'fd:{}'.format(self._socket.fileno())
+
+    def _set_tcpnodelay(self, tcpnodelay):
+        if self._socket.family not in (socket.AF_INET, socket.AF_INET6):
+            return
+        if tcpnodelay:
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 0)
+
+    def _receive_greeting(self):
+        zero = self._receive_exactly(4)
+        if zero != b'\0\0\0\0':
+            raise RuntimeError('Incorrect handshake')
+
+    def _request_extensions(self):
+        self._send_control(_CONTROL_REQUEST, self._extensions)
+
+        # The server may send ordinary frames before it processes our
+        # request. Keep them for dispatching after activation.
+        while True:
+            flags, payload = self.receive_frame()
+            if not _is_control(payload):
+                self._pending.append((flags, payload))
+                continue
+            method, accepted = _decode_control(payload)
+            if method != _CONTROL_ACCEPT:
+                raise RuntimeError(
+                    'Unexpected {} control frame in handshake'.format(
+                        method.decode('ASCII', 'replace')))
+            accepted &= self._extensions
+            self._logger.info('Negotiated extensions %s', set(accepted))
+            self._send_extensions = accepted
+            self._receive_extended = bool(accepted)
+            return
+
+    def _handle_control(self, payload):
+        method, extensions = _decode_control(payload)
+        self._logger.info('Received %s control frame for extensions %s',
+                          method, set(extensions))
+        if method != _CONTROL_REQUEST or not self._is_server:
+            self._logger.warning('Ignoring unexpected %s control frame',
+                                 method)
+            return
+
+        # The client does not send further frames before it receives our
+        # answer, after which it uses the extended framing. The answer is
+        # the last frame we send with the original framing.
+        accepted = extensions & self._extensions
+        self._receive_extended = bool(accepted)
+        with self._lock:
+            self._send_control(_CONTROL_ACCEPT, accepted)
+            self._send_extensions = accepted
+            if self._writer is not None and EXTENSION_BATCH in accepted:
+                self._writer.set_batch_header(self._batch_header)
+
     # receiving
 
-    def receive_notification(self):
-        size = self._socket.recv(4)
-        if len(size) == 0:
+    def _receive_exactly(self, size):
+        data = self._socket.recv(size)
+        if len(data) == size or not data:
+            return data
+
+        # Continue short reads without reallocating for each chunk.
+        buffer = bytearray(size)
+        buffer[:len(data)] = data
+        view = memoryview(buffer)
+        offset = len(data)
+        while offset < size:
+            received = self._socket.recv_into(view[offset:])
+            if received == 0:
+                raise RuntimeError(
+                    'Short read when receiving {} bytes (got {})'.format(
+                        size, offset))
+            offset += received
+        return bytes(buffer)
+
+    def receive_frame(self):
+        """
+        Receive the next frame from the socket.
+
+        Returns:
+            tuple:
+                The flags and the payload of the frame.
+
+        Raises:
+            EOFError:
+                If the remote end closed the connection.
+        """
+        header = self._receive_exactly(5 if self._receive_extended else 4)
+        if len(header) == 0:
             self._logger.info("Received EOF")
             raise EOFError()
-        if not (len(size) == 4):
-            raise RuntimeError('Short read when receiving notification size '
-                               '(size: {})'.format(len(size)))
-        size = size[0] | size[1] << 8 | size[2] << 16 | size[3] << 24
-        self._logger.debug('Receiving notification of size %d', size)
-        notification = self._socket.recv(size)
-        if not (len(notification) == size):
-            raise RuntimeError(
-                'Short read when receiving notification payload')
-        return notification
+        size = _decode_size(header)
+        flags = header[4] if self._receive_extended else 0
+        self._bytes_received += len(header) + size
+        self._logger.debug('Receiving frame of size %d with flags 0x%x',
+                           size, flags)
+        return flags, self._receive_exactly(size)
+
+    def receive_notification(self):
+        return self.receive_frame()[1]
 
     @staticmethod
     def buffer_to_notification(serialized):
@@ -156,9 +903,79 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
         return notification
 
     def do_one_notification(self):
-        serialized = self.receive_notification()
-        notification = self.buffer_to_notification(serialized)
-        self.dispatch(notification)
+        if self._pending:
+            flags, payload = self._pending.pop(0)
+        else:
+            flags, payload = self.receive_frame()
+        trace = rsb.tracing.begin('frame-read')
+
+        if flags & _FRAME_FLAG_BATCH:
+            notifications = [
+                notification
+                for notification in (self._process_frame(*frame)
+                                     for frame in _unpack_frames(payload))
+                if notification is not None]
+        else:
+            notification = self._process_frame(flags, payload)
+            notifications = [] if notification is None else [notification]
+        if not notifications:
+            return
+
+        if trace is not None:
+            rsb.tracing.set_incoming(notifications,
+                                     rsb.tracing.extend(trace, 'parse'))
+        try:
+            if flags & _FRAME_FLAG_BATCH:
+                self.dispatch_batch(notifications)
+            else:
+                self.dispatch(notifications[0])
+        finally:
+            if trace is not None:
+                rsb.tracing.set_incoming(notifications, None)
+
+    def _process_frame(self, flags, payload):
+        known = _FRAME_FLAG_BATCH | _FRAME_FLAG_COMPRESSED
+        known |= _FRAME_FLAG_FRAGMENT
+        if flags & ~known:
+            raise RuntimeError(
+                'Unsupported frame flags 0x{:x}'.format(flags))
+        if flags & _FRAME_FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+        if flags & _FRAME_FLAG_FRAGMENT:
+            return self._process_fragment(payload)
+        if _is_control(payload):
+            self._handle_control(payload)
+            return None
+        return self.buffer_to_notification(payload)
+
+    def _process_fragment(self, payload):
+        # The payload of a fragment frame consists of the size of the
+        # FragmentedNotification header, the header and the payload chunk.
+        header_size = _decode_size(payload)
+        fragment = FragmentedNotification()
+        fragment.ParseFromString(payload[4:4 + header_size])
+        chunk = memoryview(payload)[4 + header_size:]
+        return self._assembly_pool.add(fragment, chunk)
+
+    def dispatch_batch(self, notifications):
+        """
+        Dispatch ``notifications`` received in one batch frame to handlers.
+
+        Handlers which provide a ``handle_batch`` method receive the whole
+        batch in a single call, other handlers are called for each
+        notification.
+
+        Args:
+            notifications (list):
+                The received notifications.
+        """
+        for handler in self.handlers:
+            handle_batch = getattr(handler, 'handle_batch', None)
+            if handle_batch is not None:
+                handle_batch(notifications)
+            else:
+                for notification in notifications:
+                    handler(notification)
 
     def receive_notifications(self):
         while True:
@@ -179,25 +996,130 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
 
     # sending
 
+    def _frame(self, payload, flags=0):
+        if self._send_extensions:
+            return [_encode_size(len(payload)) + bytes([flags]), payload]
+        else:
+            return [_encode_size(len(payload)), payload]
+
+    @staticmethod
+    def _batch_header(size):
+        return _encode_size(size) + bytes([_FRAME_FLAG_BATCH])
+
+    def _compress(self, payload):
+        # This is done before locking the connection. The negotiated
+        # extensions do not change once they are non-empty.
+        if EXTENSION_ZLIB in self._send_extensions \
+                and len(payload) >= self._compression_threshold:
+            compressed = zlib.compress(payload, self._compression_level)
+            if len(compressed) < len(payload):
+                return compressed, _FRAME_FLAG_COMPRESSED
+        return payload, 0
+
+    def _write(self, buffers):
+        # Callers hold the lock of the connection.
+        self._bytes_sent += sum(len(buffer) for buffer in buffers)
+        if self._writer is not None:
+            self._writer.write(*buffers)
+        else:
+            _send_buffers(self._socket, buffers)
+
+    def _send_control(self, method, extensions):
+        with self._lock:
+            self._write(self._frame(_encode_control(method, extensions)))
+
     def send_notification(self, notification):
-        size = len(notification)
-        self._logger.info('Sending notification of size %d', size)
-        size = bytes([size & 0x000000ff,
-                      (size & 0x0000ff00) >> 8,
-                      (size & 0x00ff0000) >> 16,
-                      (size & 0xff000000) >> 24])
+        self._logger.debug('Sending notification of size %d',
+                           len(notification))
+        payload, flags = self._compress(notification)
         with self._lock:
-            self._socket.send(size)
-            self._socket.send(notification)
+            self._write(self._frame(payload, flags))
+
+    def send_notifications(self, notifications):
+        """
+        Send multiple serialized notifications.
+
+        If the batch extension has been negotiated, the notifications are
+        sent in a single batch frame. Otherwise, one frame per notification
+        is sent.
+
+        Args:
+            notifications (list of bytes):
+                The serialized notifications.
+        """
+        encoded = [self._compress(notification)
+                   for notification in notifications]
+        with self._lock:
+            if len(encoded) > 1 \
+                    and EXTENSION_BATCH in self._send_extensions \
+                    and self._writer is None:
+                frames = []
+                for payload, flags in encoded:
+                    frames.extend(self._frame(payload, flags))
+                size = sum(len(frame) for frame in frames)
+                self._write([self._batch_header(size)] + frames)
+            else:
+                for payload, flags in encoded:
+                    self._write(self._frame(payload, flags))
+
+    def send_fragments(self, notification):
+        """
+        Send ``notification`` as a sequence of fragment frames.
+
+        The payload is sliced without copying it. The connection is locked
+        for one fragment at a time so that other notifications can be sent
+        in between.
+
+        Args:
+            notification (Notification):
+                The notification. Requires the negotiated
+                :obj:`EXTENSION_FRAGMENT` extension.
+        """
+        data = memoryview(notification.data)
+        size = self._fragment_size
+        num_parts = max(1, -(-len(data) // size))
+        self._logger.debug('Sending notification with %d bytes of payload '
+                           'in %d fragments', len(data), num_parts)
+        for part in range(num_parts):
+            fragment = FragmentedNotification()
+            fragment.num_data_parts = num_parts
+            fragment.data_part = part
+            if part == 0:
+                _copy_without_data(notification, fragment.notification)
+            else:
+                fragment.notification.event_id.CopyFrom(
+                    notification.event_id)
+            header = fragment.SerializeToString()
+            chunk = data[part * size:(part + 1) * size]
+            frame_header = _encode_size(4 + len(header) + len(chunk)) + \
+                bytes([_FRAME_FLAG_FRAGMENT]) + _encode_size(len(header))
+            with self._lock:
+                self._write([frame_header, header, chunk])
+
+    def _should_fragment(self, notification):
+        return EXTENSION_FRAGMENT in self._send_extensions \
+            and notification.ByteSize() > self._fragment_size
 
     @staticmethod
     def notification_to_buffer(notification):
         return notification.SerializeToString()
 
     def handle(self, notification):
+        if self._should_fragment(notification):
+            self.send_fragments(notification)
+            return
         serialized = self.notification_to_buffer(notification)
         self.send_notification(serialized)
 
+    def handle_batch(self, notifications):
+        if any(self._should_fragment(notification)
+               for notification in notifications):
+            for notification in notifications:
+                self.handle(notification)
+            return
+        self.send_notifications([self.notification_to_buffer(notification)
+                                 for notification in notifications])
+
     # state management
 
     def activate(self):
@@ -214,7 +1136,12 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
     def shutdown(self):
         with self._lock:
             self._active_shutdown = True
-            self._socket.shutdown(socket.SHUT_WR)
+        # Do not hold the lock while waiting for buffered output since
+        # sending blocks if the remote end does not read. Shutting down the
+        # socket aborts the flush if it does not finish in time.
+        if self._writer is not None:
+            self._writer.close(_FLUSH_TIMEOUT)
+        self._socket.shutdown(socket.SHUT_WR)
 
     def deactivate(self):
 
@@ -225,6 +1152,15 @@ class BusConnection(rsb.eventprocessing.BroadcastProcessor):
 
             self._active = False
 
+        if self._writer is not None \
+                and not self._writer.close(_FLUSH_TIMEOUT):
+            try:
+                self._socket.shutdown(socket.SHUT_WR)
+            except Exception as e:
+                self._logger.warn('Failed to shutdown socket: %s', e,
+                                  exc_info=True)
+
+        with self._lock:
             # If necessary, close the socket, this will cause an exception
             # in the notification receiver thread (unless we run in the
             # context that thread).
@@ -254,23 +1190,92 @@ class Bus:
     Out-direction connectors submit events to the bus using the
     :obj:`handle_outgoing` method.
 
+    Connectors are called while the bus is locked unless their
+    ``blocking`` attribute is true. Those connectors, for example pull
+    connectors with the ``block`` overflow policy, are called after the
+    lock has been released so that they do not stall other threads
+    using the bus while they wait.
+
+    Buses register metrics for their connections in
+    :func:`rsb.metrics.get_registry` while they are active.
+
     .. codeauthor:: jmoringe
     """
 
-    def __init__(self):
+    role = None
+
+    def __init__(self, connection_options=None, endpoint=None):
         self._logger = rsb.util.get_logger_by_class(self.__class__)
 
+        self._connection_options = dict(connection_options or {})
+        # Fragments received via any connection of the bus share one
+        # memory budget.
+        self._assembly_pool = AssemblyPool(
+            self._connection_options.get('assembly_timeout',
+                                         _ASSEMBLY_TIMEOUT),
+            self._connection_options.get('assembly_budget',
+                                         _ASSEMBLY_BUDGET))
         self._connections = []
         self._connectors = []
         self._dispatcher = rsb.eventprocessing.ScopeDispatcher()
+        self._observers = []
         self._lock = threading.RLock()
 
         self._active = False
 
+        self._endpoint = endpoint
+        self._opened_connections = 0
+        self._closed_connections = 0
+
     @property
     def lock(self):
         return self._lock
 
+    @property
+    def endpoint(self):
+        """
+        Return a description of the endpoint of this bus.
+
+        Returns:
+            str or None:
+                ``host:port`` or the path of the Unix domain socket.
+        """
+        return self._endpoint
+
+    @property
+    def assembly_pool(self):
+        return self._assembly_pool
+
+    @property
+    def connection_options(self):
+        """
+        Return the options used for the connections of this bus.
+
+        Returns:
+            dict:
+                Keyword arguments for the :obj:`BusConnection` objects of
+                this bus.
+        """
+        return self._connection_options
+
+    def check_connection_options(self, connection_options):
+        """
+        Warn if ``connection_options`` differ from the options of this bus.
+
+        There is only one bus per endpoint and its connections use the
+        options of the connector which created the bus. Options requested
+        by connectors which attach to the existing bus later are ignored.
+
+        Args:
+            connection_options (dict):
+                The options requested by a connector.
+        """
+        if connection_options != self._connection_options:
+            self._logger.warning(
+                'Ignoring connection options %s which differ from the '
+                'options %s of existing bus %s',
+                connection_options, self._connection_options, self)
+
     @property
     def connections(self):
         """
@@ -296,6 +1301,8 @@ class Bus:
         """
         with self.lock:
             self._connections.append(connection)
+            self._opened_connections += 1
+            self._add_connection_metrics(connection)
 
             class Handler:
 
@@ -304,6 +1311,9 @@ class Bus:
 
                 def __call__(_self, notification):  # noqa: N805
                     self.handle_incoming((connection, notification))
+
+                def handle_batch(_self, notifications):  # noqa: N805
+                    self.handle_incoming_batch((connection, notifications))
             connection.add_handler(Handler())
 
             def remove_and_deactivate(exception):
@@ -330,6 +1340,8 @@ class Bus:
         with self.lock:
             if connection in self._connections:
                 self._connections.remove(connection)
+                self._closed_connections += 1
+                self._remove_connection_metrics(connection)
                 connection.remove_handler([h for h in connection.handlers
                                            if h.bus is self][0])
 
@@ -351,7 +1363,7 @@ class Bus:
         """
         self._logger.info('Adding connector %s', connector)
         with self.lock:
-            if isinstance(connector, InPushConnector):
+            if isinstance(connector, (InPushConnector, InPullConnector)):
                 self._dispatcher.add_sink(connector.scope, connector)
             self._connectors.append(connector)
 
@@ -365,7 +1377,7 @@ class Bus:
         """
         self._logger.info('Removing connector %s', connector)
         with self.lock:
-            if isinstance(connector, InPushConnector):
+            if isinstance(connector, (InPushConnector, InPullConnector)):
                 self._dispatcher.remove_sink(connector.scope, connector)
             self._connectors.remove(connector)
             if not self._connectors:
@@ -374,6 +1386,33 @@ class Bus:
                 return False
             return True
 
+    def add_observer(self, observer):
+        """
+        Add ``observer`` to the observers of this bus.
+
+        Observers are called with every notification delivered to the
+        connectors of this bus, regardless of its scope, after all
+        matching connectors have handled it.
+
+        Args:
+            observer (callable):
+                Called with the notification without holding the lock of
+                the bus. Must not raise exceptions.
+        """
+        with self.lock:
+            self._observers.append(observer)
+
+    def remove_observer(self, observer):
+        """
+        Remove ``observer`` from the observers of this bus.
+
+        Args:
+            observer (callable):
+                An observer added via :obj:`add_observer`.
+        """
+        with self.lock:
+            self._observers.remove(observer)
+
     def handle_incoming(self, connection_and_notification):
         _, notification = connection_and_notification
         self._logger.debug('Trying to distribute notification to connectors')
@@ -388,7 +1427,24 @@ class Bus:
 
             # Distribute the notification to participants in our
             # process via InPushConnector instances.
-            self._to_connectors(notification)
+            deferred = self._to_connectors(notification)
+        self._complete_delivery(deferred)
+
+    def handle_incoming_batch(self, connection_and_notifications):
+        _, notifications = connection_and_notifications
+        with self.lock:
+            if not self._active:
+                self._logger.info(
+                    'Cancelled distribution to connectors '
+                    'since bus is not active')
+                return
+
+            # Distribute all notifications while holding the lock only
+            # once.
+            deferred = []
+            for notification in notifications:
+                deferred += self._to_connectors(notification)
+        self._complete_delivery(deferred)
 
     def handle_outgoing(self, notification):
         with self.lock:
@@ -399,16 +1455,57 @@ class Bus:
                                   'and connectors since bus is not active')
                 return
 
-            # Distribute the notification to remote participants via
-            # network connections.
-            failing = self._to_connections(notification)
             # Distribute the notification to participants in our own
             # process via InPushConnector instances.
-            self._to_connectors(notification)
+            deferred = self._to_connectors(notification)
+        self._complete_delivery(deferred)
+        # Distribute the notification to remote participants via
+        # network connections. This does not lock the bus so that
+        # notifications of other threads are not delayed by sending a
+        # large (and thus fragmented) notification.
+        failing = self._to_connections(notification)
         # there are only failing connection in case of an unorderly shutdown.
         # So the shutdown protocol does not apply here and
         # we can immediately call deactivate.
-        list(map(BusConnection.deactivate, failing))
+        for connection in failing:
+            try:
+                connection.deactivate()
+            except Exception as e:
+                self._logger.warning(
+                    'Error while deactivating connection %s: %s',
+                    connection, e, exc_info=True)
+
+    def handle_outgoing_batch(self, notifications):
+        """
+        Distribute ``notifications`` like :meth:`handle_outgoing`.
+
+        Local connectors receive the notifications under a single lock
+        acquisition and connections receive them as one batch (see
+        :meth:`BusConnection.handle_batch`).
+
+        Args:
+            notifications (list):
+                The notifications in the order in which they should be
+                delivered.
+        """
+        with self.lock:
+            if not self._active:
+                self._logger.info('Cancelled distribution to connections '
+                                  'and connectors since bus is not active')
+                return
+
+            deferred = []
+            for notification in notifications:
+                deferred += self._to_connectors(notification)
+        self._complete_delivery(deferred)
+        failing = self._batch_to_connections(notifications)
+        for connection in failing:
+            try:
+                connection.deactivate()
+            except Exception as e:
+                self._logger.warning(
+                    'Error while deactivating connection %s: %s',
+                    connection, e, exc_info=True)
 
     # State management
 
@@ -423,10 +1520,32 @@ class Bus:
         with self.lock:
             self._active = True
 
+        registry = rsb.metrics.get_registry()
+        labels = self._metric_labels()
+        registry.gauge('rsb_socket_connections',
+                       'Open connections of socket buses',
+                       lambda: len(self._connections), **labels)
+        registry.add('rsb_socket_connections_opened_total',
+                     'Connections added to socket buses',
+                     rsb.metrics.Counter(
+                         lambda: self._opened_connections),
+                     **labels)
+        registry.add('rsb_socket_connections_closed_total',
+                     'Connections removed from socket buses',
+                     rsb.metrics.Counter(
+                         lambda: self._closed_connections),
+                     **labels)
+
     def deactivate(self):
         if not self._active:
             raise RuntimeError('Trying to deactivate inactive bus')
 
+        registry = rsb.metrics.get_registry()
+        for name in ('rsb_socket_connections',
+                     'rsb_socket_connections_opened_total',
+                     'rsb_socket_connections_closed_total'):
+            registry.remove(name, **self._metric_labels())
+
         with self.lock:
             self._active = False
             connections_copy = copy.copy(self.connections)
@@ -445,20 +1564,58 @@ class Bus:
                 self._logger.error('Failed to close connections: %s', e,
                                    exc_info=True)
 
+    # Metrics
+
+    def _metric_labels(self, connection=None):
+        labels = {'endpoint': str(self._endpoint), 'role': str(self.role)}
+        if connection is not None:
+            labels['peer'] = connection.peer
+        return labels
+
+    def _add_connection_metrics(self, connection):
+        registry = rsb.metrics.get_registry()
+        labels = self._metric_labels(connection)
+        registry.add('rsb_socket_bytes_sent_total',
+                     'Bytes of frames written to socket connections',
+                     rsb.metrics.Counter(lambda: connection.bytes_sent),
+                     **labels)
+        registry.add('rsb_socket_bytes_received_total',
+                     'Bytes of frames read from socket connections',
+                     rsb.metrics.Counter(lambda: connection.bytes_received),
+                     **labels)
+
+    def _remove_connection_metrics(self, connection):
+        registry = rsb.metrics.get_registry()
+        labels = self._metric_labels(connection)
+        registry.remove('rsb_socket_bytes_sent_total', **labels)
+        registry.remove('rsb_socket_bytes_received_total', **labels)
+
     # Low-level helpers
 
     def _to_connections(self, notification, exclude=None):
+        return self._send_to_connections(
+            lambda connection: connection.handle(notification), exclude)
+
+    def _batch_to_connections(self, notifications, exclude=None):
+        return self._send_to_connections(
+            lambda connection: connection.handle_batch(notifications),
+            exclude)
+
+    def _send_to_connections(self, send, exclude):
+        # Connections lock themselves while writing a frame.
+        with self.lock:
+            connections = [connection for connection in self.connections
+                           if connection is not exclude]
         failing = []
-        for connection in self.connections:
-            if connection is not exclude:
-                try:
-                    connection.handle(notification)
-                except Exception as e:
-                    self._logger.warn(
-                        'Failed to send to %s: %s; '
-                        'will close connection later',
-                        connection, e, exc_info=True)
-                    failing.append(connection)
+        for connection in connections:
+            try:
+                send(connection)
+            except Exception as e:
+                self._logger.warn(
+                    'Failed to send to %s: %s; '
+                    'will close connection later',
+                    connection, e, exc_info=True)
+                failing.append(connection)
 
         # Removed connections for which sending the notification
         # failed.
@@ -471,9 +1628,34 @@ class Bus:
         # 1) Direction has to be "incoming events"
         # 2) The scope of the connector has to be a superscope of
         #    NOTIFICATION's scope
+        # Blocking connectors and observers are returned for
+        # _complete_delivery which is called without holding the lock.
         scope = rsb.Scope(notification.scope.decode('ASCII'))
+        blocking = []
         for sink in self._dispatcher.matching_sinks(scope):
+            if getattr(sink, 'blocking', False):
+                blocking.append(sink)
+            else:
+                self._to_connector(sink, notification)
+        return [(notification, blocking, list(self._observers))]
+
+    def _complete_delivery(self, deferred):
+        for notification, sinks, observers in deferred:
+            for sink in sinks:
+                self._to_connector(sink, notification)
+            for observer in observers:
+                observer(notification)
+
+    def _to_connector(self, sink, notification):
+        try:
             sink.handle(notification)
+        except queue.Full:
+            # The overflow policy of the receiving participant is
+            # "raise" but there is nobody to raise to in the thread of
+            # the bus. The event has been counted as dropped.
+            self._logger.debug(
+                'Dropped notification for %s since its queue is full',
+                sink)
 
     def __repr__(self):
         return '<{} {} connection(s) {} connector(s) at 0x{:x}>'.format(
@@ -481,18 +1663,31 @@ class Bus:
             len(self.connectors), id(self))
 
 
+def _describe_endpoint(host, port, path):
+    if path is not None:
+        return path
+    return '{}:{}'.format(host, port)
+
+
+def _bus_key(host, port, tcpnodelay, path):
+    if path is not None:
+        return (path,)
+    return (host, port, tcpnodelay)
+
+
 _bus_clients = {}
 _bus_clients_lock = threading.Lock()
 
 
-def get_bus_client_for(host, port, tcpnodelay, connector):
+def get_bus_client_for(host, port, tcpnodelay, connector,
+                       path=None, **connection_options):
     """
     Return a bus client for the given end point and attach a connector to it.
 
     Return (creating it if necessary), a :obj:`BusClient` for the endpoint
-    designated by ``host`` and ``port`` and attach ``connector`` to
-    it. Attaching ``connector`` marks the bus client as being in use
-    and protects it from being destroyed in a race condition
+    designated by ``host`` and ``port`` (or ``path``) and attach
+    ``connector`` to it. Attaching ``connector`` marks the bus client as
+    being in use and protects it from being destroyed in a race condition
     situation.
 
     Args:
@@ -504,16 +1699,26 @@ def get_bus_client_for(host, port, tcpnodelay, connector):
             If True, the socket will be set to TCP_NODELAY.
         connector:
             A connector that should be attached to the bus client.
+        path (str or None):
+            If not ``None``, the filesystem path of the Unix domain socket
+            of the bus server. ``host``, ``port`` and ``tcpnodelay`` are
+            ignored in this case.
+        connection_options:
+            Additional keyword arguments for the :obj:`BusConnection` of
+            the bus client.
+            Only used if the bus client is created by this call.
     """
-    key = (host, port, tcpnodelay)
+    key = _bus_key(host, port, tcpnodelay, path)
     with _bus_clients_lock:
         bus = _bus_clients.get(key)
         if bus is None:
-            bus = BusClient(host, port, tcpnodelay)
+            bus = BusClient(host, port, tcpnodelay, path=path,
+                            **connection_options)
             _bus_clients[key] = bus
             bus.activate()
             bus.add_connector(connector)
         else:
+            bus.check_connection_options(connection_options)
             bus.add_connector(connector)
         return bus
 
@@ -525,7 +1730,10 @@ class BusClient(Bus):
     .. codeauthor:: jmoringe
     """
 
-    def __init__(self, host, port, tcpnodelay):
+    role = 'client'
+
+    def __init__(self, host, port, tcpnodelay, path=None,
+                 **connection_options):
         """
         Create a new client connection on the specified host and port.
 
@@ -537,24 +1745,34 @@ class BusClient(Bus):
                 The port on which the new bus server listens.
             tcpnodelay (bool):
                 If True, the socket will be set to TCP_NODELAY.
+            path (str or None):
+                If not ``None``, connect to the Unix domain socket at this
+                filesystem path instead of ``host`` and ``port``.
+            connection_options:
+                Additional keyword arguments for the :obj:`BusConnection`.
         """
-        super().__init__()
+        super().__init__(connection_options, _describe_endpoint(
+            host, port, path))
 
-        self.add_connection(BusConnection(host, port, tcpnodelay=tcpnodelay))
+        self.add_connection(BusConnection(host, port, tcpnodelay=tcpnodelay,
+                                          path=path,
+                                          assembly_pool=self.assembly_pool,
+                                          **connection_options))
 
 
 _bus_servers = {}
 _bus_servers_lock = threading.Lock()
 
 
-def get_bus_server_for(host, port, tcpnodelay, connector):
+def get_bus_server_for(host, port, tcpnodelay, connector,
+                       path=None, **connection_options):
     """
     Return a bus server for the given end point and attach a connector to it.
 
     Return (creating it if necessary), a :obj:`BusServer` for the endpoint
-    designated by ``host`` and ``port`` and attach ``connector`` to
-    it. Attaching ``connector`` marks the bus server as being in use
-    and protects it from being destroyed in a race condition
+    designated by ``host`` and ``port`` (or ``path``) and attach
+    ``connector`` to it. Attaching ``connector`` marks the bus server as
+    being in use and protects it from being destroyed in a race condition
     situation.
 
     Args:
@@ -568,16 +1786,26 @@ def get_bus_server_for(host, port, tcpnodelay, connector):
             If True, the socket will be set to TCP_NODELAY.
         connector:
             A connector that should be attached to the bus server.
+        path (str or None):
+            If not ``None``, the filesystem path to which the Unix domain
+            listen socket of the bus server should be bound. ``host``,
+            ``port`` and ``tcpnodelay`` are ignored in this case.
+        connection_options:
+            Additional keyword arguments for the :obj:`BusConnection` objects
+            of the bus server.
+            Only used if the bus server is created by this call.
     """
-    key = (host, port, tcpnodelay)
+    key = _bus_key(host, port, tcpnodelay, path)
     with _bus_servers_lock:
         bus = _bus_servers.get(key)
         if bus is None:
-            bus = BusServer(host, port, tcpnodelay)
+            bus = BusServer(host, port, tcpnodelay, path=path,
+                            **connection_options)
             bus.activate()
             _bus_servers[key] = bus
             bus.add_connector(connector)
         else:
+            bus.check_connection_options(connection_options)
             bus.add_connector(connector)
         return bus
 
@@ -596,7 +1824,10 @@ class BusServer(Bus):
     .. codeauthor:: jmoringe
     """
 
-    def __init__(self, host, port, tcpnodelay, backlog=5):
+    role = 'server'
+
+    def __init__(self, host, port, tcpnodelay, backlog=5, path=None,
+                 **connection_options):
         """
         Create a new instance on the given host and port.
 
@@ -611,8 +1842,15 @@ class BusServer(Bus):
                 If True, the socket will be set to TCP_NODELAY.
             backlog (int):
                 The maximum number of queued connection attempts.
+            path (str or None):
+                If not ``None``, listen on a Unix domain socket at this
+                filesystem path instead of ``host`` and ``port``.
+            connection_options:
+                Additional keyword arguments for the :obj:`BusConnection`
+                objects of accepted clients.
         """
-        super().__init__()
+        super().__init__(connection_options, _describe_endpoint(
+            host, port, path))
 
         self._logger = rsb.util.get_logger_by_class(self.__class__)
 
@@ -620,7 +1858,12 @@ class BusServer(Bus):
         self._port = port
         self._tcpnodelay = tcpnodelay
         self._backlog = backlog
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._path = path
+        self._socket_file = None
+        if path is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self._acceptor_thread = None
 
     def __del__(self):
@@ -641,7 +1884,9 @@ class BusServer(Bus):
                 self.add_connection(
                     BusConnection(socket_=client_socket,
                                   is_server=True,
-                                  tcpnodelay=self._tcpnodelay))
+                                  tcpnodelay=self._tcpnodelay,
+                                  assembly_pool=self.assembly_pool,
+                                  **self._connection_options))
             except socket.timeout as e:
                 if sys.platform != 'darwin':
                     self._logger.error(
@@ -654,6 +1899,22 @@ class BusServer(Bus):
                 else:
                     self._logger.info('Acceptor thread terminating')
 
+    def _remove_stale_socket_file(self):
+        # A socket file left behind by a crashed server would prevent
+        # binding. Only remove it if no server is accepting connections.
+        if not os.path.exists(self._path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self._path)
+        except ConnectionRefusedError:
+            self._logger.info('Removing stale socket file %s', self._path)
+            os.unlink(self._path)
+        except OSError:
+            pass
+        finally:
+            probe.close()
+
     # Receiving notifications
 
     def handle_incoming(self, connection_and_notification):
@@ -662,8 +1923,15 @@ class BusServer(Bus):
         # Distribute the notification to all connections except the
         # one that sent it.
         (sending_connection, notification) = connection_and_notification
-        with self.lock:
-            self._to_connections(notification, exclude=sending_connection)
+        self._to_connections(notification, exclude=sending_connection)
+
+    def handle_incoming_batch(self, connection_and_notifications):
+        super().handle_incoming_batch(connection_and_notifications)
+
+        # Forward the batch to all connections except the one that
+        # sent it.
+        (sending_connection, notifications) = connection_and_notifications
+        self._batch_to_connections(notifications, exclude=sending_connection)
 
     # State management
 
@@ -671,9 +1939,15 @@ class BusServer(Bus):
         super().activate()
 
         # Bind the socket and start listening
-        self._logger.info('Opening listen socket %s:%d',
-                          '0.0.0.0', self._port)
-        self._socket.bind(('0.0.0.0', self._port))
+        if self._path is None:
+            self._logger.info('Opening listen socket %s:%d',
+                              '0.0.0.0', self._port)
+            self._socket.bind(('0.0.0.0', self._port))
+        else:
+            self._logger.info('Opening listen socket %s', self._path)
+            self._remove_stale_socket_file()
+            self._socket.bind(self._path)
+            self._socket_file = self._path
         self._socket.listen(self._backlog)
 
         self._logger.info('Starting acceptor thread')
@@ -699,6 +1973,13 @@ class BusServer(Bus):
                 self._logger.warn('Failed to close listen socket: %s', e,
                                   exc_info=True)
             self._socket = None
+            if self._socket_file is not None:
+                try:
+                    os.unlink(self._socket_file)
+                except OSError as e:
+                    self._logger.warn('Failed to remove socket file %s: %s',
+                                      self._socket_file, e)
+                self._socket_file = None
 
         # The acceptor thread should encounter an exception and exit
         # eventually. We wait for that.
@@ -744,11 +2025,46 @@ class Connector(rsb.transport.Connector,
             options = {}
 
         self._active = False
+        self._payload_bytes = rsb.metrics.Counter()
 
         self._bus = None
         self._host = options.get('host', 'localhost')
         self._port = int(options.get('port', '55555'))
+        self._path = options.get('path') or None
         self._tcpnodelay = options.get('nodelay', '1') in ['1', 'true']
+        coalesce_size = int(options.get('coalescesize', '0'))
+        extensions = set()
+        if options.get('batch', '0') in ['1', 'true']:
+            # Batch frames are formed from the frames gathered by the
+            # coalescing writer.
+            if coalesce_size <= 0:
+                raise ValueError(
+                    'The batch option requires a positive coalescesize')
+            extensions.add(EXTENSION_BATCH)
+        compression = options.get('compression', 'none')
+        if compression == 'zlib':
+            extensions.add(EXTENSION_ZLIB)
+        elif compression != 'none':
+            raise ValueError(
+                'Compression option has to be "none" or "zlib", '
+                'not "{}"'.format(compression))
+        fragment_size = int(options.get('fragmentsize', '0'))
+        if fragment_size > 0:
+            extensions.add(EXTENSION_FRAGMENT)
+        self._connection_options = {
+            'coalesce_size': coalesce_size,
+            'coalesce_delay': int(options.get('coalescedelay', '100')) / 1e6,
+            'extensions': frozenset(extensions),
+            'compression_threshold':
+                int(options.get('compressionthreshold', '1024')),
+            'compression_level':
+                int(options.get('compressionlevel', '-1')),
+            'fragment_size': fragment_size,
+            'assembly_timeout':
+                float(options.get('assemblytimeout',
+                                  str(_ASSEMBLY_TIMEOUT))),
+            'assembly_budget':
+                int(options.get('assemblybudget', str(_ASSEMBLY_BUDGET)))}
         server_string = options.get('server', 'auto')
         if server_string in ['1', 'true']:
             self._server = True
@@ -765,28 +2081,39 @@ class Connector(rsb.transport.Connector,
         if self._active:
             self.deactivate()
 
-    def _get_bus(self, host, port, tcpnodelay, server):
+    def _get_bus(self, host, port, tcpnodelay, server, path=None,
+                 **connection_options):
         self._logger.info('Requested server role: %s', server)
 
+        if path is None:
+            endpoint = '{}:{}'.format(host, port)
+        else:
+            endpoint = path
         if server is True:
-            self._logger.info('Getting bus server %s:%d', host, port)
-            self._bus = get_bus_server_for(host, port, tcpnodelay, self)
+            self._logger.info('Getting bus server %s', endpoint)
+            self._bus = get_bus_server_for(host, port, tcpnodelay, self,
+                                           path=path, **connection_options)
         elif server is False:
-            self._logger.info('Getting bus client %s:%d', host, port)
-            self._bus = get_bus_client_for(host, port, tcpnodelay, self)
+            self._logger.info('Getting bus client %s', endpoint)
+            self._bus = get_bus_client_for(host, port, tcpnodelay, self,
+                                           path=path, **connection_options)
         elif server == 'auto':
             try:
                 self._logger.info(
-                    'Trying to get bus server %s:%d (in server = auto mode)',
-                    host, port)
-                self._bus = get_bus_server_for(host, port, tcpnodelay, self)
+                    'Trying to get bus server %s (in server = auto mode)',
+                    endpoint)
+                self._bus = get_bus_server_for(host, port, tcpnodelay, self,
+                                               path=path,
+                                               **connection_options)
             except Exception as e:
                 self._logger.info('Failed to get bus server: %s', e,
                                   exc_info=True)
                 self._logger.info(
-                    'Trying to get bus client %s:%d (in server = auto mode)',
-                    host, port)
-                self._bus = get_bus_client_for(host, port, tcpnodelay, self)
+                    'Trying to get bus client %s (in server = auto mode)',
+                    endpoint)
+                self._bus = get_bus_client_for(host, port, tcpnodelay, self,
+                                               path=path,
+                                               **connection_options)
         else:
             raise TypeError(
                 'Server argument has to be True, False or '
@@ -798,6 +2125,10 @@ class Connector(rsb.transport.Connector,
     def bus(self):
         return self._bus
 
+    @property
+    def payload_bytes(self):
+        return self._payload_bytes.value
+
     def activate(self):
         if self._active:
             raise RuntimeError('Trying to activate active connector')
@@ -807,7 +2138,9 @@ class Connector(rsb.transport.Connector,
         self._bus = self._get_bus(self._host,
                                   self._port,
                                   self._tcpnodelay,
-                                  self._server)
+                                  self._server,
+                                  path=self._path,
+                                  **self._connection_options)
 
         self._active = True
 
@@ -825,6 +2158,8 @@ class Connector(rsb.transport.Connector,
         pass
 
     def get_transport_url(self):
+        if self._path is not None:
+            return 'unix://' + self._path
         query = '?tcpnodelay=' + ('1' if self._tcpnodelay else '0')
         return 'socket://' + self._host + ':' + str(self._port) + query
 
@@ -861,6 +2196,8 @@ class InPushConnector(Connector,
         if self._action is None:
             return
 
+        trace = rsb.tracing.incoming(notification)
+        self._payload_bytes.inc(len(notification.data))
         converter = self.get_converter_for_wire_schema(
             notification.wire_schema.decode('ASCII'))
         event = conversion.notification_to_event(
@@ -868,9 +2205,133 @@ class InPushConnector(Connector,
             wire_data=bytes(notification.data),
             wire_schema=notification.wire_schema.decode('ASCII'),
             converter=converter)
+        rsb.tracing.attach(event, trace)
+        rsb.tracing.mark(event, 'deserialize')
         self._action(event)
 
 
+class InPullConnector(Connector,
+                      rsb.transport.InPullConnector):
+    """
+    Receives events from a bus represented by a socket connection.
+
+    Like :obj:`InPushConnector`, instances of this class receive
+    notifications from a :obj:`Bus`. Notifications are queued without
+    deserializing their payloads. Deserialization happens when events are
+    pulled via :obj:`raise_event` or :obj:`read_many`.
+
+    The queue holds at most ``queuesize`` (option, default 1000, zero for
+    no limit) notifications. When it is full, the ``overflow`` option
+    (default ``drop-oldest``) decides what happens to further
+    notifications (see :obj:`rsb.util.BoundedQueue`). With ``block``, the
+    connection stops reading until space becomes available. ``raise``
+    behaves like ``drop-newest`` since there is no publisher in this
+    process to raise to.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, converters, options=None, **kwargs):
+        super().__init__(converters=converters, options=options, **kwargs)
+
+        if options is None:
+            options = {}
+
+        self._queue = rsb.util.BoundedQueue(
+            int(options.get('queuesize', '1000')),
+            options.get('overflow', 'drop-oldest'))
+
+    @property
+    def dropped(self):
+        """
+        Return the number of notifications dropped because of overflow.
+
+        Returns:
+            int:
+                The number of dropped notifications.
+        """
+        return self._queue.dropped
+
+    @property
+    def queued(self):
+        """
+        Return the number of queued notifications.
+
+        Returns:
+            int:
+                The number of notifications waiting to be pulled.
+        """
+        return len(self._queue)
+
+    @property
+    def blocking(self):
+        """
+        Tell whether handling a notification can wait for queue space.
+
+        The bus calls blocking connectors without holding its lock.
+
+        Returns:
+            bool:
+                ``True`` if the overflow policy is ``block``.
+        """
+        return self._queue.overflow == 'block'
+
+    def activate(self):
+        self._queue.reopen()
+        super().activate()
+
+    def deactivate(self):
+        # Release the bus thread if it waits for space in the queue.
+        self._queue.close()
+        super().deactivate()
+
+    def handle(self, notification):
+        trace = rsb.tracing.extend(rsb.tracing.incoming(notification),
+                                   'enqueue')
+        self._payload_bytes.inc(len(notification.data))
+        if not self._queue.put((notification, time.time(), trace)):
+            self._logger.debug('Dropped notification since queue is full')
+
+    def raise_event(self, block, timeout=None):
+        try:
+            item = self._queue.get(block, timeout)
+        except queue.Empty:
+            return None
+        return self._notification_to_event(*item)
+
+    def read_many(self, max_count, timeout=None):
+        """
+        Return up to ``max_count`` queued events.
+
+        Args:
+            max_count (int):
+                The maximum number of returned events.
+            timeout (float or None):
+                The maximum time in seconds to wait for the first event.
+                ``None`` means waiting indefinitely, zero means not
+                waiting.
+
+        Returns:
+            list:
+                The events in the order in which they were received.
+        """
+        return [self._notification_to_event(*item)
+                for item in self._queue.get_many(max_count, timeout)]
+
+    def _notification_to_event(self, notification, receive_time, trace):
+        wire_schema = notification.wire_schema.decode('ASCII')
+        converter = self.get_converter_for_wire_schema(wire_schema)
+        event = conversion.notification_to_event(
+            notification,
+            wire_data=bytes(notification.data),
+            wire_schema=wire_schema,
+            converter=converter)
+        event.meta_data.receive_time = receive_time
+        rsb.tracing.attach(event, trace)
+        rsb.tracing.mark(event, 'deserialize')
+        return event
+
+
 class OutConnector(Connector,
                    rsb.transport.OutConnector):
     """
@@ -888,14 +2349,26 @@ class OutConnector(Connector,
     def handle(self, event):
         # Create a notification fragment for the event and send it
         # over the bus.
+        self.bus.handle_outgoing(self._event_to_notification(event))
+        rsb.tracing.mark(event, 'bus-write')
+
+    def handle_batch(self, events):
+        self.bus.handle_outgoing_batch(
+            [self._event_to_notification(event) for event in events])
+        for event in events:
+            rsb.tracing.mark(event, 'bus-write')
+
+    def _event_to_notification(self, event):
         event.meta_data.send_time = None
         converter = self.get_converter_for_data_type(event.data_type)
         wire_data, wire_schema = converter.serialize(event.data)
+        rsb.tracing.mark(event, 'serialize')
+        self._payload_bytes.inc(len(wire_data))
         notification = Notification()
         conversion.event_to_notification(notification, event,
                                          wire_schema=wire_schema,
                                          data=wire_data)
-        self.bus.handle_outgoing(notification)
+        return notification
 
 
 class TransportFactory(rsb.transport.TransportFactory):
@@ -917,7 +2390,7 @@ class TransportFactory(rsb.transport.TransportFactory):
         return InPushConnector(converters=converters, options=options)
 
     def create_in_pull_connector(self, converters, options):
-        raise NotImplementedError()
+        return InPullConnector(converters=converters, options=options)
 
     def create_out_connector(self, converters, options):
         return OutConnector(converters=converters, options=options)
@@ -24,9 +24,12 @@ Various helper classes and methods.
 .. codeauthor:: jwienke
 """
 
+import collections
 import logging
-from queue import Queue
+import math
+from queue import Empty, Full
 from threading import Condition, Lock, Thread
+import time as _time
 
 
 class _InterruptedError(RuntimeError):
@@ -60,9 +63,9 @@ class OrderedQueueDispatcherPool:
 
     class _Receiver:
 
-        def __init__(self, receiver):
+        def __init__(self, receiver, capacity, overflow):
             self.receiver = receiver
-            self.queue = Queue()
+            self.queue = BoundedQueue(capacity, overflow)
             self.processing = False
             self.processing_mutex = Lock()
             self.processing_condition = Condition()
@@ -70,7 +73,8 @@ class OrderedQueueDispatcherPool:
     def _true_filter(self, receiver, message):
         return True
 
-    def __init__(self, thread_pool_size, del_func, filter_func=None):
+    def __init__(self, thread_pool_size, del_func, filter_func=None,
+                 capacity=0, overflow='drop-oldest'):
         """
         Construct a new pool.
 
@@ -89,10 +93,28 @@ class OrderedQueueDispatcherPool:
                 First is the receiver of a message, second is the message to
                 filter. Must return a bool, true means to deliver the message,
                 false rejects it.
+            capacity (int):
+                Maximum number of queued messages per receiver. Zero means
+                unbounded.
+            overflow (str):
+                What to do when a receiver queue is full. One of
+                :attr:`BoundedQueue.OVERFLOW_POLICIES`.
+
+        Raises:
+            ValueError:
+                If ``thread_pool_size`` is smaller than one or
+                ``overflow`` is not a known policy.
         """
 
         self._logger = get_logger_by_class(self.__class__)
 
+        if overflow not in BoundedQueue.OVERFLOW_POLICIES:
+            raise ValueError(
+                'Overflow policy has to be one of {}, not "{}"'.format(
+                    ', '.join(BoundedQueue.OVERFLOW_POLICIES), overflow))
+        self._capacity = capacity
+        self._overflow = overflow
+
         if thread_pool_size < 1:
             raise ValueError("Thread pool size must be at least 1,"
                              "{} was given.".format(thread_pool_size))
@@ -116,6 +138,36 @@ class OrderedQueueDispatcherPool:
 
         self._currentPosition = 0
 
+        self._dropped = 0
+
+    @property
+    def dropped(self):
+        """
+        Return the number of messages dropped because of full queues.
+
+        Messages which overflowed the queues of receivers that have been
+        unregistered in the meantime are included.
+
+        Returns:
+            int:
+                The number of dropped messages, counted per receiver.
+        """
+        with self._condition:
+            return self._dropped + sum(receiver.queue.dropped
+                                       for receiver in self._receivers)
+
+    @property
+    def queued(self):
+        """
+        Return the number of messages waiting in the queues of receivers.
+
+        Returns:
+            int:
+                The number of queued messages, counted per receiver.
+        """
+        with self._condition:
+            return sum(len(receiver.queue) for receiver in self._receivers)
+
     def __del__(self):
         self.stop()
 
@@ -134,7 +186,8 @@ class OrderedQueueDispatcherPool:
         """
 
         with self._condition:
-            self._receivers.append(self._Receiver(receiver))
+            self._receivers.append(
+                self._Receiver(receiver, self._capacity, self._overflow))
 
         self._logger.info("Registered receiver %s", receiver)
 
@@ -159,7 +212,11 @@ class OrderedQueueDispatcherPool:
                 else:
                     kept.append(r)
             self._receivers = kept
+            if removed:
+                self._dropped += removed.queue.dropped
         if removed:
+            # Release publishers waiting for space in the queue.
+            removed.queue.close()
             with removed.processing_condition:
                 while removed.processing:
                     self._logger.info("Waiting for receiver %s to finish",
@@ -174,13 +231,17 @@ class OrderedQueueDispatcherPool:
         Args:
             message:
                 message to dispatch
+
+        Raises:
+            queue.Full:
+                If the queue of a receiver is full and the overflow policy
+                is ``raise``. The message is still delivered to all
+                receivers with free space.
         """
 
         with self._condition:
-            for receiver in self._receivers:
-                receiver.queue.put(message)
-            self._jobsAvailable = True
-            self._condition.notify()
+            receivers = list(self._receivers)
+        self._push(receivers, message)
 
         # XXX: This is disabled because it can trigger this bug for protocol
         # buffers payloads:
@@ -188,6 +249,43 @@ class OrderedQueueDispatcherPool:
         # See also #1331
         # self._logger.debug("Got new message to dispatch: %s", message)
 
+    def push_to(self, receiver, message):
+        """
+        Push a new message to be dispatched only to ``receiver``.
+
+        Args:
+            receiver:
+                A registered receiver.
+            message:
+                message to dispatch
+
+        Raises:
+            queue.Full:
+                If the queue of ``receiver`` is full and the overflow
+                policy is ``raise``.
+        """
+
+        with self._condition:
+            receivers = [r for r in self._receivers if r.receiver == receiver]
+        self._push(receivers, message)
+
+    def _push(self, receivers, message):
+        # Queues are filled without holding the lock since putting
+        # into a full queue may block until a worker makes room.
+        full = False
+        for receiver in receivers:
+            try:
+                receiver.queue.put(message)
+            except Full:
+                full = True
+
+        with self._condition:
+            self._jobsAvailable = True
+            self._condition.notify()
+
+        if full:
+            raise Full()
+
     def _next_job(self, worker_num):
         """
         Return the next job to process for worker threads.
@@ -242,7 +340,7 @@ class OrderedQueueDispatcherPool:
 
             with receiver.processing_condition:
                 receiver.processing = False
-                receiver.processing_condition.notifyAll()
+                receiver.processing_condition.notify_all()
             if not receiver.queue.empty():
                 self._jobsAvailable = True
                 self._logger.debug("Worker %d: new jobs available, "
@@ -295,6 +393,8 @@ class OrderedQueueDispatcherPool:
                 raise RuntimeError("Pool already running")
 
             self._interrupted = False
+            for receiver in self._receivers:
+                receiver.queue.reopen()
 
             for i in range(self._thread_pool_size):
                 worker = Thread(target=self._worker, args=[i])
@@ -315,7 +415,10 @@ class OrderedQueueDispatcherPool:
 
         with self._condition:
             self._interrupted = True
-            self._condition.notifyAll()
+            self._condition.notify_all()
+            # Release publishers waiting for space in full queues.
+            for receiver in self._receivers:
+                receiver.queue.close()
 
         for worker in self._threadPool:
             self._logger.debug("Joining worker %s", worker)
@@ -328,6 +431,413 @@ class OrderedQueueDispatcherPool:
         self._logger.info("Stopped thread pool")
 
 
+class BoundedQueue:
+    """
+    A thread-safe FIFO queue with a maximum number of items.
+
+    The overflow policy decides what happens when an item is put into a
+    full queue:
+
+    ``drop-oldest``
+      The oldest queued item is dropped.
+    ``drop-newest``
+      The new item is dropped.
+    ``block``
+      The caller waits until space becomes available.
+    ``raise``
+      The new item is dropped and :obj:`queue.Full` is raised.
+
+    Dropped items are counted. After :meth:`close` has been called, new
+    items are silently discarded, callers waiting for space return and
+    callers waiting for items return once the queue is empty.
+
+    .. codeauthor:: jmoringe
+    """
+
+    OVERFLOW_POLICIES = ('drop-oldest', 'drop-newest', 'block', 'raise')
+
+    def __init__(self, capacity=0, overflow='drop-oldest'):
+        """
+        Create a new queue.
+
+        Args:
+            capacity (int):
+                The maximum number of queued items. Zero means unbounded.
+            overflow (str):
+                One of :attr:`OVERFLOW_POLICIES`.
+
+        Raises:
+            ValueError:
+                If ``overflow`` is not a known policy.
+        """
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(
+                'Overflow policy has to be one of {}, not "{}"'.format(
+                    ', '.join(self.OVERFLOW_POLICIES), overflow))
+        self._capacity = capacity
+        self._overflow = overflow
+        self._items = collections.deque()
+        self._condition = Condition()
+        self._dropped = 0
+        self._closed = False
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def overflow(self):
+        return self._overflow
+
+    @property
+    def dropped(self):
+        """
+        Return the number of items dropped because the queue was full.
+
+        Returns:
+            int:
+                The number of dropped items.
+        """
+        return self._dropped
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        return len(self._items)
+
+    def empty(self):
+        return not self._items
+
+    def put(self, item):
+        """
+        Append ``item``, applying the overflow policy if the queue is full.
+
+        Args:
+            item:
+                The item.
+
+        Returns:
+            bool:
+                ``False`` if ``item`` has been dropped, else ``True``.
+
+        Raises:
+            queue.Full:
+                If the queue is full and the overflow policy is
+                ``raise``.
+        """
+        with self._condition:
+            if self._closed:
+                return False
+            if self._full():
+                if self._overflow == 'block':
+                    while self._full() and not self._closed:
+                        self._condition.wait()
+                    if self._closed:
+                        return False
+                else:
+                    self._dropped += 1
+                    if self._overflow == 'drop-newest':
+                        return False
+                    elif self._overflow == 'raise':
+                        raise Full()
+                    self._items.popleft()
+            self._items.append(item)
+            self._condition.notify_all()
+            return True
+
+    def close(self):
+        """
+        Discard subsequently put items and release blocked callers.
+
+        Already queued items can still be retrieved.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def reopen(self):
+        """Accept items again after :meth:`close`."""
+        with self._condition:
+            self._closed = False
+
+    def get(self, block=True, timeout=None):
+        """
+        Remove and return the oldest item.
+
+        Args:
+            block (bool):
+                If ``True``, wait for an item if the queue is empty.
+            timeout (float or None):
+                If ``block`` is ``True``, the maximum time in seconds to
+                wait for an item. ``None`` means waiting indefinitely.
+
+        Returns:
+            The oldest item.
+
+        Raises:
+            queue.Empty:
+                If no item became available or the queue is closed and
+                empty.
+        """
+        with self._condition:
+            if block and not self._wait(timeout):
+                raise Empty()
+            if not self._items:
+                raise Empty()
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    def get_many(self, max_count, timeout=None):
+        """
+        Remove and return up to ``max_count`` of the oldest items.
+
+        Waits only for the first item.
+
+        Args:
+            max_count (int):
+                The maximum number of returned items.
+            timeout (float or None):
+                The maximum time in seconds to wait for the first item.
+                ``None`` means waiting indefinitely, zero means not waiting.
+
+        Returns:
+            list:
+                The items, oldest first. Empty if no item became available
+                or the queue is closed and empty.
+        """
+        with self._condition:
+            if not self._wait(timeout):
+                return []
+            count = min(max_count, len(self._items))
+            items = [self._items.popleft() for _ in range(count)]
+            self._condition.notify_all()
+            return items
+
+    def _full(self):
+        return self._capacity and len(self._items) >= self._capacity
+
+    def _wait(self, timeout):
+        # Return whether an item is available. Nothing can arrive
+        # once the queue is closed.
+        if timeout is None:
+            while not self._items and not self._closed:
+                self._condition.wait()
+            return bool(self._items)
+        deadline = _time.monotonic() + timeout
+        while not self._items and not self._closed:
+            remaining = deadline - _time.monotonic()
+            if remaining <= 0:
+                return False
+            self._condition.wait(remaining)
+        return bool(self._items)
+
+
+class Histogram:
+    """
+    A histogram of non-negative values with logarithmically sized buckets.
+
+    Similar to HDR histograms, each power of two is divided into
+    ``sub_buckets`` linear buckets. This bounds the relative error of
+    reported percentiles independently of the range of recorded values
+    while keeping the number of buckets small. Count, sum, minimum and
+    maximum are exact.
+
+    Instances do not lock. Callers recording from multiple threads have to
+    synchronize.
+
+    .. codeauthor:: jmoringe
+    """
+
+    def __init__(self, sub_buckets=16):
+        """
+        Create a new, empty histogram.
+
+        Args:
+            sub_buckets (int):
+                The number of buckets per power of two. The relative error
+                of percentiles is at most ``1 / sub_buckets``.
+        """
+        self._sub_buckets = sub_buckets
+        self._buckets = {}
+        self._zeros = 0
+        self._count = 0
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def sum(self):  # noqa: A003
+        return self._sum
+
+    @property
+    def min(self):  # noqa: A003
+        return self._min
+
+    @property
+    def max(self):  # noqa: A003
+        return self._max
+
+    @property
+    def mean(self):
+        if not self._count:
+            return None
+        return self._sum / self._count
+
+    def record(self, value):
+        """
+        Count ``value``.
+
+        Args:
+            value (float):
+                The value to record.
+
+        Raises:
+            ValueError:
+                If ``value`` is negative.
+        """
+        if value < 0:
+            raise ValueError(
+                'Only non-negative values can be recorded, not {}'.format(
+                    value))
+        if value == 0:
+            self._zeros += 1
+        else:
+            index = self._index(value)
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+        self._count += 1
+        self._sum += value
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
+
+    def merge(self, other):
+        """
+        Add the values recorded in ``other`` to this histogram.
+
+        Args:
+            other (Histogram):
+                A histogram with the same number of sub-buckets.
+
+        Raises:
+            ValueError:
+                If the bucket layouts differ.
+        """
+        if other._sub_buckets != self._sub_buckets:
+            raise ValueError('Histograms with different numbers of '
+                             'sub-buckets cannot be merged')
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self._zeros += other._zeros
+        self._count += other._count
+        self._sum += other._sum
+        for value in (other._min, other._max):
+            if value is not None:
+                self._min = value if self._min is None \
+                    else min(self._min, value)
+                self._max = value if self._max is None \
+                    else max(self._max, value)
+
+    def copy(self):
+        """
+        Return an independent copy of this histogram.
+
+        Returns:
+            Histogram:
+                The copy.
+        """
+        result = Histogram(self._sub_buckets)
+        result.merge(self)
+        return result
+
+    def percentile(self, fraction):
+        """
+        Return an approximation of a percentile of the recorded values.
+
+        Args:
+            fraction (float):
+                The percentile as a fraction between 0 and 1.
+
+        Returns:
+            float or None:
+                The approximated value or ``None`` if no values have been
+                recorded.
+        """
+        if not self._count:
+            return None
+        rank = max(1, math.ceil(fraction * self._count))
+        if rank >= self._count:
+            return self._max
+        seen = self._zeros
+        if seen >= rank:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                lower = self._lower_bound(index)
+                upper = self._lower_bound(index + 1)
+                middle = (lower + upper) / 2
+                return min(max(middle, self._min), self._max)
+        return self._max
+
+    def buckets(self):
+        """
+        Return the cumulative counts of the non-empty buckets.
+
+        Returns:
+            list of tuple:
+                Pairs of the upper bound of a bucket and the number of
+                recorded values less than or equal to it, in increasing
+                order of the bounds.
+        """
+        result = []
+        seen = self._zeros
+        if seen:
+            result.append((0.0, seen))
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            result.append((self._lower_bound(index + 1), seen))
+        return result
+
+    def summary(self):
+        """
+        Return the main statistics of the recorded values.
+
+        Returns:
+            dict:
+                ``count``, ``mean``, ``min``, ``p50``, ``p90``, ``p99``
+                and ``max``.
+        """
+        return {'count': self._count,
+                'mean': self.mean,
+                'min': self._min,
+                'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9),
+                'p99': self.percentile(0.99),
+                'max': self._max}
+
+    def _index(self, value):
+        mantissa, exponent = math.frexp(value)
+        return exponent * self._sub_buckets \
+            + int((mantissa - 0.5) * 2 * self._sub_buckets)
+
+    def _lower_bound(self, index):
+        exponent, sub_bucket = divmod(index, self._sub_buckets)
+        return math.ldexp(0.5 + sub_bucket / (2 * self._sub_buckets),
+                          exponent)
+
+    def __repr__(self):
+        return '<{} count={} at 0x{:x}>'.format(
+            type(self).__name__, self._count, id(self))
+
+
 def get_logger_by_class(klass):
     """
     Get a python logger instance based on a class instance.
@@ -282,6 +282,14 @@ setup(name='rsb-python',
 
       packages=find_rsb_packages(),
 
+      entry_points={
+          'console_scripts': [
+              'rsb-bench = rsb.benchmark:main',
+              'rsb-record = rsb.recording:main',
+              'rsb-replay = rsb.recording.replay:main',
+          ],
+      },
+
       cmdclass={
           'proto': FetchProtocol,
           'build_proto': BuildProtocol,
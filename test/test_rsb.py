@@ -21,6 +21,8 @@
 
 import copy
 import os
+import queue
+import threading
 from threading import Condition
 import time
 import uuid
@@ -131,6 +133,27 @@ class TestParticipantConfig:
         config.introspection = False
         assert not config.introspection
 
+    def test_receiving_options(self):
+        config = ParticipantConfig()
+        assert config.receive_queue_size == 0
+        assert config.receive_overflow == 'drop-oldest'
+        assert config.receive_threads == 0
+
+        config = ParticipantConfig.from_dict(
+            {'receiving.queuesize': '10', 'receiving.overflow': 'block',
+             'receiving.threads': '4'})
+        assert config.receive_queue_size == 10
+        assert config.receive_overflow == 'block'
+        assert config.receive_threads == 4
+        assert copy.deepcopy(config).receiving_options == \
+            {'queuesize': '10', 'overflow': 'block', 'threads': '4'}
+
+    def test_introspection_statistics(self):
+        assert ParticipantConfig().introspection_statistics == 0
+        config = ParticipantConfig.from_dict(
+            {'introspection.statistics': '2.5'})
+        assert config.introspection_statistics == 2.5
+
 
 class TestQualityOfServiceSpec:
 
@@ -492,6 +515,140 @@ class TestInformer:
         # OK
         self.informer.publish_data('bla')
 
+    def test_publish_events(self):
+        # Invalid events are rejected before anything is sent
+        events = [Event(scope=self.default_scope, data='foo'),
+                  Event(scope=self.default_scope, data=5)]
+        with pytest.raises(ValueError):
+            self.informer.publish_events(events)
+
+        events = [Event(scope=self.default_scope, data=data,
+                        data_type=str)
+                  for data in ('foo', 'bar', 'baz')]
+        published = self.informer.publish_events(events)
+        assert published == events
+        numbers = [event.event_id.sequence_number for event in published]
+        assert numbers == [numbers[0], numbers[0] + 1, numbers[0] + 2]
+
+
+class TestReader:
+
+    @pytest.fixture
+    def transport_config(self, rsb_config_socket):
+        pass
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, transport_config):
+        self.scope = Scope('/reader/test')
+        self.informer = rsb.create_informer(self.scope, data_type=str)
+        self.reader = rsb.create_reader(self.scope)
+
+        yield
+
+        self.reader.deactivate()
+        self.informer.deactivate()
+
+    def publish(self, count):
+        for i in range(count):
+            self.informer.publish_data(str(i))
+
+    def test_read_timeout(self):
+        start = time.monotonic()
+        assert self.reader.read(timeout=0.05) is None
+        assert time.monotonic() - start >= 0.05
+        assert self.reader.read(block=False) is None
+
+        self.publish(1)
+        event = self.reader.read(timeout=5)
+        assert event.data == '0'
+        assert event.meta_data.deliver_time is not None
+
+    def test_read_many(self):
+        assert self.reader.read_many(5, timeout=0) == []
+
+        self.publish(5)
+        assert self.reader.read(timeout=5).data == '0'
+        events = self.reader.read_many(3, timeout=5)
+        assert [event.data for event in events] == ['1', '2', '3']
+        assert all(event.meta_data.deliver_time is not None
+                   for event in events)
+        assert [event.data
+                for event in self.reader.read_many(3, timeout=5)] == ['4']
+
+    def test_iteration(self):
+        self.publish(3)
+        events = []
+        for event in self.reader:
+            events.append(event.data)
+            if len(events) == 3:
+                break
+        assert events == ['0', '1', '2']
+
+    @pytest.mark.timeout(10)
+    def test_iteration_stops_on_deactivation(self):
+        events = []
+        iterating = threading.Thread(
+            target=lambda: events.extend(self.reader))
+        iterating.start()
+        time.sleep(0.1)
+        self.reader.deactivate()
+        iterating.join()
+        assert events == []
+        # For the fixture.
+        self.reader = rsb.create_reader(self.scope)
+
+
+class TestInprocessReader(TestReader):
+
+    @pytest.fixture
+    def transport_config(self, rsb_config_inprocess):
+        pass
+
+
+class TestReceiveQueues:
+
+    @staticmethod
+    def make_config(**options):
+        return ParticipantConfig.from_dict(dict(
+            {'introspection.enabled': '0',
+             'transport.inprocess.enabled': '1'},
+            **{'receiving.' + key: value for key, value in options.items()}))
+
+    def test_reader(self):
+        config = self.make_config(queuesize='2', overflow='drop-oldest')
+        scope = Scope('/receivequeues/reader')
+        with rsb.create_reader(scope, config=config) as reader, \
+                rsb.create_informer(scope, config=config,
+                                    data_type=int) as informer:
+            for i in range(5):
+                informer.publish_data(i)
+            assert reader.dropped == 3
+            assert [event.data
+                    for event in reader.read_many(5, timeout=0)] == [3, 4]
+
+    @pytest.mark.timeout(10)
+    def test_listener_raise(self):
+        config = self.make_config(queuesize='1', overflow='raise')
+        scope = Scope('/receivequeues/listener')
+        started = threading.Event()
+        release = threading.Event()
+
+        def handler(event):
+            started.set()
+            release.wait()
+
+        with rsb.create_listener(scope, config=config) as listener, \
+                rsb.create_informer(scope, config=config,
+                                    data_type=int) as informer:
+            listener.add_handler(handler)
+            informer.publish_data(0)
+            started.wait()
+            informer.publish_data(1)
+            with pytest.raises(queue.Full):
+                informer.publish_data(2)
+            assert listener.dropped == 1
+            release.set()
+
 
 class TetsIntegration:
 
@@ -567,6 +724,18 @@ class TestContextManager:
             server.add_method(method_name, lambda x: x, str, str)
             assert data == client.test(data)
 
+    def test_listener_remove_handler(self):
+
+        with rsb.create_informer(self.scope, data_type=str) as informer, \
+                rsb.create_listener(self.scope) as listener:
+            received = queue.Queue()
+            listener.add_handler(received.put)
+            informer.publish_data('one')
+            assert received.get(timeout=10).data == 'one'
+
+            listener.remove_handler(received.put)
+            assert listener.get_handlers() == []
+
 
 class TestHook:
 
@@ -0,0 +1,58 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+import json
+
+import pytest
+
+from rsb.benchmark import main, run
+from rsb.benchmark.common import BENCHMARKS, Context, summarize
+
+
+def test_summarize():
+    summary = summarize([0.000001 * i for i in range(100, 0, -1)])
+    assert summary['count'] == 100
+    assert summary['p50'] == pytest.approx(51)
+    assert summary['max'] == pytest.approx(100)
+
+
+@pytest.mark.timeout(60)
+@pytest.mark.parametrize('name', list(BENCHMARKS))
+def test_benchmark(name):
+    document = run([name], Context(scale=0.001, port=55668))
+    assert document['results']
+    for result in document['results']:
+        assert result['benchmark'] == name
+        assert result['metrics']
+    json.dumps(document)
+
+
+def test_main(tmpdir, capsys):
+    output = tmpdir.join('results.json')
+    assert main(['--scale', '0.001', '--output', str(output), 'scope']) == 0
+    document = json.loads(output.read())
+    assert {result['benchmark'] for result in document['results']} \
+        == {'scope'}
+
+    assert main(['--list']) == 0
+    assert 'publish' in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        main(['no-such-benchmark'])
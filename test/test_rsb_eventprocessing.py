@@ -18,6 +18,7 @@
 #
 # ============================================================
 
+import threading
 from threading import Condition
 import time
 import uuid
@@ -446,3 +447,40 @@ class TestFullyParallelEventReceivingStrategy:
                 self.fail("Impossible to be called in parallel again")
             else:
                 assert max_parallel_calls.value == 3
+
+    @pytest.mark.timeout(10)
+    def test_bounded_parallelism(self):
+
+        release = threading.Event()
+        lock = threading.Condition()
+        running = []
+        handled = []
+
+        def handler(event):
+            with lock:
+                running.append(event)
+                lock.notify_all()
+            release.wait()
+            with lock:
+                running.remove(event)
+                handled.append(event.event_id)
+                lock.notify_all()
+
+        strategy = FullyParallelEventReceivingStrategy(
+            capacity=3, overflow='drop-oldest', max_threads=2)
+        strategy.add_handler(handler, True)
+
+        for i in range(7):
+            strategy.handle(Event(event_id=i))
+        with lock:
+            lock.wait_for(lambda: len(running) == 2)
+        # Two calls are running, three are queued and the two oldest
+        # queued ones have been dropped.
+        assert strategy.queued == 3
+        assert strategy.dropped == 2
+
+        release.set()
+        with lock:
+            lock.wait_for(lambda: len(handled) == 5)
+        assert sorted(handled) == [0, 1, 4, 5, 6]
+        strategy.deactivate()
@@ -18,9 +18,18 @@
 #
 # ============================================================
 
+import json
+import queue
 import uuid
 
-from rsb.introspection import HostInfo, ParticipantInfo, ProcessInfo
+import rsb
+from rsb.introspection import (HostInfo,
+                               participant_scope,
+                               ParticipantInfo,
+                               PARTICIPANTS_SCOPE,
+                               ParticipantStatistics,
+                               ProcessInfo)
+from rsb.util import Histogram
 
 
 class TestParticipantInfo:
@@ -55,3 +64,79 @@ class TestHostInfo:
         assert isinstance(info.machine_type, str)
         assert isinstance(info.software_type, str)
         assert isinstance(info.software_version, str)
+
+
+class TestParticipantStatistics:
+
+    def test_update(self):
+        statistics = ParticipantStatistics(2.0, now=10.0)
+        assert statistics.due == 12.0
+
+        histogram = Histogram()
+        histogram.record(0.5)
+        result = statistics.update(
+            {'rsb_listener_events_received_total': 10,
+             'rsb_listener_bytes_received_total': 400,
+             'rsb_listener_events_dropped_total': 1,
+             'rsb_listener_queued_events': 3,
+             'rsb_listener_handler_duration_seconds': histogram},
+            now=12.0)
+        assert result['interval'] == 2.0
+        assert result['events_total'] == 10
+        assert result['events_per_second'] == 5.0
+        assert result['bytes_total'] == 400
+        assert result['bytes_per_second'] == 200.0
+        assert result['queued_events'] == 3
+        assert result['dropped_events_total'] == 1
+        assert result['handler_duration_seconds']['max'] == 0.5
+        assert statistics.due == 14.0
+
+        result = statistics.update(
+            {'rsb_informer_events_published_total': 14}, now=16.0)
+        assert result['events_per_second'] == 1.0
+        assert 'handler_duration_seconds' not in result
+        # A missed update is skipped.
+        assert statistics.due == 16.0
+
+    def test_update_without_samples(self):
+        statistics = ParticipantStatistics(1.0, now=0.0)
+        assert statistics.update({}, now=1.0) is None
+        assert statistics.due == 2.0
+
+
+def test_statistics_publication(rsb_config_inprocess):
+    config = rsb.ParticipantConfig.from_dict(
+        {'introspection.enabled': '1',
+         'introspection.statistics': '0.05',
+         'transport.inprocess.enabled': '1'})
+    statistics = queue.Queue()
+
+    def handle(event):
+        if event.method == 'STATISTICS':
+            statistics.put((event.scope, json.loads(event.data)))
+
+    with rsb.create_listener(PARTICIPANTS_SCOPE) as monitor:
+        monitor.add_handler(handle)
+        with rsb.create_listener('/statistics', config) as listener, \
+                rsb.create_informer('/statistics', config,
+                                    data_type=int) as informer:
+            received = queue.Queue()
+            listener.add_handler(received.put)
+            for i in range(10):
+                informer.publish_data(i)
+            for _ in range(10):
+                received.get(timeout=10)
+
+            expected = {participant_scope(listener.participant_id),
+                        participant_scope(informer.participant_id)}
+            latest = {}
+            while not all(latest.get(scope, {}).get('events_total') == 10
+                          for scope in expected):
+                scope, data = statistics.get(timeout=10)
+                latest[scope] = data
+
+    handler_duration = latest[participant_scope(
+        listener.participant_id)]['handler_duration_seconds']
+    assert handler_duration['count'] == 10
+    assert 'handler_duration_seconds' not in latest[participant_scope(
+        informer.participant_id)]
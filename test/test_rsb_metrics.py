@@ -0,0 +1,169 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+import time
+import urllib.request
+
+import pytest
+
+import rsb
+from rsb import ParticipantConfig
+import rsb.metrics
+from rsb.metrics import Counter, Gauge, Registry
+
+
+class TestRegistry:
+
+    def test_add_and_remove(self):
+        registry = Registry()
+        counter = registry.counter('events_total', 'Events', scope='/a')
+        counter.inc()
+        counter.inc(2)
+        assert registry.get('events_total', scope='/a') is counter
+        assert registry.get('events_total', scope='/b') is None
+
+        # Registering again replaces the metric
+        replacement = registry.add('events_total', 'Events', Counter(),
+                                   scope='/a')
+        assert registry.get('events_total', scope='/a') is replacement
+
+        with pytest.raises(ValueError):
+            registry.add('events_total', 'Events', Gauge(), scope='/b')
+
+        registry.remove('events_total', scope='/a')
+        registry.remove('events_total', scope='/a')
+        assert registry.snapshot() == {}
+
+    def test_snapshot(self):
+        registry = Registry()
+        registry.counter('c_total', 'Counter').inc(3)
+        registry.gauge('g', 'Gauge', lambda: 2.5, kind='function')
+        gauge = registry.gauge('g', 'Gauge', kind='value')
+        gauge.inc(4)
+        gauge.dec()
+        registry.histogram('h_seconds', 'Histogram').record(0.5)
+
+        snapshot = registry.snapshot()
+        assert snapshot['c_total'] == {
+            'type': 'counter', 'help': 'Counter',
+            'samples': [{'labels': {}, 'value': 3}]}
+        assert sorted((sample['labels']['kind'], sample['value'])
+                      for sample in snapshot['g']['samples']) \
+            == [('function', 2.5), ('value', 3)]
+        assert snapshot['h_seconds']['samples'][0]['value']['max'] == 0.5
+
+    def test_prometheus_text(self):
+        registry = Registry()
+        registry.counter('c_total', 'Line\nbreak',
+                         scope='/"quoted"\\').inc()
+        histogram = registry.histogram('h_seconds', 'Histogram')
+        histogram.record(0.0)
+        histogram.record(1.0)
+
+        lines = registry.prometheus_text().splitlines()
+        assert lines[:3] == [
+            '# HELP c_total Line\\nbreak',
+            '# TYPE c_total counter',
+            'c_total{scope="/\\"quoted\\"\\\\"} 1']
+        assert '# TYPE h_seconds histogram' in lines
+        assert 'h_seconds_bucket{le="0.0"} 1' in lines
+        assert 'h_seconds_bucket{le="+Inf"} 2' in lines
+        assert 'h_seconds_sum 1.0' in lines
+        assert 'h_seconds_count 2' in lines
+
+
+def test_http_server():
+    registry = Registry()
+    registry.counter('requests_total', 'Requests').inc(7)
+    server = rsb.metrics.start_http_server(registry=registry)
+    try:
+        url = 'http://127.0.0.1:{}/metrics'.format(server.port)
+        with urllib.request.urlopen(url, timeout=10) as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            assert 'requests_total 7' in response.read().decode('utf-8')
+    finally:
+        server.stop()
+
+
+def _values(name, key, **labels):
+    # Return the values of the metrics of family ``name`` with ``labels``
+    # keyed by the value of their ``key`` label.
+    family = rsb.metrics.get_registry().snapshot().get(name, {})
+    return {sample['labels'][key]: sample['value']
+            for sample in family.get('samples', [])
+            if labels.items() <= sample['labels'].items()}
+
+
+@pytest.mark.timeout(20)
+def test_participant_metrics(rsb_config_inprocess):
+    scope = '/metrics/participants'
+    with rsb.create_informer(scope, data_type=str) as informer, \
+            rsb.create_listener(scope) as listener, \
+            rsb.create_reader(scope) as reader:
+        informer.publish_data('one')
+        informer.publish_data('two')
+        reader.read(timeout=10)
+
+        for name, participant, value in [
+                ('rsb_informer_events_published_total', informer, 2),
+                ('rsb_listener_events_received_total', listener, 2),
+                ('rsb_listener_events_dropped_total', listener, 0),
+                ('rsb_reader_events_read_total', reader, 1),
+                ('rsb_reader_queued_events', reader, 1)]:
+            assert _values(name, 'participant', scope=scope + '/') \
+                == {str(participant.participant_id): value}
+
+    snapshot = rsb.metrics.get_registry().snapshot()
+    assert not any(sample['labels'].get('scope') == scope + '/'
+                   for family in snapshot.values()
+                   for sample in family['samples'])
+
+
+@pytest.mark.timeout(20)
+def test_socket_metrics():
+    options = {'introspection.enabled': '0',
+               'transport.inprocess.enabled': '0',
+               'transport.socket.enabled': '1',
+               'transport.socket.port': '55670'}
+    endpoint = 'localhost:55670'
+    server = ParticipantConfig.from_dict(
+        dict(options, **{'transport.socket.server': '1'}))
+    client = ParticipantConfig.from_dict(
+        dict(options, **{'transport.socket.server': '0'}))
+    with rsb.create_informer('/metrics', server, data_type=str) as informer, \
+            rsb.create_reader('/metrics', client) as reader:
+        assert _values('rsb_socket_connections', 'role',
+                       endpoint=endpoint) == {'server': 1, 'client': 1}
+        # Wait for the server to accept the client connection.
+        deadline = time.monotonic() + 10
+        while reader.read(block=False) is None \
+                and time.monotonic() < deadline:
+            informer.publish_data('x' * 100)
+            time.sleep(0.01)
+
+        sent = _values('rsb_socket_bytes_sent_total', 'role',
+                       endpoint=endpoint)
+        received = _values('rsb_socket_bytes_received_total', 'role',
+                           endpoint=endpoint)
+        assert sent['server'] > 100
+        assert received['client'] == sent['server']
+
+    assert _values('rsb_socket_connections', 'role',
+                   endpoint=endpoint) == {}
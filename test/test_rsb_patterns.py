@@ -18,12 +18,24 @@
 #
 # ============================================================
 
+import asyncio
+import concurrent.futures
+import queue
+import threading
 from threading import Condition
+import time
+import uuid
 
 import pytest
 
 import rsb
 from rsb import ParticipantConfig
+from rsb.patterns import RemoteCallError, ReplyCache
+from rsb.patterns.future import (DataFuture,
+                                 Future,
+                                 FutureCancelled,
+                                 FutureExecutionError,
+                                 FutureTimeout)
 
 in_process_no_introspection_config = ParticipantConfig.from_dict({
     'introspection.enabled': '0',
@@ -81,6 +93,477 @@ class TestLocalServer:
                     methods=[('foo', lambda x: x, str, str)])
 
 
+class TestFuture:
+
+    @pytest.mark.timeout(5)
+    @pytest.mark.parametrize('complete', [
+        lambda future: future.set_result(1),
+        lambda future: future.set_error('failed')])
+    def test_wakes_all_waiters(self, complete):
+        future = Future()
+        waiters = [threading.Thread(target=future.exception)
+                   for _ in range(3)]
+        for waiter in waiters:
+            waiter.start()
+        complete(future)
+        for waiter in waiters:
+            waiter.join()
+
+    def test_error(self):
+        future = Future()
+        future.set_error('failed')
+        with pytest.raises(FutureExecutionError):
+            future.get()
+        assert isinstance(future.exception(), FutureExecutionError)
+        # Late results are ignored.
+        future.set_result(1)
+        assert future.exception() is not None
+
+    def test_timeout(self):
+        with pytest.raises(FutureTimeout):
+            Future().get(timeout=0.01)
+
+    def test_done(self):
+        future = Future()
+        assert not future.done()
+        assert not future.cancelled()
+        future.set_result(1)
+        assert future.done()
+        assert not future.cancelled()
+
+    def test_done_callback(self):
+        future = DataFuture()
+        results = []
+        future.add_done_callback(lambda f: results.append(f.result()))
+        future.set_result(rsb.Event(data='payload'))
+        assert results == ['payload']
+        assert future.get() == 'payload'
+
+    def test_cancel(self):
+        future = Future()
+        cancelled = []
+        future._canceller = lambda: cancelled.append(True)
+        assert future.cancel()
+        assert future.cancelled()
+        assert cancelled == [True]
+        with pytest.raises(FutureCancelled):
+            future.get()
+        with pytest.raises(concurrent.futures.CancelledError):
+            future.result()
+
+        done = Future()
+        done.set_result(1)
+        assert not done.cancel()
+
+
+class TestLocalServerDispatch:
+
+    def test_single_request_listener(self):
+        created = []
+
+        def handle_creation(participant, parent=None):
+            if isinstance(participant, rsb.Listener):
+                created.append(parent)
+
+        rsb.participant_creation_hook.add_handler(handle_creation)
+        try:
+            with rsb.create_local_server(
+                    '/dispatch/single',
+                    methods=[('m{}'.format(i), lambda x: x, str, str)
+                             for i in range(10)],
+                    config=in_process_no_introspection_config) as server:
+                assert created == [server]
+        finally:
+            rsb.participant_creation_hook.remove_handler(handle_creation)
+
+    @pytest.mark.timeout(10)
+    def test_methods_do_not_block_each_other(self):
+        released = threading.Event()
+        order = []
+
+        def wait(x):
+            assert released.wait(5)
+            order.append(x)
+            return x
+
+        def release(x):
+            released.set()
+            return x
+
+        with rsb.create_local_server(
+                '/dispatch/blocking',
+                methods=[('wait', wait, str, str),
+                         ('release', release, str, str)],
+                config=in_process_no_introspection_config) as server:
+            with rsb.create_remote_server(
+                    '/dispatch/blocking',
+                    in_process_no_introspection_config) as remote_server:
+                futures = [remote_server.wait.asynchronous(str(i))
+                           for i in range(5)]
+                assert remote_server.release('go', timeout=5) == 'go'
+                assert [f.get(5) for f in futures] == \
+                    [str(i) for i in range(5)]
+                # Requests of one method are processed in order.
+                assert order == [str(i) for i in range(5)]
+
+                server.remove_method('release')
+                with pytest.raises(FutureTimeout):
+                    remote_server.release('again', timeout=0.2)
+
+    @pytest.mark.timeout(10)
+    def test_admission_control(self):
+        released = threading.Event()
+        running = []
+        lock = threading.Lock()
+
+        def work(x):
+            with lock:
+                running.append(x)
+            assert released.wait(5)
+            return x
+
+        with rsb.create_local_server(
+                '/dispatch/admission',
+                config=in_process_no_introspection_config) as server:
+            method = server.add_method('work', work, int, int,
+                                       max_concurrency=2, max_queue=3)
+            with rsb.create_remote_server(
+                    '/dispatch/admission',
+                    in_process_no_introspection_config) as remote_server:
+                futures = [remote_server.work.asynchronous(i)
+                           for i in range(2)]
+                while len(running) < 2:
+                    time.sleep(0.01)
+                futures += [remote_server.work.asynchronous(i)
+                            for i in range(2, 7)]
+
+                # Two requests do not fit into the queue.
+                for future in futures[5:]:
+                    with pytest.raises(FutureExecutionError) as info:
+                        future.get(5)
+                    assert 'overloaded' in str(info.value)
+                assert len(running) == 2
+
+                released.set()
+                assert [future.get(5) for future in futures[:5]] \
+                    == list(range(5))
+                assert method.statistics.calls == 5
+                assert method.statistics.rejected == 2
+                assert method.statistics.max_queue_time > 0
+                assert method.statistics.max_execution_time > 0
+
+    @pytest.mark.timeout(10)
+    def test_expired_requests_are_skipped(self):
+        released = threading.Event()
+        calls = []
+
+        def work(x):
+            calls.append(x)
+            assert released.wait(5)
+            return x
+
+        with rsb.create_local_server(
+                '/dispatch/deadline',
+                methods=[('work', work, int, int)],
+                config=in_process_no_introspection_config) as server:
+            method = server.get_method('work')
+            with rsb.create_remote_server(
+                    '/dispatch/deadline',
+                    in_process_no_introspection_config) as remote_server:
+                first = remote_server.work.asynchronous(1)
+                with pytest.raises(FutureTimeout):
+                    remote_server.work(2, timeout=0.1)
+                released.set()
+                assert first.get(5) == 1
+                assert remote_server.work(3, timeout=5) == 3
+
+                assert calls == [1, 3]
+                assert method.statistics.expired == 1
+                assert method.statistics.calls == 2
+
+    def test_invalid_limits(self):
+        with rsb.create_local_server(
+                '/dispatch/invalid',
+                config=in_process_no_introspection_config) as server:
+            with pytest.raises(ValueError):
+                server.add_method('m', lambda x: x, max_concurrency=0)
+            with pytest.raises(ValueError):
+                server.add_method('m', lambda x: x, max_queue=1)
+            with pytest.raises(ValueError):
+                server.add_method('m', lambda x: x, max_concurrency=1,
+                                  max_queue=-1)
+
+    def test_invalid_events_are_dropped(self):
+        with rsb.create_local_server(
+                '/dispatch/robust',
+                config=in_process_no_introspection_config) as server:
+            request_id = rsb.EventId(uuid.uuid4(), 0)
+            credit = server._open_stream(request_id, 4)
+
+            def credit_event(**user_infos):
+                return rsb.Event(scope='/dispatch/robust', method='CREDIT',
+                                 user_infos=user_infos,
+                                 causes=[request_id])
+
+            server._handle_event(credit_event())
+            server._handle_event(credit_event(**{'rsb:credit': 'many'}))
+            assert not credit.acquire(4, 0)
+            server._handle_event(credit_event(**{'rsb:credit': '8'}))
+            assert credit.acquire(4, 0)
+
+            def fail(request):
+                raise queue.Full
+            server._handle_request = fail
+            server._handle_event(rsb.Event(scope='/dispatch/robust',
+                                           method='REQUEST'))
+
+
+class TestReplyCache:
+
+    def test_lru(self):
+        cache = ReplyCache(max_size=2)
+        for x in (1, 2):
+            cache.store(cache.key(x), (x, int))
+        assert cache.lookup(cache.key(1)) == (1, int)
+        cache.store(cache.key(3), (3, int))
+        assert cache.lookup(cache.key(2)) is None
+        assert cache.lookup(cache.key(1)) == (1, int)
+        assert len(cache) == 2
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_ttl(self):
+        cache = ReplyCache(ttl=0.05)
+        cache.store(cache.key('a'), ('b', str))
+        assert cache.lookup(cache.key('a')) == ('b', str)
+        time.sleep(0.1)
+        assert cache.lookup(cache.key('a')) is None
+        assert len(cache) == 0
+
+    def test_invalidate(self):
+        cache = ReplyCache()
+        for x in (1, 2, 3):
+            cache.store(cache.key(x), (x, int))
+        cache.invalidate(1)
+        assert cache.lookup(cache.key(1)) is None
+        assert len(cache) == 2
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_key(self):
+        assert ReplyCache.key('a') == ReplyCache.key('a')
+        assert ReplyCache.key('a') != ReplyCache.key(b'a')
+        assert ReplyCache.key(object()) is None
+
+    def test_invalid_options(self):
+        with pytest.raises(ValueError):
+            ReplyCache(max_size=0)
+        with pytest.raises(ValueError):
+            ReplyCache(ttl=0)
+
+    @pytest.mark.timeout(10)
+    def test_cached_method(self):
+        calls = []
+
+        def lookup(x):
+            calls.append(x)
+            if x < 0:
+                raise ValueError(x)
+            return x * 2
+
+        cache = ReplyCache()
+        with rsb.create_local_server(
+                '/cache',
+                config=in_process_no_introspection_config) as server:
+            server.add_method('lookup', lookup, int, int, cache=cache)
+            with rsb.create_remote_server(
+                    '/cache',
+                    in_process_no_introspection_config) as remote_server:
+                assert [remote_server.lookup(x, timeout=5)
+                        for x in (1, 2, 1, 1)] == [2, 4, 2, 2]
+                assert calls == [1, 2]
+
+                # Errors are not cached.
+                for _ in range(2):
+                    with pytest.raises(FutureExecutionError):
+                        remote_server.lookup(-1, timeout=5)
+                assert calls == [1, 2, -1, -1]
+
+                cache.invalidate(1)
+                assert remote_server.lookup(1, timeout=5) == 2
+                assert calls == [1, 2, -1, -1, 1]
+
+
+class TestWorkSharing:
+
+    @pytest.fixture(params=['inprocess', 'socket'])
+    def config(self, request):
+        # The default configuration uses the socket transport.
+        if request.param == 'inprocess':
+            return in_process_no_introspection_config
+        return rsb.get_default_participant_config()
+
+    @staticmethod
+    def wait_for_members(servers, count):
+        deadline = time.monotonic() + 5
+        while any(len(server.group.members) != count for server in servers):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    @pytest.mark.timeout(20)
+    def test_each_request_executed_once(self, config):
+        executed = []
+        lock = threading.Lock()
+
+        def make_method(index):
+            def work(x):
+                with lock:
+                    executed.append((index, x))
+                return x
+            return work
+
+        servers = [
+            rsb.create_local_server(
+                '/worksharing', config,
+                methods=[('work', make_method(i), int, int)],
+                work_sharing=True, heartbeat_interval=0.1)
+            for i in range(3)]
+        try:
+            self.wait_for_members(servers, 3)
+            with rsb.create_remote_server('/worksharing',
+                                          config) as remote_server:
+                assert list(remote_server.work.map(range(60), timeout=5)) \
+                    == list(range(60))
+            assert sorted(x for (_, x) in executed) == list(range(60))
+            assert {index for (index, _) in executed} == {0, 1, 2}
+        finally:
+            for server in servers:
+                server.deactivate()
+
+    @pytest.mark.timeout(20)
+    def test_leave(self, config):
+        first = rsb.create_local_server(
+            '/worksharing/leave', config,
+            work_sharing=True, heartbeat_interval=0.1)
+        try:
+            with rsb.create_local_server(
+                    '/worksharing/leave', config,
+                    work_sharing=True, heartbeat_interval=0.1) as second:
+                self.wait_for_members([first, second], 2)
+                assert set(first.group.members) == set(second.group.members)
+                owners = {first.group.owner(rsb.EventId(member, i))
+                          for member in first.group.members
+                          for i in range(20)}
+                assert owners == set(first.group.members)
+            self.wait_for_members([first], 1)
+            assert first.group.members == (first.group.member_id,)
+        finally:
+            first.deactivate()
+
+
+class TestStreaming:
+
+    @pytest.fixture(params=['inprocess', 'socket'])
+    def streaming_server(self, request):
+        # The default configuration uses the socket transport.
+        config = in_process_no_introspection_config \
+            if request.param == 'inprocess' else None
+        self.produced = []
+
+        def count(n):
+            for i in range(n):
+                self.produced.append(i)
+                yield i
+
+        def fail(n):
+            yield from range(n)
+            raise ValueError('failed after {}'.format(n))
+
+        with rsb.create_local_server(
+                '/streaming',
+                methods=[('count', count, int, int),
+                         ('fail', fail, int, int),
+                         ('plain', lambda n: n, int, int)],
+                config=config):
+            with rsb.create_remote_server('/streaming',
+                                          config) as remote_server:
+                yield remote_server
+
+    @pytest.mark.timeout(20)
+    @pytest.mark.parametrize('window', [0, 1, 4, 16])
+    def test_stream(self, streaming_server, window):
+        stream = streaming_server.count.stream(100, window=window, timeout=5)
+        assert list(stream) == list(range(100))
+        assert streaming_server.outstanding_calls == 0
+
+    @pytest.mark.timeout(20)
+    def test_flow_control(self, streaming_server):
+        with streaming_server.count.stream(1000, window=4,
+                                           timeout=5) as stream:
+            assert next(stream) == 0
+            time.sleep(0.2)
+            # The server stays within the window.
+            assert len(self.produced) <= 6
+        assert streaming_server.outstanding_calls == 0
+        time.sleep(0.2)
+        assert len(self.produced) <= 6
+
+    @pytest.mark.timeout(20)
+    def test_error(self, streaming_server):
+        stream = streaming_server.fail.stream(3, timeout=5)
+        assert [next(stream) for _ in range(3)] == [0, 1, 2]
+        with pytest.raises(FutureExecutionError):
+            next(stream)
+
+    @pytest.mark.timeout(20)
+    def test_plain_method(self, streaming_server):
+        assert list(streaming_server.plain.stream(7, timeout=5)) == [7]
+
+    @pytest.mark.timeout(20)
+    def test_async_iteration(self, streaming_server):
+        async def collect():
+            return [chunk async for chunk
+                    in streaming_server.count.stream(10, timeout=5)]
+
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(collect()) == list(range(10))
+        finally:
+            loop.close()
+
+    @pytest.mark.timeout(20)
+    def test_waiting_for_credit_does_not_block_server(self, streaming_server):
+        with streaming_server.count.stream(1000, window=1,
+                                           timeout=5) as first, \
+                streaming_server.count.stream(1000, window=1,
+                                              timeout=5) as second:
+            assert next(first) == 0
+            # The first stream waits for credit meanwhile.
+            assert next(second) == 0
+            assert streaming_server.plain(3, timeout=5) == 3
+
+    @pytest.mark.timeout(20)
+    def test_abandoned_stream(self):
+        def count(n):
+            while True:
+                yield n
+                n += 1
+
+        with rsb.create_local_server(
+                '/streaming/abandoned',
+                methods=[('count', count, int, int)],
+                config=in_process_no_introspection_config) as server:
+            server.get_method('count').credit_timeout = 0.1
+            with rsb.create_remote_server(
+                    '/streaming/abandoned',
+                    in_process_no_introspection_config) as remote_server:
+                stream = remote_server.count.stream(0, window=1, timeout=5)
+                assert next(stream) == 0
+                time.sleep(0.5)
+                assert next(stream) == 1
+                with pytest.raises(FutureExecutionError):
+                    next(stream)
+
+
 class TestRoundTrip:
 
     def test_round_trip(self):
@@ -107,6 +590,29 @@ class TestRoundTrip:
                         list(map(remote_server.addone.asynchronous,
                                  list(range(100))))] == list(range(1, 101))
 
+                # Wait using concurrent.futures
+                futures = [remote_server.addone.asynchronous(x)
+                           for x in range(100)]
+                assert sorted(future.result() for future in
+                              concurrent.futures.as_completed(
+                                  futures, timeout=10)) == \
+                    list(range(1, 101))
+                done, not_done = concurrent.futures.wait(futures, timeout=10)
+                assert len(done) == 100 and not not_done
+
+                # Await in an event loop
+                async def call_all():
+                    return await asyncio.gather(
+                        *(asyncio.wrap_future(
+                            remote_server.addone.asynchronous(x))
+                          for x in range(100)))
+                loop = asyncio.new_event_loop()
+                try:
+                    assert loop.run_until_complete(call_all()) == \
+                        list(range(1, 101))
+                finally:
+                    loop.close()
+
     def test_void_methods(self):
 
         with rsb.create_local_server(
@@ -165,3 +671,188 @@ class TestRoundTrip:
                     for x in range(num_parallel_calls)]
                 for r in results:
                     r.get(10)
+
+
+class TestRemoteServer:
+
+    @pytest.fixture
+    def created_listeners(self):
+        created = []
+
+        def handle_creation(participant, parent=None):
+            if isinstance(participant, rsb.Listener):
+                created.append(parent)
+
+        rsb.participant_creation_hook.add_handler(handle_creation)
+        yield created
+        rsb.participant_creation_hook.remove_handler(handle_creation)
+
+    def test_single_reply_listener(self, created_listeners):
+        with rsb.create_local_server(
+                '/singlelistener',
+                methods=[('first', lambda x: x, str, str),
+                         ('second', lambda x: x + x, str, str)],
+                config=in_process_no_introspection_config):
+            with rsb.create_remote_server(
+                    '/singlelistener',
+                    in_process_no_introspection_config) as remote_server:
+                del created_listeners[:]
+
+                assert remote_server.first('a') == 'a'
+                assert remote_server.second('b') == 'bb'
+                assert remote_server.first.asynchronous('c').get(10) == 'c'
+
+                assert created_listeners == [remote_server]
+                assert remote_server.count_calls() == 0
+                assert remote_server.count_calls(remote_server.first) == 0
+
+    @pytest.fixture
+    def stalled_server(self):
+        release = threading.Event()
+
+        def stall(x):
+            release.wait(10)
+            return x
+
+        with rsb.create_local_server(
+                '/stalled',
+                methods=[('stall', stall, str, str)],
+                config=in_process_no_introspection_config):
+            with rsb.create_remote_server(
+                    '/stalled',
+                    in_process_no_introspection_config) as remote_server:
+                yield remote_server
+                release.set()
+
+    @pytest.mark.timeout(10)
+    def test_expired_calls_are_removed(self, stalled_server):
+        future = stalled_server.stall.asynchronous('a', timeout=0.1)
+        with pytest.raises(FutureTimeout):
+            future.get()
+        assert stalled_server.outstanding_calls == 0
+        assert stalled_server.expired_calls == 1
+
+        with pytest.raises(FutureTimeout):
+            stalled_server.stall('b', timeout=0.1)
+        assert stalled_server.outstanding_calls == 0
+
+    @pytest.mark.timeout(10)
+    def test_cancel(self, stalled_server):
+        future = stalled_server.stall.asynchronous('a')
+        assert stalled_server.outstanding_calls == 1
+        assert future.cancel()
+        assert future.cancelled()
+        assert stalled_server.outstanding_calls == 0
+        with pytest.raises(FutureCancelled):
+            future.get()
+
+    @pytest.mark.timeout(10)
+    def test_publishing_does_not_lock_server(self, stalled_server):
+        informer = stalled_server.stall.informer
+        send = informer._send_event
+        sending, release = threading.Event(), threading.Event()
+
+        def slow_send(event):
+            sending.set()
+            release.wait(10)
+            send(event)
+
+        informer._send_event = slow_send
+        caller = threading.Thread(
+            target=stalled_server.stall.asynchronous, args=('a',))
+        caller.start()
+        try:
+            assert sending.wait(5)
+            # The call is recorded before it is published.
+            assert stalled_server.outstanding_calls == 1
+        finally:
+            release.set()
+            caller.join()
+
+    def test_failed_publishing_removes_call(self, stalled_server):
+        informer = stalled_server.stall.informer
+
+        def fail(event):
+            raise RuntimeError('transport failed')
+
+        informer._send_event = fail
+        with pytest.raises(RuntimeError):
+            stalled_server.stall.asynchronous('a')
+        assert stalled_server.outstanding_calls == 0
+
+
+class TestBulkCalls:
+
+    @pytest.fixture(params=['inprocess', 'socket'])
+    def remote_server(self, request):
+        # The default configuration uses the socket transport.
+        config = in_process_no_introspection_config \
+            if request.param == 'inprocess' else None
+
+        def fail(x):
+            raise ValueError(x)
+
+        with rsb.create_local_server(
+                '/bulk',
+                methods=[('square', lambda x: x * x, int, int),
+                         ('fail', fail, int, int)],
+                config=config):
+            with rsb.create_remote_server('/bulk', config) as remote_server:
+                yield remote_server
+
+    @pytest.mark.timeout(20)
+    def test_call_many(self, remote_server):
+        futures = remote_server.square.call_many(range(10))
+        assert [future.get(10) for future in futures] \
+            == [x * x for x in range(10)]
+        assert remote_server.square.call_many([]) == []
+        assert remote_server.outstanding_calls == 0
+
+    @pytest.mark.timeout(20)
+    @pytest.mark.parametrize('max_in_flight', [1, 3, 64])
+    def test_map_ordered(self, remote_server, max_in_flight):
+        results = remote_server.square.map(range(100),
+                                           max_in_flight=max_in_flight)
+        assert list(results) == [x * x for x in range(100)]
+        assert remote_server.outstanding_calls == 0
+
+    @pytest.mark.timeout(20)
+    def test_map_unordered(self, remote_server):
+        results = remote_server.square.map(range(100), max_in_flight=8,
+                                           ordered=False)
+        assert sorted(results) == [x * x for x in range(100)]
+
+    @pytest.mark.timeout(20)
+    def test_map_window(self, remote_server):
+        def arguments():
+            for x in range(20):
+                assert remote_server.outstanding_calls <= 4
+                yield x
+
+        assert list(remote_server.square.map(arguments(), max_in_flight=4)) \
+            == [x * x for x in range(20)]
+
+    @pytest.mark.timeout(20)
+    def test_map_error(self, remote_server):
+        with pytest.raises(FutureExecutionError):
+            list(remote_server.fail.map(range(5)))
+
+    def test_map_send_error(self, remote_server):
+        def fail(events):
+            raise RuntimeError('transport failed')
+
+        remote_server.square.informer._send_events = fail
+        with pytest.raises(RemoteCallError):
+            list(remote_server.square.map(range(5)))
+        assert remote_server.outstanding_calls == 0
+
+    @pytest.mark.timeout(20)
+    def test_map_close_cancels(self, remote_server):
+        results = remote_server.square.map(range(1000), max_in_flight=16)
+        assert next(results) == 0
+        results.close()
+        assert remote_server.outstanding_calls == 0
+
+    def test_map_invalid_window(self, remote_server):
+        with pytest.raises(ValueError):
+            next(remote_server.square.map([1], max_in_flight=0))
@@ -0,0 +1,141 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+import os
+
+import pytest
+
+import rsb
+from rsb.recording import LogWriter, main, Recorder, Recording
+
+
+def _write(directory, entries, **options):
+    writer = LogWriter(str(directory), **options)
+    for data, scope, timestamp in entries:
+        writer.append(data, scope, timestamp)
+    writer.close()
+    return writer
+
+
+class TestRecording:
+
+    def test_roundtrip(self, tmpdir):
+        entries = [(bytes([i]) * i, '/a/{}/'.format(i % 3), 100.0 + i)
+                   for i in range(100)]
+        _write(tmpdir, entries, segment_size=512)
+        assert len([name for name in os.listdir(str(tmpdir))
+                    if name.endswith('.log')]) > 1
+
+        with Recording(str(tmpdir)) as recording:
+            assert len(recording) == 100
+            assert recording.start_time == 100.0
+            assert recording.end_time == 199.0
+            assert recording.scopes() == {rsb.Scope('/a/0/'),
+                                          rsb.Scope('/a/1/'),
+                                          rsb.Scope('/a/2/')}
+            assert [(entry.data, entry.scope.to_string(), entry.timestamp)
+                    for entry in recording.entries()] == entries
+
+    def test_queries(self, tmpdir):
+        entries = [(b'x', '/a/{}/'.format(i % 2), 10.0 + i)
+                   for i in range(50)]
+        _write(tmpdir, entries, segment_size=256)
+
+        with Recording(str(tmpdir)) as recording:
+            assert [entry.timestamp
+                    for entry in recording.entries(start=20, end=25)] == \
+                [20.0, 21.0, 22.0, 23.0, 24.0]
+            assert [entry.timestamp
+                    for entry in recording.entries(start=20, end=25,
+                                                   scope='/a/1')] == \
+                [21.0, 23.0]
+            assert len(list(recording.entries(scope='/a'))) == 50
+            assert list(recording.entries(scope='/b')) == []
+            assert list(recording.entries(start=100)) == []
+
+    def test_decreasing_timestamps(self, tmpdir):
+        _write(tmpdir, [(b'x', '/', 5.0), (b'y', '/', 4.0)])
+
+        with Recording(str(tmpdir)) as recording:
+            assert [entry.timestamp for entry in recording.entries()] == \
+                [5.0, 5.0]
+
+    def test_append_to_existing(self, tmpdir):
+        _write(tmpdir, [(b'x', '/', 1.0)])
+        _write(tmpdir, [(b'y', '/', 2.0)])
+
+        with Recording(str(tmpdir)) as recording:
+            assert [entry.data for entry in recording.entries()] == \
+                [b'x', b'y']
+
+    def test_append_to_existing_keeps_order(self, tmpdir):
+        _write(tmpdir, [(b'x', '/', 5.0)])
+        _write(tmpdir, [(b'y', '/', 4.0)])
+
+        with Recording(str(tmpdir)) as recording:
+            assert [entry.timestamp for entry in recording.entries()] == \
+                [5.0, 5.0]
+            assert len(list(recording.entries(start=5.0))) == 2
+
+    def test_large_record(self, tmpdir):
+        data = os.urandom(8 * 1024 * 1024)
+        _write(tmpdir, [(data, '/', 1.0)])
+
+        with Recording(str(tmpdir)) as recording:
+            assert [entry.data for entry in recording.entries()] == [data]
+
+    def test_flush(self, tmpdir):
+        writer = LogWriter(str(tmpdir), flush_interval=3600)
+        writer.append(b'x', '/')
+        with Recording(str(tmpdir)) as recording:
+            assert len(recording) == 0
+        writer.flush()
+        with Recording(str(tmpdir)) as recording:
+            assert len(recording) == 1
+        writer.close()
+
+        with pytest.raises(RuntimeError):
+            writer.append(b'y', '/')
+
+
+def test_recorder(tmpdir):
+    directory = str(tmpdir.join('recording'))
+    with Recorder(directory, '/recorder') as recorder, \
+            rsb.create_informer('/recorder/sub', data_type=str) as informer, \
+            rsb.create_informer('/other', data_type=str) as other:
+        for i in range(10):
+            informer.publish_data(str(i))
+            other.publish_data(str(i))
+    assert recorder.count == 10
+
+    with Recording(directory) as recording:
+        notifications = list(recording.notifications())
+    assert [notification.data for _, notification in notifications] == \
+        [str(i).encode('utf-8') for i in range(10)]
+    assert {notification.scope for _, notification in notifications} == \
+        {b'/recorder/sub/'}
+    assert [notification.event_id.sequence_number
+            for _, notification in notifications] == list(range(10))
+
+
+def test_main(tmpdir):
+    directory = str(tmpdir.join('recording'))
+    assert main([directory, '--duration', '0.01']) == 0
+    assert os.path.isdir(directory)
@@ -0,0 +1,98 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+import queue
+import threading
+import time
+
+import pytest
+
+import rsb
+from rsb.recording import Recorder, Recording
+from rsb.recording.replay import main, Replayer
+
+
+@pytest.fixture
+def recording(tmpdir):
+    directory = str(tmpdir.join('recording'))
+    with Recorder(directory, '/replay') as recorder, \
+            rsb.create_informer('/replay/a', data_type=str) as a, \
+            rsb.create_informer('/replay/b', data_type=str) as b:
+        for i in range(5):
+            a.publish_data('a{}'.format(i))
+            b.publish_data('b{}'.format(i))
+            time.sleep(0.05)
+        recorder.writer.flush()
+    return directory
+
+
+def _replay(directory, **kwargs):
+    received = queue.Queue()
+    with rsb.create_listener('/replay') as listener, \
+            Recording(directory) as recording, \
+            Replayer(recording, **kwargs) as replayer:
+        listener.add_handler(received.put)
+        start = time.monotonic()
+        count = replayer.run()
+        duration = time.monotonic() - start
+        events = [received.get(timeout=10) for _ in range(count)]
+    return events, duration
+
+
+def test_replay_fast(recording):
+    events, duration = _replay(recording, speed=None)
+    expected = ['{}{}'.format(prefix, i)
+                for prefix in 'ab' for i in range(5)]
+    assert sorted(event.data for event in events) == sorted(expected)
+    assert duration < 0.2
+
+
+def test_replay_scaled(recording):
+    events, duration = _replay(recording, speed=2.0, scope='/replay/a')
+    assert [event.data for event in events] == \
+        ['a{}'.format(i) for i in range(5)]
+    # The original events span about 0.2 seconds.
+    assert 0.09 < duration < 1.0
+    # Meta data is replayed unchanged.
+    delays = [event.meta_data.receive_time - event.meta_data.create_time
+              for event in events]
+    assert all(delay > 0.05 for delay in delays)
+
+
+def test_replay_stop(recording):
+    with Recording(recording) as opened, \
+            Replayer(opened, speed=0.01) as replayer:
+        thread = threading.Thread(target=replayer.run)
+        thread.start()
+        time.sleep(0.1)
+        replayer.stop()
+        thread.join(10)
+        assert not thread.is_alive()
+        assert replayer.count < 10
+
+
+def test_negative_speed(recording):
+    with Recording(recording) as opened:
+        with pytest.raises(ValueError):
+            Replayer(opened, speed=-1)
+
+
+def test_main(recording):
+    assert main([recording, '--speed', '0']) == 0
@@ -0,0 +1,117 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+import queue
+
+import pytest
+
+import rsb
+from rsb import Event, ParticipantConfig, Scope
+import rsb.tracing
+
+
+@pytest.fixture
+def tracer():
+    yield rsb.tracing.enable()
+    rsb.tracing.disable()
+
+
+class TestTracer:
+
+    def test_histograms(self):
+        tracer = rsb.tracing.Tracer()
+        tracer.record(Scope('/a'), 'parse', 1.0)
+        tracer.record(Scope('/a/b'), 'parse', 3.0)
+        tracer.record(Scope('/a/b'), 'serialize', 2.0)
+
+        assert set(tracer.scopes) == {Scope('/a'), Scope('/a/b')}
+        assert tracer.histograms(Scope('/a'))['parse'].count == 1
+        merged = tracer.histograms(Scope('/a'), include_sub_scopes=True)
+        assert list(merged) == ['serialize', 'parse']
+        assert merged['parse'].sum == 4.0
+        assert tracer.summary()['/a/b/']['serialize']['max'] == 2.0
+
+        tracer.reset()
+        assert tracer.scopes == []
+
+    def test_disabled(self):
+        assert rsb.tracing.get_tracer() is None
+        assert rsb.tracing.begin('publish') is None
+        assert rsb.tracing.incoming(object()) is None
+
+        event = Event(scope=Scope('/a'))
+        rsb.tracing.mark(event, 'enqueue')
+        assert event.trace is None
+
+    def test_mark_and_call_handler(self, tracer):
+        event = Event(scope=Scope('/a'))
+        event.trace = rsb.tracing.begin('publish')
+        rsb.tracing.mark(event, 'enqueue')
+        assert [stage for stage, _ in event.trace] == ['publish', 'enqueue']
+
+        called = []
+        rsb.tracing.call_handler(called.append, event)
+        assert called == [event]
+        assert set(tracer.histograms(Scope('/a'))) \
+            == {'enqueue', 'handler-start', 'handler-end'}
+
+    def test_incoming(self, tracer):
+        notification, other = object(), object()
+        trace = rsb.tracing.extend(rsb.tracing.begin('frame-read'), 'parse')
+        rsb.tracing.set_incoming([notification], trace)
+        try:
+            assert rsb.tracing.incoming(notification) is trace
+            assert rsb.tracing.incoming(other) == ()
+        finally:
+            rsb.tracing.set_incoming([notification], None)
+
+        event = Event(scope=Scope('/a'))
+        rsb.tracing.attach(event, trace)
+        assert event.trace is trace
+        assert list(tracer.histograms(Scope('/a'))) == ['parse']
+
+
+@pytest.mark.timeout(20)
+@pytest.mark.parametrize('transport, stages', [
+    ('inprocess', ['enqueue', 'handler-start', 'handler-end']),
+    # frame-read starts the trace of the receiving side and thus has no
+    # histogram.
+    ('socket', ['serialize', 'bus-write', 'parse', 'deserialize',
+                'enqueue', 'handler-start', 'handler-end'])])
+def test_pipeline(tracer, transport, stages):
+    options = {'introspection.enabled': '0',
+               'transport.inprocess.enabled': '0',
+               'transport.socket.enabled': '0',
+               'transport.socket.port': '55669',
+               'transport.{}.enabled'.format(transport): '1'}
+    server = ParticipantConfig.from_dict(
+        dict(options, **{'transport.socket.server': '1'}))
+    client = ParticipantConfig.from_dict(
+        dict(options, **{'transport.socket.server': '0'}))
+    scope = Scope('/tracing')
+    received = queue.Queue()
+    with rsb.create_informer(scope, server, data_type=str) as informer, \
+            rsb.create_listener(scope, client) as listener:
+        listener.add_handler(received.put)
+        informer.publish_data('traced')
+        event = received.get(timeout=10)
+
+    assert event.trace is not None
+    assert list(tracer.histograms(scope)) == stages
@@ -0,0 +1,299 @@
+# ============================================================
+#
+# Copyright (C) 2026 Jan Moringen
+#
+# This file may be licensed under the terms of the
+# GNU Lesser General Public License Version 3 (the ``LGPL''),
+# or (at your option) any later version.
+#
+# Software distributed under the License is distributed
+# on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+# express or implied. See the LGPL for the specific language
+# governing rights and limitations.
+#
+# You should have received a copy of the LGPL along with this
+# program. If not, go to http://www.gnu.org/licenses/lgpl.html
+# or write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ============================================================
+
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import pytest
+
+import rsb
+from rsb.converter import (BytesConverter,
+                           get_global_converter_map,
+                           UnambiguousConverterMap)
+from rsb.transport.shm import (acquire_segment,
+                               InPullConnector,
+                               InPushConnector,
+                               OutConnector,
+                               release_segment,
+                               retire_segment,
+                               Segment)
+from .transporttest import TransportCheck
+
+CONTROL_SOCKET_PATH = os.path.join(
+    tempfile.gettempdir(), 'rsb-test-shm-{}.sock'.format(os.getpid()))
+
+
+def get_connector(clazz, scope, activate=True, converters=None, **options):
+    if converters is None:
+        converters = get_global_converter_map(bytes)
+    connector = clazz(converters=converters,
+                      options=dict({'path': CONTROL_SOCKET_PATH}, **options))
+    connector.scope = scope
+    if activate:
+        connector.activate()
+    return connector
+
+
+class Collector:
+
+    def __init__(self):
+        self.events = []
+        self.condition = threading.Condition()
+
+    def __call__(self, event):
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def wait(self, count):
+        with self.condition:
+            assert self.condition.wait_for(
+                lambda: len(self.events) >= count, timeout=5)
+        return self.events
+
+
+def bytes_converters():
+    converters = UnambiguousConverterMap(bytes)
+    converters.add_converter(BytesConverter())
+    return converters
+
+
+def make_event(scope, data):
+    event = rsb.Event(rsb.EventId(uuid.uuid4(), 0),
+                      scope=scope, data=data, data_type=bytes)
+    return event
+
+
+class TestShmTransport(TransportCheck):
+
+    def _get_in_push_connector(self, scope, activate=True):
+        return get_connector(InPushConnector, scope, activate=activate)
+
+    def _get_out_connector(self, scope, activate=True):
+        return get_connector(OutConnector, scope, activate=activate,
+                             threshold='0')
+
+    def _get_in_pull_connector(self, scope, activate=True):
+        return get_connector(InPullConnector, scope, activate=activate)
+
+
+def write(segment, data):
+    location = segment.write(data)
+    if location is not None:
+        segment.release(location[0])
+    return location
+
+
+class TestSegment:
+
+    @pytest.fixture
+    def segment(self):
+        segment = acquire_segment(slots=2, slot_size=1,
+                                  directory=tempfile.gettempdir())
+        yield segment
+        segment.unlink()
+        release_segment(segment)
+
+    def test_write_and_lease(self, segment):
+        slot, generation = write(segment, b'payload')
+        view = segment.lease(slot, generation, 7)
+        assert view.readonly
+        assert bytes(view) == b'payload'
+
+    def test_written_slots_are_held_until_released(self, segment):
+        first = segment.write(b'first')
+        second = segment.write(b'second')
+        assert segment.write(b'third') is None
+        segment.release(first[0])
+        assert write(segment, b'fourth')[0] == first[0]
+        segment.release(second[0])
+
+    def test_leased_slots_are_not_reused(self, segment):
+        first = write(segment, b'first')
+        view = segment.lease(first[0], first[1], 5)
+        second = write(segment, b'second')
+        assert second[0] != first[0]
+        assert write(segment, b'third')[0] == second[0]
+        assert bytes(view) == b'first'
+
+        del view
+        gc.collect()
+        assert write(segment, b'fourth')[0] == first[0]
+
+    def test_no_free_slot(self, segment):
+        views = [segment.lease(*write(segment, b'x'), length=1)
+                 for _ in range(2)]
+        assert segment.write(b'y') is None
+        del views
+
+    def test_overwritten_slot(self, segment):
+        slot, generation = write(segment, b'old')
+        write(segment, b'other')
+        assert write(segment, b'new')[0] == slot
+        assert segment.lease(slot, generation, 3) is None
+
+    def test_shared_per_process(self, segment):
+        other = acquire_segment(segment.path, segment.slots,
+                                segment.slot_size)
+        assert other is segment
+        release_segment(other)
+
+    def test_attach_too_small(self, segment):
+        with pytest.raises(ValueError):
+            Segment.attach(segment.path, segment.slots + 1, segment.slot_size)
+
+    @pytest.mark.timeout(20)
+    def test_slots_are_held_for_other_processes(self, segment):
+        slot, generation = write(segment, b'first')
+        # The receiving process leases the first slot and is marked
+        # for all slots written afterwards.
+        receiver = subprocess.Popen(
+            [sys.executable, '-c', RECEIVER,
+             segment.path, str(segment.slots), str(segment.slot_size),
+             str(slot), str(generation)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        try:
+            assert receiver.stdout.readline() == b'first\n'
+            assert segment.in_use()
+            second = write(segment, b'second')
+            assert second[0] != slot
+            assert segment.write(b'third') is None
+            # Acknowledging a descriptor which was not leased removes
+            # the mark.
+            receiver.stdin.write('{} {}\n'.format(*second).encode())
+            receiver.stdin.flush()
+            assert receiver.stdout.readline() == b'acknowledged\n'
+            assert write(segment, b'third')[0] == second[0]
+        finally:
+            receiver.stdin.close()
+            receiver.wait()
+        # Marks of terminated processes are ignored.
+        assert not segment.in_use()
+        assert write(segment, b'fourth') is not None
+
+
+RECEIVER = """
+import sys
+from rsb.transport.shm import acquire_segment
+path, slots, slot_size, slot, generation = sys.argv[1:]
+segment = acquire_segment(path, int(slots), int(slot_size))
+view = segment.lease(int(slot), int(generation), 5)
+print(bytes(view).decode(), flush=True)
+slot, generation = sys.stdin.readline().split()
+segment.acknowledge(int(slot), int(generation))
+print('acknowledged', flush=True)
+sys.stdin.read()
+"""
+
+
+def test_retired_segment_is_removed():
+    segment = acquire_segment(slots=1, slot_size=1,
+                              directory=tempfile.gettempdir())
+    slot, generation = write(segment, b'payload')
+    view = segment.lease(slot, generation, 7)
+    retire_segment(segment, timeout=5)
+    time.sleep(0.1)
+    assert os.path.exists(segment.path)
+    del view
+    gc.collect()
+    deadline = time.monotonic() + 5
+    while os.path.exists(segment.path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not os.path.exists(segment.path)
+
+
+@pytest.mark.timeout(10)
+def test_zero_copy_delivery():
+    scope = rsb.Scope('/shm/zerocopy')
+    in_connector = get_connector(InPushConnector, scope,
+                                 converters=bytes_converters())
+    out_connector = get_connector(OutConnector, scope,
+                                  converters=bytes_converters(),
+                                  threshold='1024')
+    collector = Collector()
+    in_connector.set_observer_action(collector)
+    try:
+        large, small = b'x' * 4096, b'small'
+        out_connector.handle(make_event(scope, large))
+        out_connector.handle(make_event(scope, small))
+        first, second = collector.wait(2)
+        assert isinstance(first.data, memoryview)
+        assert bytes(first.data) == large
+        assert first.meta_data.user_infos == {}
+        assert second.data == small
+    finally:
+        out_connector.deactivate()
+        in_connector.deactivate()
+
+
+@pytest.mark.timeout(10)
+def test_inline_fallback_when_slots_are_leased():
+    scope = rsb.Scope('/shm/fallback')
+    in_connector = get_connector(InPushConnector, scope, slots='1',
+                                 converters=bytes_converters())
+    out_connector = get_connector(OutConnector, scope, slots='1',
+                                  converters=bytes_converters(),
+                                  threshold='0')
+    collector = Collector()
+    in_connector.set_observer_action(collector)
+    try:
+        out_connector.handle(make_event(scope, b'first'))
+        out_connector.handle(make_event(scope, b'second'))
+        first, second = collector.wait(2)
+        # The first event still references the only slot.
+        assert isinstance(first.data, memoryview)
+        assert bytes(first.data) == b'first'
+        assert second.data == b'second'
+    finally:
+        out_connector.deactivate()
+        in_connector.deactivate()
+
+
+def test_segment_outside_directory_is_rejected():
+    connector = get_connector(InPushConnector, rsb.Scope('/shm/reject'),
+                              activate=False, directory='/nonexistent')
+    with pytest.raises(ValueError):
+        connector._lease('0 1 1 /elsewhere/segment')
+
+
+@pytest.mark.timeout(10)
+def test_pull_connector_keeps_slots_of_queued_events():
+    scope = rsb.Scope('/shm/pull')
+    in_connector = get_connector(InPullConnector, scope, slots='1',
+                                 converters=bytes_converters())
+    out_connector = get_connector(OutConnector, scope, slots='1',
+                                  converters=bytes_converters(),
+                                  threshold='0')
+    try:
+        out_connector.handle(make_event(scope, b'first'))
+        out_connector.handle(make_event(scope, b'second'))
+        first, second = in_connector.read_many(2, timeout=5)
+        assert isinstance(first.data, memoryview)
+        assert bytes(first.data) == b'first'
+        assert second.data == b'second'
+    finally:
+        out_connector.deactivate()
+        in_connector.deactivate()
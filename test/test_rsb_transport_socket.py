@@ -18,17 +18,39 @@
 #
 # ============================================================
 
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+
+from google.protobuf.message import DecodeError
+import pytest
+
 import rsb
 from rsb.converter import get_global_converter_map
-from rsb.transport.socket import InPushConnector, OutConnector
-from .transporttest import TransportCheck
+from rsb.protocol.FragmentedNotification_pb2 import FragmentedNotification
+from rsb.protocol.Notification_pb2 import Notification
+from rsb.transport.socket import (_encode_control,
+                                  AssemblyPool,
+                                  BusClient,
+                                  BusConnection,
+                                  CoalescingWriter,
+                                  EXTENSION_BATCH,
+                                  EXTENSION_FRAGMENT,
+                                  EXTENSION_ZLIB,
+                                  InPullConnector,
+                                  InPushConnector,
+                                  OutConnector)
+from .transporttest import SettingReceiver, TransportCheck
 
 
-def get_connector(clazz, scope, activate=True):
+def get_connector(clazz, scope, activate=True, **options):
     connector = clazz(
         converters=get_global_converter_map(bytes),
-        options=rsb.get_default_participant_config().get_transport(
-            'socket').options)
+        options=dict(rsb.get_default_participant_config().get_transport(
+            'socket').options, **options))
     connector.scope = scope
     if activate:
         connector.activate()
@@ -44,4 +66,644 @@ class TestSocketTransport(TransportCheck):
         return get_connector(OutConnector, scope, activate=activate)
 
     def _get_in_pull_connector(self, scope, activate=True):
-        raise NotImplementedError()
+        return get_connector(InPullConnector, scope, activate=activate)
+
+
+class TestCoalescingSocketTransport(TestSocketTransport):
+
+    def _get_in_push_connector(self, scope, activate=True):
+        return get_connector(InPushConnector, scope, activate=activate,
+                             coalescesize='4096', coalescedelay='200')
+
+    def _get_out_connector(self, scope, activate=True):
+        return get_connector(OutConnector, scope, activate=activate,
+                             coalescesize='4096', coalescedelay='200')
+
+    def _get_in_pull_connector(self, scope, activate=True):
+        return get_connector(InPullConnector, scope, activate=activate,
+                             coalescesize='4096', coalescedelay='200')
+
+
+class TestCoalescingWriter:
+
+    @pytest.fixture
+    def sockets(self):
+        sender, receiver = socket.socketpair()
+        yield sender, receiver
+        sender.close()
+        receiver.close()
+
+    def test_flush_on_size(self, sockets):
+        sender, receiver = sockets
+        writer = CoalescingWriter(sender, size=8, delay=10)
+
+        writer.write(b'abc', b'd')
+        receiver.setblocking(False)
+        with pytest.raises(BlockingIOError):
+            receiver.recv(16)
+
+        writer.write(b'efgh')
+        receiver.setblocking(True)
+        assert receiver.recv(16) == b'abcdefgh'
+
+        writer.close()
+
+    def test_flush_on_deadline(self, sockets):
+        sender, receiver = sockets
+        writer = CoalescingWriter(sender, size=1024, delay=0.001)
+
+        start = time.monotonic()
+        writer.write(b'abc')
+        assert receiver.recv(16) == b'abc'
+        assert time.monotonic() - start < 1
+
+        writer.close()
+
+    def test_large_frame_passes_through(self, sockets):
+        sender, receiver = sockets
+        writer = CoalescingWriter(sender, size=4, delay=10)
+
+        writer.write(b'a')
+        writer.write(b'0123456789')
+        data = b''
+        while len(data) < 11:
+            data += receiver.recv(16)
+        assert data == b'a0123456789'
+
+        writer.close()
+
+    def test_close_flushes(self, sockets):
+        sender, receiver = sockets
+        writer = CoalescingWriter(sender, size=1024, delay=10)
+
+        writer.write(b'abc')
+        writer.close()
+        assert receiver.recv(16) == b'abc'
+
+        with pytest.raises(RuntimeError):
+            writer.write(b'def')
+
+    def test_error_hook(self, sockets):
+        sender, receiver = sockets
+        errors = []
+        writer = CoalescingWriter(sender, size=1024, delay=0.001,
+                                  error_hook=errors.append)
+
+        receiver.close()
+        writer.write(b'abc')
+        deadline = time.monotonic() + 5
+        while not errors and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert len(errors) == 1
+
+        with pytest.raises(OSError):
+            writer.write(b'def')
+
+        writer.close()
+
+    def test_close_timeout(self, sockets):
+        sender, receiver = sockets
+        writer = CoalescingWriter(sender, size=1 << 30, delay=10)
+
+        # The receiver never reads, so the final flush blocks.
+        writer.write(bytes(1 << 24))
+        assert not writer.close(timeout=0.1)
+        sender.shutdown(socket.SHUT_WR)
+
+
+def test_bus_shared_by_connectors_with_different_options():
+    first = get_connector(InPushConnector, rsb.Scope('/foo'),
+                          coalescesize='0')
+    second = get_connector(OutConnector, rsb.Scope('/foo'),
+                           coalescesize='4096')
+    try:
+        assert first.bus is second.bus
+    finally:
+        second.deactivate()
+        first.deactivate()
+
+
+def tcp_socket_pair():
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.bind(('127.0.0.1', 0))
+    listen_socket.listen(1)
+    client = socket.create_connection(listen_socket.getsockname())
+    server, _ = listen_socket.accept()
+    listen_socket.close()
+    return server, client
+
+
+def receive_exactly(socket_, size):
+    data = b''
+    while len(data) < size:
+        chunk = socket_.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def make_notification(scope, sequence_number=0, data=b''):
+    notification = Notification()
+    notification.event_id.sender_id = bytes(16)
+    notification.event_id.sequence_number = sequence_number
+    notification.scope = scope
+    notification.wire_schema = b'bytes'
+    notification.data = data
+    notification.meta_data.create_time = 0
+    notification.meta_data.send_time = 0
+    return notification
+
+
+def plain_frame(notification):
+    payload = notification.SerializeToString()
+    return len(payload).to_bytes(4, 'little') + payload
+
+
+class RecordingHandler:
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.notifications = []
+        self.batches = []
+
+    def __call__(self, notification):
+        with self.condition:
+            self.notifications.append(notification)
+            self.condition.notify_all()
+
+    def handle_batch(self, notifications):
+        with self.condition:
+            self.batches.append(notifications)
+            self.notifications.extend(notifications)
+            self.condition.notify_all()
+
+    def wait_for(self, count, timeout=5):
+        with self.condition:
+            assert self.condition.wait_for(
+                lambda: len(self.notifications) >= count, timeout)
+
+
+def activate(connection):
+    handler = RecordingHandler()
+    connection.add_handler(handler)
+    connection.activate()
+    return handler
+
+
+def close(*connections):
+    # Like Bus.deactivate: the remote end answers the shutdown with
+    # its own shutdown which terminates the receiver threads.
+    connections[0].shutdown()
+    for connection in connections:
+        connection.wait_for_deactivation()
+        connection.deactivate()
+
+
+class TestBusConnectionExtensions:
+
+    @staticmethod
+    def make_connections(server_extensions, client_extensions, **options):
+        server_socket, client_socket = tcp_socket_pair()
+        result = []
+
+        # The client waits for the answer of the active server to its
+        # extension request.
+        def make_server():
+            server = BusConnection(socket_=server_socket, is_server=True,
+                                   extensions=server_extensions, **options)
+            result.append((server, activate(server)))
+        thread = threading.Thread(target=make_server)
+        thread.start()
+        client = BusConnection(socket_=client_socket,
+                               extensions=client_extensions, **options)
+        thread.join()
+        server, server_handler = result[0]
+        return server, client, server_handler, activate(client)
+
+    @pytest.mark.timeout(10)
+    @pytest.mark.parametrize('options', [{}, {'coalesce_size': 1024}])
+    def test_negotiate_batch(self, options):
+        server, client, server_handler, client_handler = \
+            self.make_connections({EXTENSION_BATCH}, {EXTENSION_BATCH},
+                                  **options)
+        assert client.extensions == {EXTENSION_BATCH}
+
+        notifications = [make_notification(b'/foo/', i) for i in range(10)]
+        client.handle_batch(notifications)
+        server_handler.wait_for(10)
+        assert server.extensions == {EXTENSION_BATCH}
+        assert [n.event_id.sequence_number
+                for n in server_handler.notifications] == list(range(10))
+        assert len(server_handler.batches) == 1
+
+        server.handle(make_notification(b'/bar/', 42))
+        client_handler.wait_for(1)
+        assert client_handler.notifications[0].event_id.sequence_number == 42
+
+        close(client, server)
+
+    @pytest.mark.timeout(10)
+    def test_no_common_extensions(self):
+        server, client, server_handler, client_handler = \
+            self.make_connections({EXTENSION_BATCH}, ())
+
+        notifications = [make_notification(b'/foo/', i) for i in range(3)]
+        client.handle_batch(notifications)
+        server_handler.wait_for(3)
+        assert server_handler.batches == []
+        assert server.extensions == frozenset()
+        assert client.extensions == frozenset()
+
+        close(client, server)
+
+    @pytest.mark.timeout(10)
+    @pytest.mark.parametrize('extensions', [{EXTENSION_ZLIB},
+                                            {EXTENSION_ZLIB, EXTENSION_BATCH}])
+    def test_negotiate_compression(self, extensions):
+        server, client, server_handler, client_handler = \
+            self.make_connections(extensions, extensions,
+                                  compression_threshold=100)
+        assert client.extensions == extensions
+
+        # Small, large and incompressible payloads.
+        payloads = [b'small', bytes(100000), bytes(range(256))]
+        client.handle_batch([make_notification(b'/foo/', i, payload)
+                             for i, payload in enumerate(payloads)])
+        server_handler.wait_for(3)
+        assert [n.data for n in server_handler.notifications] == payloads
+
+        server.handle(make_notification(b'/bar/', 0, bytes(100000)))
+        client_handler.wait_for(1)
+        assert client_handler.notifications[0].data == bytes(100000)
+
+        close(client, server)
+
+    @pytest.mark.timeout(10)
+    def test_compression_not_supported_by_server(self):
+        server, client, server_handler, _ = \
+            self.make_connections({EXTENSION_BATCH}, {EXTENSION_ZLIB},
+                                  compression_threshold=100)
+        assert client.extensions == frozenset()
+
+        client.handle(make_notification(b'/foo/', 0, bytes(100000)))
+        server_handler.wait_for(1)
+        assert server_handler.notifications[0].data == bytes(100000)
+
+        close(client, server)
+
+    @pytest.mark.timeout(10)
+    def test_control_frame_in_batch(self):
+        server, client, server_handler, _ = \
+            self.make_connections({EXTENSION_BATCH}, {EXTENSION_BATCH})
+
+        client.send_notifications([
+            _encode_control(b'ACCEPT', {EXTENSION_BATCH}),
+            make_notification(b'/foo/', 1).SerializeToString()])
+        server_handler.wait_for(1)
+        assert [n.event_id.sequence_number
+                for n in server_handler.notifications] == [1]
+
+        close(client, server)
+
+    @pytest.mark.timeout(10)
+    def test_legacy_client(self):
+        server_socket, client_socket = tcp_socket_pair()
+        server = BusConnection(socket_=server_socket, is_server=True,
+                               extensions={EXTENSION_BATCH})
+        server_handler = activate(server)
+
+        # A client that does not know about extensions only sees the
+        # greeting and ordinary frames.
+        notification = make_notification(b'/bar/', 3)
+        server.handle(notification)
+        expected = b'\0\0\0\0' + plain_frame(notification)
+        assert receive_exactly(client_socket, len(expected)) == expected
+
+        client_socket.sendall(plain_frame(make_notification(b'/foo/', 7)))
+        server_handler.wait_for(1)
+        assert server.extensions == frozenset()
+
+        client_socket.shutdown(socket.SHUT_WR)
+        server.wait_for_deactivation()
+        server.deactivate()
+        client_socket.close()
+
+    @pytest.mark.timeout(10)
+    def test_legacy_server(self):
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_socket.bind(('127.0.0.1', 0))
+        listen_socket.listen(2)
+        host, port = listen_socket.getsockname()
+        sockets = []
+
+        # Behaves like a server which does not know about extensions: the
+        # request cannot be parsed and the connection is dropped.
+        def serve():
+            rejected, _ = listen_socket.accept()
+            rejected.sendall(b'\0\0\0\0')
+            size = int.from_bytes(receive_exactly(rejected, 4), 'little')
+            with pytest.raises(DecodeError):
+                Notification().ParseFromString(
+                    receive_exactly(rejected, size))
+            rejected.close()
+            accepted, _ = listen_socket.accept()
+            accepted.sendall(b'\0\0\0\0')
+            sockets.append(accepted)
+        thread = threading.Thread(target=serve)
+        thread.start()
+        client = BusConnection(host, port, extensions={EXTENSION_BATCH})
+        thread.join()
+        listen_socket.close()
+        assert client.extensions == frozenset()
+
+        client_handler = activate(client)
+        sockets[0].sendall(plain_frame(make_notification(b'/foo/', 5)))
+        client_handler.wait_for(1)
+
+        sockets[0].shutdown(socket.SHUT_WR)
+        client.wait_for_deactivation()
+        client.deactivate()
+        sockets[0].close()
+
+    @pytest.mark.timeout(10)
+    @pytest.mark.parametrize('options', [
+        {}, {'coalesce_size': 4096, 'extensions': {EXTENSION_BATCH}}])
+    def test_fragmentation(self, options):
+        extensions = {EXTENSION_FRAGMENT} | options.pop('extensions', set())
+        server, client, server_handler, client_handler = \
+            self.make_connections(extensions, extensions,
+                                  fragment_size=1000, **options)
+        assert client.extensions == extensions
+
+        payload = bytes(range(256)) * 40
+        large = make_notification(b'/foo/', 1, payload)
+        large.meta_data.user_infos.add(key=b'key', value=b'value')
+        client.handle_batch([make_notification(b'/foo/', 0, b'small'),
+                             large,
+                             make_notification(b'/foo/', 2, b'small')])
+        server_handler.wait_for(3)
+        assert [n.event_id.sequence_number
+                for n in server_handler.notifications] == [0, 1, 2]
+        assert server_handler.notifications[1] == large
+        assert len(server.assembly_pool) == 0
+
+        server.handle(large)
+        client_handler.wait_for(1)
+        assert client_handler.notifications[0] == large
+
+        close(client, server)
+
+
+def make_fragment(sequence_number, part, num_parts):
+    fragment = FragmentedNotification()
+    fragment.notification.event_id.sender_id = bytes(16)
+    fragment.notification.event_id.sequence_number = sequence_number
+    if part == 0:
+        fragment.notification.scope = b'/foo/'
+    fragment.data_part = part
+    fragment.num_data_parts = num_parts
+    return fragment
+
+
+class TestAssemblyPool:
+
+    def test_reassemble_out_of_order(self):
+        pool = AssemblyPool()
+        assert pool.add(make_fragment(1, 2, 3), b'c') is None
+        assert pool.add(make_fragment(1, 0, 3), b'a') is None
+        assert pool.size == 2
+        notification = pool.add(make_fragment(1, 1, 3), memoryview(b'b'))
+        assert notification.scope == b'/foo/'
+        assert notification.data == b'abc'
+        assert pool.size == 0
+        assert len(pool) == 0
+
+    def test_budget(self):
+        pool = AssemblyPool(budget=4)
+        assert pool.add(make_fragment(1, 0, 2), b'abc') is None
+        # Exceeds the budget: the second notification is discarded and
+        # its remaining fragments are ignored.
+        assert pool.add(make_fragment(2, 0, 2), b'de') is None
+        assert pool.add(make_fragment(2, 1, 2), b'f') is None
+        assert pool.add(make_fragment(1, 1, 2), b'g').data == b'abcg'
+        assert pool.size == 0
+
+    def test_timeout(self, monkeypatch):
+        now = [0.0]
+        monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+        pool = AssemblyPool(timeout=1.0)
+        assert pool.add(make_fragment(1, 0, 2), b'a') is None
+        now[0] = 2.0
+        assert pool.add(make_fragment(2, 0, 2), b'b') is None
+        assert len(pool) == 1
+        assert pool.add(make_fragment(1, 1, 2), b'c') is None
+        assert pool.add(make_fragment(2, 1, 2), b'd').data == b'bd'
+
+    def test_invalid_part(self):
+        with pytest.raises(RuntimeError):
+            AssemblyPool().add(make_fragment(1, 2, 2), b'a')
+
+
+class TestBatchingSocketTransport(TestSocketTransport):
+
+    def _get_in_push_connector(self, scope, activate=True):
+        return get_connector(InPushConnector, scope, activate=activate,
+                             coalescesize='4096', batch='1')
+
+    def _get_out_connector(self, scope, activate=True):
+        return get_connector(OutConnector, scope, activate=activate,
+                             coalescesize='4096', batch='1')
+
+    def _get_in_pull_connector(self, scope, activate=True):
+        return get_connector(InPullConnector, scope, activate=activate,
+                             coalescesize='4096', batch='1')
+
+
+class TestCompressingSocketTransport(TestSocketTransport):
+
+    def _get_in_push_connector(self, scope, activate=True):
+        return get_connector(InPushConnector, scope, activate=activate,
+                             compression='zlib', compressionthreshold='64')
+
+    def _get_out_connector(self, scope, activate=True):
+        return get_connector(OutConnector, scope, activate=activate,
+                             compression='zlib', compressionthreshold='64')
+
+    def _get_in_pull_connector(self, scope, activate=True):
+        return get_connector(InPullConnector, scope, activate=activate,
+                             compression='zlib', compressionthreshold='64')
+
+
+class TestFragmentingSocketTransport(TestSocketTransport):
+
+    def _get_in_push_connector(self, scope, activate=True):
+        return get_connector(InPushConnector, scope, activate=activate,
+                             fragmentsize='1024')
+
+    def _get_out_connector(self, scope, activate=True):
+        return get_connector(OutConnector, scope, activate=activate,
+                             fragmentsize='1024')
+
+    def _get_in_pull_connector(self, scope, activate=True):
+        return get_connector(InPullConnector, scope, activate=activate,
+                             fragmentsize='1024')
+
+
+UNIX_SOCKET_PATH = os.path.join(tempfile.gettempdir(),
+                                'rsb-test-{}.sock'.format(os.getpid()))
+
+
+class TestUnixSocketTransport(TestSocketTransport):
+
+    def _get_in_push_connector(self, scope, activate=True):
+        return get_connector(InPushConnector, scope, activate=activate,
+                             path=UNIX_SOCKET_PATH)
+
+    def _get_out_connector(self, scope, activate=True):
+        return get_connector(OutConnector, scope, activate=activate,
+                             path=UNIX_SOCKET_PATH)
+
+    def _get_in_pull_connector(self, scope, activate=True):
+        return get_connector(InPullConnector, scope, activate=activate,
+                             path=UNIX_SOCKET_PATH)
+
+
+class TestUnixSocketBus:
+
+    @pytest.mark.timeout(10)
+    def test_client_server_roundtrip(self):
+        scope = rsb.Scope('/unix')
+        in_connector = get_connector(InPushConnector, scope, server='1',
+                                     path=UNIX_SOCKET_PATH)
+        out_connector = get_connector(OutConnector, scope, server='0',
+                                      path=UNIX_SOCKET_PATH)
+        assert isinstance(out_connector.bus, BusClient)
+        assert out_connector.get_transport_url() \
+            == 'unix://' + UNIX_SOCKET_PATH
+
+        receiver = SettingReceiver(scope)
+        in_connector.set_observer_action(receiver)
+        event = rsb.Event(rsb.EventId(uuid.uuid4(), 0), scope=scope,
+                          data='payload', data_type=str)
+        out_connector.handle(event)
+        with receiver.result_condition:
+            assert receiver.result_condition.wait_for(
+                lambda: receiver.result_event is not None, 5)
+        assert receiver.result_event.data == 'payload'
+
+        out_connector.deactivate()
+        in_connector.deactivate()
+        assert not os.path.exists(UNIX_SOCKET_PATH)
+
+    @pytest.mark.timeout(10)
+    def test_stale_socket_file(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(UNIX_SOCKET_PATH)
+        stale.close()
+        assert os.path.exists(UNIX_SOCKET_PATH)
+
+        connector = get_connector(InPushConnector, rsb.Scope('/unix'),
+                                  server='1', path=UNIX_SOCKET_PATH)
+        connector.deactivate()
+        assert not os.path.exists(UNIX_SOCKET_PATH)
+
+
+def test_unknown_compression():
+    with pytest.raises(ValueError):
+        get_connector(OutConnector, rsb.Scope('/foo'), activate=False,
+                      compression='lzma')
+
+
+def test_batch_requires_coalescing():
+    with pytest.raises(ValueError):
+        get_connector(OutConnector, rsb.Scope('/foo'), activate=False,
+                      batch='1')
+
+
+def make_event(scope, data):
+    event = rsb.Event(rsb.EventId(uuid.uuid4(), 0),
+                      scope=scope, data=data, data_type=str)
+    return event
+
+
+class TestInPullConnector:
+
+    @pytest.mark.timeout(10)
+    def test_read_many(self):
+        scope = rsb.Scope('/pull/many')
+        in_connector = get_connector(InPullConnector, scope)
+        out_connector = get_connector(OutConnector, scope)
+        try:
+            before = time.time()
+            for i in range(5):
+                out_connector.handle(make_event(scope, str(i)))
+            events = in_connector.read_many(3, timeout=1)
+            assert [event.data for event in events] == ['0', '1', '2']
+            assert all(before <= event.meta_data.receive_time <= time.time()
+                       for event in events)
+            events = in_connector.read_many(10, timeout=0)
+            assert [event.data for event in events] == ['3', '4']
+            assert in_connector.read_many(10, timeout=0.01) == []
+        finally:
+            out_connector.deactivate()
+            in_connector.deactivate()
+
+    @pytest.mark.timeout(10)
+    @pytest.mark.parametrize('overflow, expected', [
+        ('drop-oldest', ['2', '3', '4']),
+        ('drop-newest', ['0', '1', '2'])])
+    def test_overflow(self, overflow, expected):
+        scope = rsb.Scope('/pull/overflow')
+        in_connector = get_connector(InPullConnector, scope,
+                                     queuesize='3', overflow=overflow)
+        out_connector = get_connector(OutConnector, scope)
+        try:
+            for i in range(5):
+                out_connector.handle(make_event(scope, str(i)))
+            assert in_connector.dropped == 2
+            assert [in_connector.raise_event(False).data
+                    for _ in range(3)] == expected
+            assert in_connector.raise_event(False) is None
+        finally:
+            out_connector.deactivate()
+            in_connector.deactivate()
+
+    def test_unknown_overflow_policy(self):
+        with pytest.raises(ValueError):
+            get_connector(InPullConnector, rsb.Scope('/foo'), activate=False,
+                          overflow='explode')
+
+    @pytest.mark.timeout(10)
+    def test_blocking_overflow_does_not_block_bus(self):
+        blocked_scope = rsb.Scope('/pull/blocked')
+        other_scope = rsb.Scope('/pull/other')
+        blocked = get_connector(InPullConnector, blocked_scope,
+                                queuesize='1', overflow='block')
+        other = get_connector(InPullConnector, other_scope)
+        out_connector = get_connector(OutConnector, rsb.Scope('/pull'))
+        try:
+            assert blocked.blocking
+            assert not other.blocking
+
+            def send_blocked():
+                for i in range(2):
+                    out_connector.handle(make_event(blocked_scope, str(i)))
+            sender = threading.Thread(target=send_blocked)
+            sender.start()
+            time.sleep(0.2)
+            assert sender.is_alive()
+
+            # The sender waits for queue space without holding the
+            # lock of the bus.
+            out_connector.handle(make_event(other_scope, 'other'))
+            assert other.raise_event(True, 1).data == 'other'
+
+            assert blocked.raise_event(True, 1).data == '0'
+            sender.join(1)
+            assert not sender.is_alive()
+            assert blocked.raise_event(True, 1).data == '1'
+        finally:
+            out_connector.deactivate()
+            other.deactivate()
+            blocked.deactivate()
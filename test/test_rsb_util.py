@@ -18,13 +18,14 @@
 #
 # ============================================================
 
+import queue
 import random
-from threading import Condition
+from threading import Condition, Event, Thread
 import time
 
 import pytest
 
-from rsb.util import OrderedQueueDispatcherPool
+from rsb.util import BoundedQueue, Histogram, OrderedQueueDispatcherPool
 
 
 class TestOrderedQueueDispatcherPool:
@@ -150,3 +151,220 @@ class TestOrderedQueueDispatcherPool:
         time.sleep(0.1)
 
         assert len(receiver.messages) == 0
+
+    @pytest.mark.timeout(5)
+    def test_bounded_receiver_queues(self):
+
+        started = Event()
+        release = Event()
+
+        def deliver(receiver, message):
+            started.set()
+            release.wait()
+            with receiver.condition:
+                receiver.messages.append(message)
+                receiver.condition.notify_all()
+
+        pool = OrderedQueueDispatcherPool(1, deliver, capacity=2,
+                                          overflow='drop-newest')
+        receiver = self.StubReciever()
+        pool.register_receiver(receiver)
+        pool.start()
+
+        # The first message is being delivered, the next two are
+        # queued and the remaining ones are dropped.
+        pool.push(0)
+        started.wait()
+        for i in range(1, 6):
+            pool.push(i)
+        assert pool.dropped == 3
+
+        release.set()
+        with receiver.condition:
+            receiver.condition.wait_for(lambda: len(receiver.messages) == 3)
+        pool.stop()
+
+        assert receiver.messages == [0, 1, 2]
+
+    @pytest.mark.timeout(5)
+    def test_stop_releases_blocked_publisher(self):
+
+        started = Event()
+        release = Event()
+
+        def deliver(receiver, message):
+            started.set()
+            release.wait()
+
+        pool = OrderedQueueDispatcherPool(1, deliver, capacity=1,
+                                          overflow='block')
+        pool.register_receiver(self.StubReciever())
+        pool.start()
+        pool.push(0)
+        started.wait()
+        pool.push(1)
+        publisher = Thread(target=pool.push, args=(2,))
+        publisher.start()
+        publisher.join(0.1)
+        assert publisher.is_alive()
+
+        # Stopping waits for the busy worker but releases the publisher
+        # immediately.
+        stopper = Thread(target=pool.stop)
+        stopper.start()
+        publisher.join()
+        release.set()
+        stopper.join()
+
+
+class TestBoundedQueue:
+
+    def test_fifo(self):
+        q = BoundedQueue()
+        for i in range(3):
+            assert q.put(i)
+        assert len(q) == 3
+        assert [q.get() for _ in range(3)] == [0, 1, 2]
+        with pytest.raises(queue.Empty):
+            q.get(False)
+
+    @pytest.mark.parametrize('overflow, expected', [
+        ('drop-oldest', [2, 3]),
+        ('drop-newest', [0, 1])])
+    def test_overflow(self, overflow, expected):
+        q = BoundedQueue(2, overflow)
+        results = [q.put(i) for i in range(4)]
+        assert results == ([True] * 4 if overflow == 'drop-oldest'
+                           else [True, True, False, False])
+        assert q.dropped == 2
+        assert q.get_many(10, timeout=0) == expected
+
+    def test_get_timeout(self):
+        q = BoundedQueue()
+        start = time.monotonic()
+        with pytest.raises(queue.Empty):
+            q.get(timeout=0.05)
+        assert time.monotonic() - start >= 0.05
+        assert q.get_many(1, timeout=0.01) == []
+
+    @pytest.mark.timeout(5)
+    def test_get_many_waits_for_first_item(self):
+        q = BoundedQueue()
+        Thread(target=lambda: (time.sleep(0.05), q.put(1))).start()
+        assert q.get_many(5) == [1]
+
+    def test_raise(self):
+        q = BoundedQueue(1, 'raise')
+        q.put(0)
+        with pytest.raises(queue.Full):
+            q.put(1)
+        assert q.dropped == 1
+        assert q.get_many(10, timeout=0) == [0]
+
+    @pytest.mark.timeout(5)
+    def test_block(self):
+        q = BoundedQueue(1, 'block')
+        q.put(0)
+        publisher = Thread(target=q.put, args=(1,))
+        publisher.start()
+        publisher.join(0.05)
+        assert publisher.is_alive()
+        assert q.get() == 0
+        publisher.join()
+        assert q.get() == 1
+        assert q.dropped == 0
+
+    @pytest.mark.timeout(5)
+    def test_close_releases_blocked_publisher(self):
+        q = BoundedQueue(1, 'block')
+        q.put(0)
+        publisher = Thread(target=q.put, args=(1,))
+        publisher.start()
+        q.close()
+        publisher.join()
+        assert not q.put(2)
+        assert q.get_many(10, timeout=0) == [0]
+        q.reopen()
+        assert q.put(3)
+
+    @pytest.mark.timeout(5)
+    @pytest.mark.parametrize('timeout', [None, 10])
+    def test_close_releases_waiting_consumers(self, timeout):
+        q = BoundedQueue()
+        results = []
+
+        def get():
+            try:
+                results.append(q.get(True, timeout))
+            except queue.Empty:
+                results.append('empty')
+
+        def get_many():
+            results.append(q.get_many(10, timeout))
+
+        consumers = [Thread(target=get), Thread(target=get_many)]
+        for consumer in consumers:
+            consumer.start()
+        time.sleep(0.05)
+        q.close()
+        for consumer in consumers:
+            consumer.join()
+        assert sorted(results, key=str) == [[], 'empty']
+
+    def test_closed_queue_returns_remaining_items(self):
+        q = BoundedQueue()
+        q.put(0)
+        q.close()
+        assert q.get() == 0
+        with pytest.raises(queue.Empty):
+            q.get()
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            BoundedQueue(1, 'explode')
+
+
+class TestHistogram:
+
+    def test_empty(self):
+        h = Histogram()
+        assert h.count == 0
+        assert h.mean is None
+        assert h.percentile(0.5) is None
+        assert h.buckets() == []
+
+    def test_percentiles(self):
+        values = [random.uniform(1e-6, 1.0) for _ in range(10000)]
+        h = Histogram()
+        for value in values:
+            h.record(value)
+        values.sort()
+        assert h.count == 10000
+        assert h.min == values[0]
+        assert h.max == values[-1]
+        assert h.mean == pytest.approx(sum(values) / len(values))
+        for fraction in (0.5, 0.9, 0.99):
+            exact = values[int(fraction * len(values)) - 1]
+            assert h.percentile(fraction) == pytest.approx(exact, rel=0.07)
+        assert h.percentile(1.0) == h.max
+
+    def test_zero_and_negative(self):
+        h = Histogram()
+        h.record(0)
+        h.record(2.0)
+        assert h.percentile(0.5) == 0.0
+        assert h.buckets()[0] == (0.0, 1)
+        assert h.buckets()[-1][1] == 2
+        with pytest.raises(ValueError):
+            h.record(-1)
+
+    def test_merge(self):
+        a, b = Histogram(), Histogram()
+        a.record(1.0)
+        b.record(3.0)
+        c = a.copy()
+        c.merge(b)
+        assert (c.count, c.sum, c.min, c.max) == (2, 4.0, 1.0, 3.0)
+        assert a.count == 1
+        with pytest.raises(ValueError):
+            a.merge(Histogram(sub_buckets=4))